@@ -1,321 +1,83 @@
-from flask import Flask, request, jsonify
-from flask_pymongo import PyMongo
-from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
-from flask_cors import CORS
+from flask import Flask
 from dotenv import load_dotenv
 import os
+import time
 
-# Import model
-from models.user import User
-from models.bmi import BMI
+# Import extensions and the per-app services
+from extensions import jwt, cors, Services
 
-# Load environment variables
-load_dotenv()
-
-# Initialize Flask app
-app = Flask(__name__)
-
-# Configuration
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
-app.config['MONGO_URI'] = os.getenv('MONGO_URI')
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
-
-# Initialize extensions
-mongo = PyMongo(app)
-bcrypt = Bcrypt(app)
-jwt = JWTManager(app)
-CORS(app)
-
-# Initialize user model
-user_model = User(mongo)
-
-# Initialize bmi model
-bmi_model = BMI(mongo)
+# Import blueprints
+from blueprints.core import core_bp
+from blueprints.auth import auth_bp
+from blueprints.user import user_bp
+from blueprints.bmi import bmi_bp
+from blueprints.admin import admin_bp
+from commands import commands_bp
 
-# Test route
-@app.route('/')
-def hello():
-    return {'message': 'Flask Backend 7sehat_fitamin with MongoDB is running!'}
+# Import JSON provider
+from json_provider import init_json
 
-# Test MongoDB connection
-@app.route('/test-db')
-def test_db():
-    try:
-        # Test insert
-        result = mongo.db.test.insert_one({'message': 'MongoDB connected!'})
-        return {'success': True, 'message': 'MongoDB connected successfully!'}
-    except Exception as e:
-        return {'success': False, 'error': str(e)}
+# Import metrics
+from metrics import Metrics
 
-# Register user
-@app.route('/api/auth/register', methods=['GET', 'POST'])
-def register():
-    if request.method == 'GET':
-        return jsonify({'message': 'Register endpoint ready', 'method': 'POST'})
-    
-    try:
-        data = request.get_json()
-
-        # Validate input
-        if not data or not data.get('name') or not data.get('email') or not data.get('password'):
-            return jsonify({'success': False, 'message': 'Invalid input'}), 400
-        
-        # Register user
-        result = user_model.create_user(
-            name=data['name'],
-            email=data['email'],
-            password=data['password']
-        )
-
-        if result['success']:
-            return jsonify(result), 201
-        else:
-            return jsonify(result), 400
-    
-    except Exception as e:
-        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
-    
-# Login user
-@app.route('/api/auth/login', methods=['GET', 'POST'])
-def login():
-    if request.method == 'GET':
-        return jsonify({'message': 'Login endpoint ready', 'method': 'POST'})
-    
-    try:
-        data = request.get_json()
-
-        # Validate input
-        if not data or not data.get('email') or not data.get('password'):
-            return jsonify({'success': False, 'message': 'Email atau password tidak valid'}), 400
-
-        # Login user
-        result = user_model.login_user(
-            email=data['email'],
-            password=data['password']
-        )
+# Load environment variables
+load_dotenv()
 
-        if result['success']:
-            return jsonify(result), 200
-        else:
-            return jsonify(result), 400
-    
-    except Exception as e:
-        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
 
-# Get user profile
-@app.route('/api/user/profile', methods=['GET'])
-@jwt_required()
-def get_user_profile():
-    try:
-        current_user_id = get_jwt_identity()
-        result = user_model.get_user_profile(current_user_id)
-        
-        if result['success']:
-            return jsonify(result), 200
-        else:
-            return jsonify(result), 404
-            
-    except Exception as e:
-        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+def create_app(config=None):
+    """Build the Flask app
 
-# Update user profile
-@app.route('/api/user/profile', methods=['PUT'])
-@jwt_required()
-def update_user_profile():
-    try:
-        current_user_id = get_jwt_identity()
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'success': False, 'message': 'Data tidak valid'}), 400
-        
-        # Basic validation
-        if 'name' in data and not data['name'].strip():
-            return jsonify({'success': False, 'message': 'Nama tidak boleh kosong'}), 400
-            
-        if 'age' in data and (not isinstance(data['age'], int) or data['age'] < 1 or data['age'] > 150):
-            return jsonify({'success': False, 'message': 'Umur tidak valid (1-150 tahun)'}), 400
-            
-        if 'height' in data and (not isinstance(data['height'], (int, float)) or data['height'] < 100 or data['height'] > 250):
-            return jsonify({'success': False, 'message': 'Tinggi badan tidak valid (100-250 cm)'}), 400
-            
-        if 'currentWeight' in data and (not isinstance(data['currentWeight'], (int, float)) or data['currentWeight'] < 30 or data['currentWeight'] > 300):
-            return jsonify({'success': False, 'message': 'Berat badan tidak valid (30-300 kg)'}), 400
-            
-        if 'targetWeight' in data and (not isinstance(data['targetWeight'], (int, float)) or data['targetWeight'] < 30 or data['targetWeight'] > 300):
-            return jsonify({'success': False, 'message': 'Target berat tidak valid (30-300 kg)'}), 400
-        
-        result = user_model.update_user_profile(current_user_id, data)
-        
-        if result['success']:
-            return jsonify(result), 200
-        else:
-            return jsonify(result), 400
-            
-    except Exception as e:
-        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
-    
-# Save BMI
-@app.route('/api/bmi/save', methods=['POST'])
-@jwt_required()
-def save_bmi():
-    try:
-        current_user_id = get_jwt_identity()
-        data = request.get_json()
+    Models, caches and the MongoDB client are created on first use (see
+    extensions.Services). The unauthenticated /test-* routes are only registered
+    in debug mode or with ENABLE_TEST_ROUTES=true.
 
-        # Validate input
-        if not data or not data.get('weight') or not data.get('height'):
-            return jsonify({'success': False, 'message': 'Invalid input'}), 400
-        
-        # Save BMI
-        result = bmi_model.save_bmi(
-            user_id=current_user_id,
-            weight=data['weight'],
-            height=data['height'],
-            notes=data.get('notes', '')
-        )
+    Schema migrations (indexes, including the unique email key registration
+    relies on) are not applied here: run `flask migrate` once per deploy, before
+    the workers start.
+    """
+    started = time.perf_counter()
 
-        if result['success']:
-            return jsonify(result), 200
-        else:
-            return jsonify(result), 400
-    except Exception as e:
-        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+    # Initialize Flask app
+    app = Flask(__name__)
 
-# Get BMI history
-@app.route('/api/bmi/history', methods=['GET'])
-@jwt_required()
-def get_bmi_history():
-    try:
-        current_user_id = get_jwt_identity()
-        result = bmi_model.get_user_bmi_history(current_user_id)
-        
-        if result['success']:
-            return jsonify(result), 200
-        else:
-            return jsonify(result), 404
-            
-    except Exception as e:
-        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+    # Configuration
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+    app.config['MONGO_URI'] = os.getenv('MONGO_URI')
+    app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
+    # Admins are listed by email in ADMIN_EMAILS
+    app.config['ADMIN_EMAILS'] = {email.strip().lower() for email in os.getenv('ADMIN_EMAILS', '').split(',') if email.strip()}
+    app.config['ENABLE_TEST_ROUTES'] = os.getenv('ENABLE_TEST_ROUTES', 'false').lower() == 'true'
+    app.config.update(config or {})
 
-# Get Latest BMI
-@app.route('/api/bmi/latest', methods=['GET'])
-@jwt_required()
-def get_latest_bmi():
-    try:
-        current_user_id = get_jwt_identity()
-        result = bmi_model.get_latest_bmi(current_user_id)
-        
-        if result['success']:
-            return jsonify(result), 200
-        else:
-            return jsonify(result), 404
-            
-    except Exception as e:
-        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+    # Fast JSON encoding with native datetime/ObjectId/NumPy support
+    init_json(app)
 
-# ====================== TEST SECTION ======================
+    # Metrics (exposed on /metrics), Mongo commands slower than MONGO_SLOW_QUERY_MS are logged
+    metrics = Metrics(slow_query_ms=float(os.getenv('MONGO_SLOW_QUERY_MS', 100)))
+    metrics.init_app(app)
 
-# Test Register
-@app.route('/test-register')
-def test_register():
-    try:
-        # Data dummy untuk test
-        result = user_model.create_user(
-            name="Test User",
-            email="test@example.com", 
-            password="password123"
-        )
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    # Initialize extensions
+    jwt.init_app(app)
+    cors.init_app(app)
+    app.extensions['services'] = Services(app, metrics)
 
-# Test Login 
-@app.route('/test-login')
-def test_login():
-    try:
-        # Login dengan data dummy
-        result = user_model.login_user(
-            email="test@example.com",
-            password="password123"
-        )
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    # Register blueprints
+    app.register_blueprint(core_bp)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(user_bp)
+    app.register_blueprint(bmi_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(commands_bp)
 
-# Test Profile Routes (no auth)
-@app.route('/test-profile')
-def test_profile():
-    try:
-        # Ambil user pertama dari database untuk test
-        test_user = mongo.db.users.find_one()
-        if not test_user:
-            return jsonify({'success': False, 'message': 'No users found. Register first.'})
-        
-        user_id = str(test_user['_id'])
-        result = user_model.get_user_profile(user_id)
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    if app.debug or app.config['ENABLE_TEST_ROUTES']:
+        from blueprints.dev import dev_bp
+        app.register_blueprint(dev_bp)
 
-# Test Update Profile (no auth)
-@app.route('/test-update-profile')
-def test_update_profile():
-    try:
-        # Ambil user pertama dari database untuk test
-        test_user = mongo.db.users.find_one()
-        if not test_user:
-            return jsonify({'success': False, 'message': 'No users found. Register first.'})
-        
-        user_id = str(test_user['_id'])
-        
-        # Test data
-        test_data = {
-            'name': 'John Doe Updated',
-            'age': 25,
-            'gender': 'Pria',
-            'height': 175,
-            'currentWeight': 70.5,
-            'targetWeight': 65.0,
-            'fitnessGoal': 'Menurunkan Berat'
-        }
-        
-        result = user_model.update_user_profile(user_id, test_data)
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    app.config['STARTUP_SECONDS'] = time.perf_counter() - started
+    app.logger.info(f"App created in {app.config['STARTUP_SECONDS'] * 1000:.1f} ms")
 
-# Test List Users
-@app.route('/test-list-users')
-def test_list_users():
-    try:
-        users = list(mongo.db.users.find({}, {'password': 0}))  # Exclude password
-        # Convert ObjectId to string
-        for user in users:
-            user['_id'] = str(user['_id'])
-        return jsonify({'success': True, 'users': users})
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    return app
 
-# Test Save BMI
-@app.route('/test-bmi')
-def test_bmi():
-    try:
-        # Test calculate BMI
-        bmi, status = bmi_model.calculate_bmi(70, 170)
-        
-        return jsonify({
-            'success': True,
-            'test_data': {
-                'weight': 70,
-                'height': 170,
-                'bmi': bmi,
-                'status': status
-            }
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app({'DEBUG': True}).run(debug=True)
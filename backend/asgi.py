@@ -0,0 +1,700 @@
+"""Async (ASGI) serving mode
+
+Same API routes, validation and responses as app.py, served by Quart on an async
+MongoDB client so one process can keep thousands of requests in flight:
+
+    hypercorn asgi:app --bind 0.0.0.0:5000
+
+Everything that would block the event loop (password hashing, Redis cache calls,
+meal plan solving, food scoring and import parsing) runs in worker threads.
+"""
+from functools import wraps
+from quart import Quart, Response, current_app, request, jsonify, g
+from quart_cors import cors
+from pymongo import AsyncMongoClient
+from werkzeug.local import LocalProxy
+from dotenv import load_dotenv
+import asyncio
+import os
+import time
+
+# Import model
+from models.user import User
+from models.async_user import AsyncUser
+from models.async_bmi import AsyncBMI
+from models.bmi_summary import AsyncBMISummary
+from models.forecast import AsyncForecast
+from models.import_jobs import ImportJobs, AsyncImportJobs
+from models.dashboard import AsyncDashboard
+from models.user_versions import AsyncUserVersions
+from models.analytics import AsyncAnalytics
+from models.food import Food
+from models.meal_plan import MealPlan
+
+# Import helpers shared with the sync app
+from cache import create_cache
+from hashing import PasswordHasher, HasherBusy, DEFAULT_HASH_METHOD
+from tokens import TokenError, claims_from_header
+from validation import (
+    ValidationError, validate_register, validate_login, validate_profile_update,
+    validate_save_bmi, validate_batch, parse_history_args, parse_trend_args, parse_recent_limit,
+    parse_export_format, parse_recommendation_args, parse_analytics_args, parse_import_format
+)
+from export import EXPORT_MIMETYPES, csv_header, csv_row, export_headers
+from bmi_import import import_stats, spool_file, run_import_job_async
+from metrics import Metrics, max_rss_bytes
+from write_buffer import BufferFull, buffer_options
+from json_provider import init_json
+from mongo_pool import client_options
+from health import AsyncReadinessProbe
+from conditional import make_etag, not_modified, with_etag
+
+# Load environment variables
+load_dotenv()
+
+import_started = time.perf_counter()
+
+# Initialize Quart app
+app = Quart(__name__)
+
+# Configuration
+app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+app.config['MONGO_URI'] = os.getenv('MONGO_URI')
+app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
+# Admins are listed by email in ADMIN_EMAILS
+app.config['ADMIN_EMAILS'] = {email.strip().lower() for email in os.getenv('ADMIN_EMAILS', '').split(',') if email.strip()}
+
+# Fast JSON encoding with native datetime/ObjectId/NumPy support
+init_json(app)
+
+app = cors(app)
+
+# Metrics (exposed on /metrics), Mongo commands slower than MONGO_SLOW_QUERY_MS are logged
+metrics = Metrics(slow_query_ms=float(os.getenv('MONGO_SLOW_QUERY_MS', 100)))
+
+@app.before_request
+async def start_timer():
+    g.metrics_started = time.perf_counter()
+
+@app.after_request
+async def record_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
+
+class AsyncServices:
+    """Models and shared resources of the ASGI app, the async counterpart of extensions.Services
+
+    Built when the server starts, inside the running event loop the async MongoDB
+    client belongs to.
+    """
+
+    def __init__(self, config, metrics):
+        self.metrics = metrics
+
+        # Profile cache (in-process LRU+TTL, or shared Redis when PROFILE_CACHE_REDIS_URL is set)
+        self.profile_cache = create_cache(
+            max_size=int(os.getenv('PROFILE_CACHE_SIZE', 10000)),
+            ttl=int(os.getenv('PROFILE_CACHE_TTL', 300)),
+            redis_url=os.getenv('PROFILE_CACHE_REDIS_URL'),
+            prefix='profile:'
+        )
+
+        # Password hashing process pool, HASH_WORKERS=0 hashes inline
+        self.password_hasher = PasswordHasher(
+            method=os.getenv('HASH_METHOD', DEFAULT_HASH_METHOD),
+            workers=int(os.getenv('HASH_WORKERS')) if os.getenv('HASH_WORKERS') else None,
+            max_pending=int(os.getenv('HASH_MAX_PENDING')) if os.getenv('HASH_MAX_PENDING') else None,
+            timeout=float(os.getenv('HASH_TIMEOUT', 10)),
+            on_timing=metrics.observe_hash
+        )
+
+        # Food model (nutrition dataset loaded once, FOOD_DATA_PATH overrides the bundled CSV)
+        self.food_model = Food(os.getenv('FOOD_DATA_PATH'))
+
+        # Solved meal plans per (calorie bucket, macro split, goal), few buckets cover most users
+        self.meal_plan_cache = create_cache(
+            max_size=int(os.getenv('MEAL_PLAN_CACHE_SIZE', 1000)),
+            ttl=int(os.getenv('MEAL_PLAN_CACHE_TTL', 86400)),
+            redis_url=os.getenv('PROFILE_CACHE_REDIS_URL'),
+            prefix='meal_plan:'
+        )
+        self.meal_plan_model = MealPlan(self.food_model, cache=self.meal_plan_cache)
+
+        self.mongo_client = AsyncMongoClient(
+            config['MONGO_URI'], event_listeners=metrics.event_listeners(), **client_options()
+        )
+        db = self.mongo_client.get_default_database()
+
+        self.analytics_model = AsyncAnalytics(db, cache=self.profile_cache)
+        self.user_model = AsyncUser(
+            db, config['JWT_SECRET_KEY'], cache=self.profile_cache, hasher=self.password_hasher,
+            listeners=[self.analytics_model]
+        )
+        self.bmi_summary_model = AsyncBMISummary(db)
+        # Per-user version counters (ETags)
+        self.user_versions = AsyncUserVersions(db)
+        # Goal forecasts, FORECAST_HALF_LIFE_DAYS weights recent weigh-ins higher
+        self.forecast_model = AsyncForecast(db, half_life_days=float(os.getenv('FORECAST_HALF_LIFE_DAYS', 0)))
+        self.bmi_model = AsyncBMI(
+            db, listeners=[self.bmi_summary_model, self.user_versions, self.analytics_model, self.forecast_model],
+            collection_name=os.getenv('BMI_COLLECTION')
+        )
+        # Optional write-behind mode: BMI saves are queued and inserted in batches (see write_buffer.py)
+        if os.getenv('BMI_WRITE_BEHIND', 'false').lower() == 'true':
+            self.bmi_model.start_write_behind(**buffer_options())
+        # Status of background BMI imports
+        self.import_jobs = AsyncImportJobs(db)
+        self.dashboard_model = AsyncDashboard(db, self.user_model, self.bmi_model)
+
+        # Readiness probe, a cached MongoDB ping (no writes)
+        self.readiness_probe = AsyncReadinessProbe(
+            lambda: self.mongo_client.admin.command('ping'), ttl=float(os.getenv('READINESS_CACHE_SECONDS', 5))
+        )
+
+    async def warm_up(self, connections):
+        """Open pooled connections up front so the first requests are not slower"""
+        await asyncio.gather(*(self.mongo_client.admin.command('ping') for _ in range(connections)))
+
+    async def close(self):
+        # Drain queued BMI writes before the client goes away
+        if self.bmi_model.write_buffer is not None:
+            await self.bmi_model.write_buffer.close()
+        await self.mongo_client.close()
+        self.password_hasher.shutdown()
+
+
+# Services of the running app
+services = LocalProxy(lambda: current_app.extensions['services'])
+
+@app.before_serving
+async def create_services():
+    app.extensions['services'] = AsyncServices(app.config, metrics)
+
+    try:
+        await services.warm_up(int(os.getenv('MONGO_WARMUP_CONNECTIONS', 2)))
+    except Exception as e:
+        app.logger.warning(f"Error warming up MongoDB pool: {str(e)}")
+
+    app.config['STARTUP_SECONDS'] = time.perf_counter() - import_started
+
+@app.after_serving
+async def close_services():
+    await services.close()
+
+# Async counterpart of flask_jwt_extended.jwt_required, the checks and error responses come from tokens.py
+def jwt_required(refresh=False):
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            try:
+                g.jwt_claims = claims_from_header(
+                    request.headers.get('Authorization', ''), app.config['JWT_SECRET_KEY'],
+                    'refresh' if refresh else 'access'
+                )
+            except TokenError as e:
+                return jsonify({'msg': e.message}), e.status
+
+            return await view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_jwt_identity():
+    return g.jwt_claims['sub']
+
+def get_jwt():
+    return g.jwt_claims
+
+# Admins are listed by email in ADMIN_EMAILS and checked against the token's profile snapshot
+def is_admin():
+    user = User.profile_from_claims(get_jwt_identity(), get_jwt())
+    return user is not None and user['email'].lower() in current_app.config['ADMIN_EMAILS']
+
+# Test route
+@app.route('/')
+async def hello():
+    return {'message': 'Quart (ASGI) Backend 7sehat_fitamin with MongoDB is running!'}
+
+# Liveness probe, no I/O
+@app.route('/healthz')
+async def healthz():
+    return {'status': 'ok'}
+
+# Readiness probe, a cached MongoDB ping (no writes)
+@app.route('/readyz')
+async def readyz():
+    ok, error = await services.readiness_probe.status()
+    if ok:
+        return {'status': 'ok'}
+    return {'status': 'unavailable', 'error': error}, 503
+
+# Prometheus metrics
+@app.route('/metrics')
+async def get_metrics():
+    cache_stats = services.profile_cache.stats()
+    meal_plan_stats = services.meal_plan_cache.stats()
+    gauges = {
+        'app_startup_seconds': ('Time from import until the server was ready', current_app.config['STARTUP_SECONDS']),
+        'profile_cache_hits': ('Profile cache hits', cache_stats['hits']),
+        'profile_cache_misses': ('Profile cache misses', cache_stats['misses']),
+        'profile_cache_evictions': ('Profile cache evictions', cache_stats['evictions']),
+        'meal_plan_cache_hits': ('Meal plan cache hits', meal_plan_stats['hits']),
+        'meal_plan_cache_misses': ('Meal plan cache misses', meal_plan_stats['misses']),
+    }
+    if max_rss_bytes() is not None:
+        gauges['process_max_rss_bytes'] = ('Peak resident memory of this worker', max_rss_bytes())
+    if services.bmi_model.write_buffer is not None:
+        gauges['bmi_write_buffer_pending'] = ('BMI records waiting in the write buffer', services.bmi_model.write_buffer.pending())
+        gauges['bmi_write_buffer_failed'] = ('BMI records the write buffer failed to insert', services.bmi_model.write_buffer.stats['failed'])
+    body = metrics.render(gauges)
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+# Register user
+@app.route('/api/auth/register', methods=['GET', 'POST'])
+async def register():
+    if request.method == 'GET':
+        return jsonify({'message': 'Register endpoint ready', 'method': 'POST'})
+
+    try:
+        data = await request.get_json()
+
+        # Validate input
+        validate_register(data)
+
+        # Register user
+        result = await services.user_model.create_user(
+            name=data['name'],
+            email=data['email'],
+            password=data['password']
+        )
+
+        if result['success']:
+            return jsonify(result), 201
+        else:
+            return jsonify(result), 400
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except HasherBusy:
+        return jsonify({'success': False, 'message': 'Server sedang sibuk, coba lagi nanti'}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Login user
+@app.route('/api/auth/login', methods=['GET', 'POST'])
+async def login():
+    if request.method == 'GET':
+        return jsonify({'message': 'Login endpoint ready', 'method': 'POST'})
+
+    try:
+        data = await request.get_json()
+
+        # Validate input
+        validate_login(data)
+
+        # Login user
+        result = await services.user_model.login_user(
+            email=data['email'],
+            password=data['password']
+        )
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except HasherBusy:
+        return jsonify({'success': False, 'message': 'Server sedang sibuk, coba lagi nanti'}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Reissue a short-lived access token with a fresh profile snapshot
+@app.route('/api/auth/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+async def refresh():
+    try:
+        current_user_id = get_jwt_identity()
+        result = await services.user_model.refresh_access_token(current_user_id)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 401
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Current user from the access token's profile snapshot, no database read
+@app.route('/api/me', methods=['GET'])
+@jwt_required()
+async def get_me():
+    user = User.profile_from_claims(get_jwt_identity(), get_jwt())
+
+    if user is None:
+        return jsonify({'success': False, 'message': 'Token tidak memuat profil, silakan refresh token'}), 401
+    return jsonify({'success': True, 'user': user}), 200
+
+# Get user profile
+@app.route('/api/user/profile', methods=['GET'])
+@jwt_required()
+async def get_user_profile():
+    try:
+        current_user_id = get_jwt_identity()
+        result = await services.user_model.get_user_profile(current_user_id)
+
+        if result['success']:
+            etag = make_etag('profile', current_user_id, result['user'].get('version', 0))
+            if not_modified(request, etag):
+                return with_etag(Response('', status=304), etag)
+            return with_etag(jsonify(result), etag), 200
+        else:
+            return jsonify(result), 404
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Update user profile
+@app.route('/api/user/profile', methods=['PUT'])
+@jwt_required()
+async def update_user_profile():
+    try:
+        current_user_id = get_jwt_identity()
+        data = await request.get_json()
+
+        validate_profile_update(data)
+
+        result = await services.user_model.update_user_profile(current_user_id, data)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Get dashboard data (profile, latest BMI, recent trend) in one request
+@app.route('/api/dashboard', methods=['GET'])
+@jwt_required()
+async def get_dashboard():
+    try:
+        current_user_id = get_jwt_identity()
+        recent_limit = parse_recent_limit(request.args)
+
+        result = await services.dashboard_model.get_dashboard(current_user_id, recent_limit)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 404
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Save BMI
+@app.route('/api/bmi/save', methods=['POST'])
+@jwt_required()
+async def save_bmi():
+    try:
+        current_user_id = get_jwt_identity()
+        data = await request.get_json()
+
+        # Validate input
+        validate_save_bmi(data)
+
+        # Save BMI
+        result = await services.bmi_model.save_bmi(
+            user_id=current_user_id,
+            weight=data['weight'],
+            height=data['height'],
+            notes=data.get('notes', '')
+        )
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except BufferFull:
+        return jsonify({'success': False, 'message': 'Server sedang sibuk, coba lagi nanti'}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Calculate BMI for many weight/height pairs in one request (nothing is saved)
+@app.route('/api/bmi/calculate-batch', methods=['POST'])
+@jwt_required()
+async def calculate_bmi_batch():
+    try:
+        data = await request.get_json()
+
+        # Validate input
+        validate_batch(data)
+
+        return jsonify(services.bmi_model.score_batch(data['weights'], data['heights'])), 200
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Get BMI history
+@app.route('/api/bmi/history', methods=['GET'])
+@jwt_required()
+async def get_bmi_history():
+    try:
+        current_user_id = get_jwt_identity()
+
+        # Validate pagination and filter parameters
+        history_args = parse_history_args(request.args)
+
+        # Answer If-None-Match from the history version alone
+        version = await services.user_versions.get_version(current_user_id, 'history')
+        etag = make_etag('history', current_user_id, version, request.query_string) if version is not None else None
+        if etag and not_modified(request, etag):
+            return with_etag(Response('', status=304), etag)
+
+        result = await services.bmi_model.get_user_bmi_history(current_user_id, **history_args)
+
+        if result['success']:
+            response = jsonify(result)
+            return (with_etag(response, etag) if etag else response), 200
+        else:
+            return jsonify(result), 404
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Get BMI trend downsampled to day/week/month buckets
+@app.route('/api/bmi/trend', methods=['GET'])
+@jwt_required()
+async def get_bmi_trend():
+    try:
+        current_user_id = get_jwt_identity()
+        trend_args = parse_trend_args(request.args)
+
+        result = await services.bmi_model.get_bmi_trend(current_user_id, **trend_args)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 404
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Export BMI history as a streamed CSV or NDJSON download
+@app.route('/api/bmi/export', methods=['GET'])
+@jwt_required()
+async def export_bmi_history():
+    try:
+        current_user_id = get_jwt_identity()
+        export_format = parse_export_format(request.args)
+
+        records = services.bmi_model.iter_user_bmi_history(current_user_id)
+
+        async def generate():
+            if export_format == 'csv':
+                yield csv_header()
+                async for record in records:
+                    yield csv_row(record)
+            else:
+                async for record in records:
+                    yield app.json.dumps(record) + '\n'
+
+        return Response(
+            generate(),
+            mimetype=EXPORT_MIMETYPES[export_format],
+            headers=export_headers(export_format)
+        )
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Get BMI summary
+@app.route('/api/bmi/summary', methods=['GET'])
+@jwt_required()
+async def get_bmi_summary():
+    try:
+        current_user_id = get_jwt_identity()
+        result = await services.bmi_summary_model.get_summary(current_user_id)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 404
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Projected goal date from the running trend statistics, no history read
+@app.route('/api/bmi/forecast', methods=['GET'])
+@jwt_required()
+async def get_bmi_forecast():
+    try:
+        current_user_id = get_jwt_identity()
+
+        profile = await services.user_model.get_user_profile(current_user_id)
+        if not profile['success']:
+            return jsonify(profile), 404
+
+        result = await services.forecast_model.get_forecast(current_user_id, profile['user'])
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 404
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Get Latest BMI
+@app.route('/api/bmi/latest', methods=['GET'])
+@jwt_required()
+async def get_latest_bmi():
+    try:
+        current_user_id = get_jwt_identity()
+        result = await services.bmi_model.get_latest_bmi(current_user_id)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 404
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Import historical BMI records from an uploaded CSV or JSON-lines file
+# The upload is stored and imported by a background task, poll GET /api/bmi/import/<job_id> for its progress
+@app.route('/api/bmi/import', methods=['POST'])
+@jwt_required()
+async def import_bmi():
+    try:
+        current_user_id = get_jwt_identity()
+        upload = (await request.files).get('file')
+
+        if upload is None:
+            return jsonify({'success': False, 'message': 'File tidak ditemukan'}), 400
+
+        import_format = parse_import_format(request.args, upload.filename)
+
+        path = spool_file(import_format)
+        try:
+            await upload.save(path)
+            job = await services.import_jobs.create(current_user_id, import_format, upload.filename, import_stats())
+        except Exception:
+            os.remove(path)
+            raise
+
+        app.add_background_task(
+            run_import_job_async, services.bmi_model, services.import_jobs, job['_id'], current_user_id, path, import_format
+        )
+
+        response = jsonify({'success': True, 'message': 'Import sedang diproses', 'data': ImportJobs.format_job(job)})
+        response.headers['Location'] = f"{request.path}/{job['_id']}"
+        return response, 202
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Status and totals of one of the current user's import jobs
+@app.route('/api/bmi/import/<job_id>', methods=['GET'])
+@jwt_required()
+async def get_import_job(job_id):
+    try:
+        current_user_id = get_jwt_identity()
+        result = await services.import_jobs.get_job(job_id, current_user_id)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 404
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Food recommendations for the current user's goal, BMI category and target weight
+@app.route('/api/food/recommendations', methods=['GET'])
+@jwt_required()
+async def get_food_recommendations():
+    try:
+        current_user_id = get_jwt_identity()
+        recommendation_args = parse_recommendation_args(request.args)
+
+        profile = await services.user_model.get_user_profile(current_user_id)
+        if not profile['success']:
+            return jsonify(profile), 404
+
+        result = await asyncio.to_thread(services.food_model.recommend, profile['user'], **recommendation_args)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 500
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Daily meal plan for the current user's profile, shared per calorie bucket
+@app.route('/api/meal-plan', methods=['GET'])
+@jwt_required()
+async def get_meal_plan():
+    try:
+        current_user_id = get_jwt_identity()
+
+        profile = await services.user_model.get_user_profile(current_user_id)
+        if not profile['success']:
+            return jsonify(profile), 404
+
+        # Solving (or a Redis lookup of) the plan runs in a worker thread
+        result = await asyncio.to_thread(services.meal_plan_model.get_plan, profile['user'])
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Population BMI cohorts from the daily rollups (admins only)
+@app.route('/api/admin/analytics/bmi', methods=['GET'])
+@jwt_required()
+async def get_bmi_analytics():
+    try:
+        if not is_admin():
+            return jsonify({'success': False, 'message': 'Akses ditolak'}), 403
+
+        result = await services.analytics_model.query(**parse_analytics_args(request.args))
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 500
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+if __name__ == '__main__':
+    app.run(debug=True)
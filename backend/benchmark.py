@@ -0,0 +1,388 @@
+"""Performance benchmark and load test for the API
+
+Seeds users and BMI history, micro-benchmarks the model methods and drives
+concurrent load at the main routes, then writes p50/p95/p99 latency and
+throughput as JSON so runs can be compared between commits.
+
+    python benchmark.py --mongo-uri mongodb://localhost:27017/7sehat_fitamin_bench --output bench.json
+    python benchmark.py --in-memory                    # mongomock stand-in, no mongod needed (see below)
+    python benchmark.py --base-url http://localhost:5000 --skip-seed   # load a running server
+
+Use a dedicated database: the seed step drops the users and BMI collections.
+
+mongomock lacks some server features the app relies on, so --in-memory skips
+the derived-collection rebuilds after seeding and the dashboard and trend
+routes (listed under `skipped` in the report). Numbers from it only compare
+in-process overhead, use a real mongod for anything else.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import unittest.mock
+import urllib.error
+import urllib.request
+
+BENCH_PASSWORD = 'benchmark123'
+
+# Load scenarios mongomock cannot run, with the missing feature
+IN_MEMORY_UNSUPPORTED = {
+    'GET /api/dashboard': '$lookup with a sub-pipeline',
+    'GET /api/bmi/trend': '$dateTrunc',
+}
+
+# Seed steps mongomock cannot run (bulk_write with current PyMongo, $lookup sub-pipelines, $merge)
+IN_MEMORY_SKIPPED_SEED_STEPS = ['BMISummary.rebuild', 'Analytics.backfill', 'Forecast.rebuild']
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    """Latency stats in milliseconds plus throughput"""
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        'count': count,
+        'errors': errors,
+        'mean_ms': round(sum(latencies) / count * 1000, 3) if count else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3) if count else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3) if count else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3) if count else None,
+        'max_ms': round(latencies[-1] * 1000, 3) if count else None,
+        'throughput_rps': round(count / elapsed, 1) if elapsed else None,
+    }
+
+
+def time_calls(func, iterations):
+    """Call func repeatedly and summarize the latencies"""
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def seed(db, users, records_per_user, hasher):
+    """Insert benchmark users and their BMI history, return the list of (user_id, email)"""
+    from migrations import MIGRATIONS
+    from models.user import User
+
+    db.users.drop()
+    db.bmi_history.drop()
+    db.bmi_summary.drop()
+    db.bmi_rollups.drop()
+    db.bmi_profile_days.drop()
+    db.bmi_forecast.drop()
+    # The collections were dropped with their indexes, re-apply every (idempotent) migration
+    # before inserting, building the partial unique indexes over existing rows is not portable
+    for _, _, migrate in MIGRATIONS:
+        migrate(db)
+
+    # Hashing is deliberately slow, every benchmark user shares one hash
+    password_hash = hasher.hash(BENCH_PASSWORD)
+    user_documents = []
+    for i in range(users):
+        document = User.new_user_document(f'Bench User {i}', f'bench{i}@example.com', password_hash)
+        document.update({'age': 30, 'gender': 'Pria', 'height': 170, 'currentWeight': 70.0, 'targetWeight': 65.0})
+        user_documents.append(document)
+
+    inserted_ids = db.users.insert_many(user_documents).inserted_ids
+    seeded = [(str(user_id), document['email']) for user_id, document in zip(inserted_ids, user_documents)]
+
+    now = datetime.utcnow()
+    for user_id, _ in seeded:
+        batch = []
+        for day in range(records_per_user):
+            weight = round(random.uniform(55, 95), 1)
+            bmi = round(weight / 1.7 ** 2, 1)
+            batch.append({
+                'user_id': user_id,
+                'weight': weight,
+                'height': 170.0,
+                'bmi': bmi,
+                'bmi_status': 'Normal',
+                'notes': '',
+                'created_at': now - timedelta(days=day),
+            })
+        if batch:
+            db.bmi_history.insert_many(batch, ordered=False)
+
+    return seeded
+
+
+def run_micro(services, seeded, iterations, in_memory=False):
+    """Micro-benchmarks of the model methods the routes are built on"""
+    user_ids = [user_id for user_id, _ in seeded]
+    bmi_model = services.bmi_model
+    user_model = services.user_model
+
+    results = {
+        'BMI.calculate_bmi': time_calls(lambda: bmi_model.calculate_bmi(70, 170), iterations),
+        'BMI.get_user_bmi_history': time_calls(
+            lambda: bmi_model.get_user_bmi_history(random.choice(user_ids)), iterations
+        ),
+    }
+
+    # Profile reads with and without the cache in front of Mongo
+    cache = user_model.cache
+    user_model.cache = None
+    results['User.get_user_profile (no cache)'] = time_calls(
+        lambda: user_model.get_user_profile(random.choice(user_ids)), iterations
+    )
+    user_model.cache = cache
+    if cache is not None:
+        results['User.get_user_profile (cached)'] = time_calls(
+            lambda: user_model.get_user_profile(random.choice(user_ids)), iterations
+        )
+
+    profile = {'fitnessGoal': 'Menurunkan Berat', 'bmi_status': 'Kelebihan Berat', 'currentWeight': 80, 'targetWeight': 70}
+    results['Food.recommend'] = time_calls(lambda: services.food_model.recommend(profile, k=10), iterations)
+
+    # Solver cost on a miss against the shared per-bucket plan
+    meal_plan_model = services.meal_plan_model
+    profile = dict(profile, age=30, gender='Pria', height=170)
+    meal_plan_cache = meal_plan_model.cache
+    meal_plan_model.cache = None
+    results['MealPlan.get_plan (solve)'] = time_calls(lambda: meal_plan_model.get_plan(profile), iterations)
+    meal_plan_model.cache = meal_plan_cache
+    results['MealPlan.get_plan (cached)'] = time_calls(lambda: meal_plan_model.get_plan(profile), iterations)
+
+    # Direct inserts against the write-behind buffer, the buffered throughput includes draining it
+    write_buffer = bmi_model.write_buffer
+    bmi_model.write_buffer = None
+    results['BMI.save_bmi (direct)'] = time_calls(
+        lambda: bmi_model.save_bmi(random.choice(user_ids), 70, 170), iterations
+    )
+
+    if in_memory:
+        # Batches update the derived collections with bulk_write
+        results['BMI.save_bmi (write-behind)'] = {'skipped': 'bulk_write'}
+    else:
+        buffer = bmi_model.start_write_behind()
+        started = time.perf_counter()
+        buffered = time_calls(lambda: bmi_model.save_bmi(random.choice(user_ids), 70, 170), iterations)
+        buffer.close()
+        buffered['drained_throughput_rps'] = round(iterations / (time.perf_counter() - started), 1)
+        buffered['batches'] = buffer.stats['batches']
+        results['BMI.save_bmi (write-behind)'] = buffered
+    bmi_model.write_buffer = write_buffer
+
+    return results
+
+
+class InProcessClient:
+    """Sends requests through the Flask test client, one client per thread"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        with self.app.test_client() as client:
+            response = client.open(path, method=method, json=body, headers=headers)
+            return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    """Sends requests to a running server"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+def run_load(client, emails, requests_per_route, concurrency, unsupported=None):
+    """Concurrent load on the main routes, one summary per route
+
+    Routes in unsupported ({name: reason}) are reported as skipped instead of run.
+    """
+    tokens = []
+    for email in emails[:concurrency]:
+        status, body = client.request('POST', '/api/auth/login', {'email': email, 'password': BENCH_PASSWORD})
+        if status == 200:
+            tokens.append(body['token'])
+    if not tokens:
+        raise RuntimeError('Login failed for every benchmark user, seed first or check --base-url')
+
+    scenarios = {
+        'POST /api/auth/login': lambda i: client.request(
+            'POST', '/api/auth/login', {'email': emails[i % len(emails)], 'password': BENCH_PASSWORD}
+        ),
+        'POST /api/bmi/save': lambda i: client.request(
+            'POST', '/api/bmi/save', {'weight': 70 + i % 10, 'height': 170}, tokens[i % len(tokens)]
+        ),
+        'GET /api/bmi/history': lambda i: client.request(
+            'GET', '/api/bmi/history', token=tokens[i % len(tokens)]
+        ),
+        'GET /api/user/profile': lambda i: client.request(
+            'GET', '/api/user/profile', token=tokens[i % len(tokens)]
+        ),
+        'GET /api/dashboard': lambda i: client.request(
+            'GET', '/api/dashboard', token=tokens[i % len(tokens)]
+        ),
+        'GET /api/bmi/trend': lambda i: client.request(
+            'GET', '/api/bmi/trend?bucket=week', token=tokens[i % len(tokens)]
+        ),
+    }
+
+    results = {}
+    for name, scenario in scenarios.items():
+        if name in (unsupported or {}):
+            results[name] = {'skipped': unsupported[name]}
+            continue
+
+        def timed(i):
+            started = time.perf_counter()
+            try:
+                status, _ = scenario(i)
+                ok = status < 400
+            except Exception:
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(timed, range(requests_per_route)))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, ok in outcomes if ok]
+        results[name] = summarize(latencies, len(outcomes) - len(latencies), elapsed)
+
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the 7sehat_fitamin API')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/7sehat_fitamin_bench')
+    parser.add_argument('--in-memory', action='store_true', help='use mongomock instead of a mongod')
+    parser.add_argument('--base-url', help='load a running server instead of the in-process app')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--records-per-user', type=int, default=365)
+    parser.add_argument('--iterations', type=int, default=1000, help='calls per micro-benchmark')
+    parser.add_argument('--requests', type=int, default=500, help='requests per route in the load test')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--skip-seed', action='store_true')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for reproducible data')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    random.seed(args.seed)
+
+    os.environ['MONGO_URI'] = args.mongo_uri
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret')
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret')
+
+    patch = contextlib.nullcontext()
+    if args.in_memory:
+        # mongomock is an optional dependency, only needed for the in-memory stand-in. Flask-PyMongo
+        # creates its client from its own module namespace, so the class is replaced there.
+        import mongomock
+        patch = unittest.mock.patch('flask_pymongo.MongoClient', mongomock.MongoClient)
+
+    with patch:
+        # Cold start: module imports, then the app factory (services are created later, on first use)
+        started = time.perf_counter()
+        from app import create_app
+        from metrics import max_rss_bytes
+        imported = time.perf_counter()
+        app = create_app()
+        services = app.extensions['services']
+        startup = {
+            'import_seconds': round(imported - started, 3),
+            'create_app_seconds': round(time.perf_counter() - imported, 3),
+            'max_rss_bytes': max_rss_bytes(),
+        }
+
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'timestamp': datetime.utcnow().isoformat(),
+                'python': platform.python_version(),
+                'in_memory': args.in_memory,
+                'base_url': args.base_url,
+                'users': args.users,
+                'records_per_user': args.records_per_user,
+                'iterations': args.iterations,
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+            },
+            'startup': startup,
+        }
+
+        db = services.mongo.db
+        if args.skip_seed:
+            seeded = [(str(user['_id']), user['email']) for user in db.users.find({'email': {'$regex': '^bench'}}, {'email': 1})]
+        else:
+            started = time.perf_counter()
+            seeded = seed(db, args.users, args.records_per_user, services.password_hasher)
+            if args.in_memory:
+                report['meta']['skipped'] = IN_MEMORY_SKIPPED_SEED_STEPS
+            else:
+                services.bmi_summary_model.rebuild(services.bmi_model.collection)
+                services.analytics_model.backfill(services.bmi_model.collection)
+                services.forecast_model.rebuild(services.bmi_model.collection)
+            report['meta']['seed_seconds'] = round(time.perf_counter() - started, 3)
+
+        if not args.skip_micro:
+            report['micro'] = run_micro(services, seeded, args.iterations, in_memory=args.in_memory)
+
+        if not args.skip_load:
+            client = HttpClient(args.base_url) if args.base_url else InProcessClient(app)
+            report['load'] = run_load(
+                client, [email for _, email in seeded], args.requests, args.concurrency,
+                unsupported=IN_MEMORY_UNSUPPORTED if args.in_memory and not args.base_url else None
+            )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
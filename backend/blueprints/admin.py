@@ -0,0 +1,35 @@
+"""Admin-only endpoints"""
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+
+from extensions import services
+from models.user import User
+from validation import ValidationError, parse_analytics_args
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+
+
+# Admins are listed by email in ADMIN_EMAILS and checked against the token's profile snapshot
+def is_admin():
+    user = User.profile_from_claims(get_jwt_identity(), get_jwt())
+    return user is not None and user['email'].lower() in current_app.config['ADMIN_EMAILS']
+
+# Population BMI cohorts from the daily rollups (admins only)
+@admin_bp.route('/analytics/bmi', methods=['GET'])
+@jwt_required()
+def get_bmi_analytics():
+    try:
+        if not is_admin():
+            return jsonify({'success': False, 'message': 'Akses ditolak'}), 403
+
+        result = services.analytics_model.query(**parse_analytics_args(request.args))
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 500
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
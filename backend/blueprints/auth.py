@@ -0,0 +1,87 @@
+"""Registration, login and token refresh"""
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from extensions import services
+from hashing import HasherBusy
+from validation import ValidationError, validate_register, validate_login
+
+auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
+
+
+# Register user
+@auth_bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'GET':
+        return jsonify({'message': 'Register endpoint ready', 'method': 'POST'})
+    
+    try:
+        data = request.get_json()
+
+        # Validate input
+        validate_register(data)
+        
+        # Register user
+        result = services.user_model.create_user(
+            name=data['name'],
+            email=data['email'],
+            password=data['password']
+        )
+
+        if result['success']:
+            return jsonify(result), 201
+        else:
+            return jsonify(result), 400
+    
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except HasherBusy:
+        return jsonify({'success': False, 'message': 'Server sedang sibuk, coba lagi nanti'}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+    
+# Login user
+@auth_bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'GET':
+        return jsonify({'message': 'Login endpoint ready', 'method': 'POST'})
+    
+    try:
+        data = request.get_json()
+
+        # Validate input
+        validate_login(data)
+
+        # Login user
+        result = services.user_model.login_user(
+            email=data['email'],
+            password=data['password']
+        )
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except HasherBusy:
+        return jsonify({'success': False, 'message': 'Server sedang sibuk, coba lagi nanti'}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Reissue a short-lived access token with a fresh profile snapshot
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    try:
+        current_user_id = get_jwt_identity()
+        result = services.user_model.refresh_access_token(current_user_id)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 401
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
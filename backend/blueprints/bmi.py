@@ -0,0 +1,246 @@
+"""BMI records: saving, history, trends, export and import"""
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from extensions import services
+from conditional import make_etag, not_modified, with_etag
+from validation import (
+    ValidationError, validate_save_bmi, validate_batch, parse_history_args, parse_trend_args,
+    parse_export_format, parse_import_format
+)
+from export import EXPORT_MIMETYPES, csv_header, csv_row, export_headers
+from bmi_import import import_stats, spool_file, start_import_job
+from models.import_jobs import ImportJobs
+from write_buffer import BufferFull
+import os
+
+bmi_bp = Blueprint('bmi', __name__, url_prefix='/api/bmi')
+
+
+# Save BMI
+@bmi_bp.route('/save', methods=['POST'])
+@jwt_required()
+def save_bmi():
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
+
+        # Validate input
+        validate_save_bmi(data)
+        
+        # Save BMI
+        result = services.bmi_model.save_bmi(
+            user_id=current_user_id,
+            weight=data['weight'],
+            height=data['height'],
+            notes=data.get('notes', '')
+        )
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except BufferFull:
+        return jsonify({'success': False, 'message': 'Server sedang sibuk, coba lagi nanti'}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Calculate BMI for many weight/height pairs in one request (nothing is saved)
+@bmi_bp.route('/calculate-batch', methods=['POST'])
+@jwt_required()
+def calculate_bmi_batch():
+    try:
+        data = request.get_json()
+
+        # Validate input
+        validate_batch(data)
+
+        return jsonify(services.bmi_model.score_batch(data['weights'], data['heights'])), 200
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Get BMI history
+@bmi_bp.route('/history', methods=['GET'])
+@jwt_required()
+def get_bmi_history():
+    try:
+        current_user_id = get_jwt_identity()
+
+        # Validate pagination and filter parameters
+        history_args = parse_history_args(request.args)
+
+        # Answer If-None-Match from the history version alone
+        version = services.user_versions.get_version(current_user_id, 'history')
+        etag = make_etag('history', current_user_id, version, request.query_string) if version is not None else None
+        if etag and not_modified(request, etag):
+            return with_etag(Response(status=304), etag)
+
+        result = services.bmi_model.get_user_bmi_history(current_user_id, **history_args)
+        
+        if result['success']:
+            response = jsonify(result)
+            return (with_etag(response, etag) if etag else response), 200
+        else:
+            return jsonify(result), 404
+            
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Get BMI trend downsampled to day/week/month buckets
+@bmi_bp.route('/trend', methods=['GET'])
+@jwt_required()
+def get_bmi_trend():
+    try:
+        current_user_id = get_jwt_identity()
+        trend_args = parse_trend_args(request.args)
+
+        result = services.bmi_model.get_bmi_trend(current_user_id, **trend_args)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 404
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Export BMI history as a streamed CSV or NDJSON download
+@bmi_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_bmi_history():
+    try:
+        current_user_id = get_jwt_identity()
+        export_format = parse_export_format(request.args)
+
+        records = services.bmi_model.iter_user_bmi_history(current_user_id)
+
+        def generate():
+            if export_format == 'csv':
+                yield csv_header()
+                for record in records:
+                    yield csv_row(record)
+            else:
+                for record in records:
+                    yield current_app.json.dumps(record) + '\n'
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype=EXPORT_MIMETYPES[export_format],
+            headers=export_headers(export_format)
+        )
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Get BMI summary
+@bmi_bp.route('/summary', methods=['GET'])
+@jwt_required()
+def get_bmi_summary():
+    try:
+        current_user_id = get_jwt_identity()
+        result = services.bmi_summary_model.get_summary(current_user_id)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 404
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Projected goal date from the running trend statistics, no history read
+@bmi_bp.route('/forecast', methods=['GET'])
+@jwt_required()
+def get_bmi_forecast():
+    try:
+        current_user_id = get_jwt_identity()
+
+        profile = services.user_model.get_user_profile(current_user_id)
+        if not profile['success']:
+            return jsonify(profile), 404
+
+        result = services.forecast_model.get_forecast(current_user_id, profile['user'])
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 404
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Get Latest BMI
+@bmi_bp.route('/latest', methods=['GET'])
+@jwt_required()
+def get_latest_bmi():
+    try:
+        current_user_id = get_jwt_identity()
+        result = services.bmi_model.get_latest_bmi(current_user_id)
+        
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 404
+            
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Import historical BMI records from an uploaded CSV or JSON-lines file
+# The upload is stored and imported by a background job, poll GET /import/<job_id> for its progress
+@bmi_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_bmi():
+    try:
+        current_user_id = get_jwt_identity()
+        upload = request.files.get('file')
+
+        if upload is None:
+            return jsonify({'success': False, 'message': 'File tidak ditemukan'}), 400
+
+        import_format = parse_import_format(request.args, upload.filename)
+
+        path = spool_file(import_format)
+        try:
+            upload.save(path)
+            job = services.import_jobs.create(current_user_id, import_format, upload.filename, import_stats())
+        except Exception:
+            os.remove(path)
+            raise
+
+        start_import_job(services.bmi_model, services.import_jobs, job['_id'], current_user_id, path, import_format)
+
+        response = jsonify({'success': True, 'message': 'Import sedang diproses', 'data': ImportJobs.format_job(job)})
+        response.headers['Location'] = f"{request.path}/{job['_id']}"
+        return response, 202
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Status and totals of one of the current user's import jobs
+@bmi_bp.route('/import/<job_id>', methods=['GET'])
+@jwt_required()
+def get_import_job(job_id):
+    try:
+        current_user_id = get_jwt_identity()
+        result = services.import_jobs.get_job(job_id, current_user_id)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 404
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
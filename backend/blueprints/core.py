@@ -0,0 +1,47 @@
+"""Root, health probes and Prometheus metrics"""
+from flask import Blueprint, Response, current_app
+
+from extensions import services
+from metrics import max_rss_bytes
+
+core_bp = Blueprint('core', __name__)
+
+
+# Test route
+@core_bp.route('/')
+def hello():
+    return {'message': 'Flask Backend 7sehat_fitamin with MongoDB is running!'}
+
+# Liveness probe, no I/O
+@core_bp.route('/healthz')
+def healthz():
+    return {'status': 'ok'}
+
+# Readiness probe, a cached MongoDB ping (no writes)
+@core_bp.route('/readyz')
+def readyz():
+    ok, error = services.readiness_probe.status()
+    if ok:
+        return {'status': 'ok'}
+    return {'status': 'unavailable', 'error': error}, 503
+
+# Prometheus metrics, services that were never used are left out instead of being created here
+@core_bp.route('/metrics')
+def get_metrics():
+    gauges = {'app_startup_seconds': ('Time spent in create_app', current_app.config['STARTUP_SECONDS'])}
+    if max_rss_bytes() is not None:
+        gauges['process_max_rss_bytes'] = ('Peak resident memory of this worker', max_rss_bytes())
+    if services.created('profile_cache'):
+        cache_stats = services.profile_cache.stats()
+        gauges['profile_cache_hits'] = ('Profile cache hits', cache_stats['hits'])
+        gauges['profile_cache_misses'] = ('Profile cache misses', cache_stats['misses'])
+        gauges['profile_cache_evictions'] = ('Profile cache evictions', cache_stats['evictions'])
+    if services.created('meal_plan_cache'):
+        meal_plan_stats = services.meal_plan_cache.stats()
+        gauges['meal_plan_cache_hits'] = ('Meal plan cache hits', meal_plan_stats['hits'])
+        gauges['meal_plan_cache_misses'] = ('Meal plan cache misses', meal_plan_stats['misses'])
+    if services.created('bmi_model') and services.bmi_model.write_buffer is not None:
+        gauges['bmi_write_buffer_pending'] = ('BMI records waiting in the write buffer', services.bmi_model.write_buffer.pending())
+        gauges['bmi_write_buffer_failed'] = ('BMI records the write buffer failed to insert', services.bmi_model.write_buffer.stats['failed'])
+    body = services.metrics.render(gauges)
+    return Response(body, mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,120 @@
+"""Unauthenticated test routes, only registered in debug mode or with ENABLE_TEST_ROUTES=true
+
+They write dummy users and list every user, so they never ship in production.
+"""
+from flask import Blueprint, jsonify
+
+from extensions import services
+
+dev_bp = Blueprint('dev', __name__)
+
+
+# Test MongoDB connection
+@dev_bp.route('/test-db')
+def test_db():
+    try:
+        # Test insert
+        result = services.mongo.db.test.insert_one({'message': 'MongoDB connected!'})
+        return {'success': True, 'message': 'MongoDB connected successfully!'}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+# Test Register
+@dev_bp.route('/test-register')
+def test_register():
+    try:
+        # Data dummy untuk test
+        result = services.user_model.create_user(
+            name="Test User",
+            email="test@example.com", 
+            password="password123"
+        )
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+# Test Login 
+@dev_bp.route('/test-login')
+def test_login():
+    try:
+        # Login dengan data dummy
+        result = services.user_model.login_user(
+            email="test@example.com",
+            password="password123"
+        )
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+# Test Profile Routes (no auth)
+@dev_bp.route('/test-profile')
+def test_profile():
+    try:
+        # Ambil user pertama dari database untuk test
+        test_user = services.mongo.db.users.find_one()
+        if not test_user:
+            return jsonify({'success': False, 'message': 'No users found. Register first.'})
+        
+        user_id = str(test_user['_id'])
+        result = services.user_model.get_user_profile(user_id)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+# Test Update Profile (no auth)
+@dev_bp.route('/test-update-profile')
+def test_update_profile():
+    try:
+        # Ambil user pertama dari database untuk test
+        test_user = services.mongo.db.users.find_one()
+        if not test_user:
+            return jsonify({'success': False, 'message': 'No users found. Register first.'})
+        
+        user_id = str(test_user['_id'])
+        
+        # Test data
+        test_data = {
+            'name': 'John Doe Updated',
+            'age': 25,
+            'gender': 'Pria',
+            'height': 175,
+            'currentWeight': 70.5,
+            'targetWeight': 65.0,
+            'fitnessGoal': 'Menurunkan Berat'
+        }
+        
+        result = services.user_model.update_user_profile(user_id, test_data)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+# Test List Users
+@dev_bp.route('/test-list-users')
+def test_list_users():
+    try:
+        users = list(services.mongo.db.users.find({}, {'password': 0}))  # Exclude password
+        # Convert ObjectId to string
+        for user in users:
+            user['_id'] = str(user['_id'])
+        return jsonify({'success': True, 'users': users})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+# Test Save BMI
+@dev_bp.route('/test-bmi')
+def test_bmi():
+    try:
+        # Test calculate BMI
+        bmi, status = services.bmi_model.calculate_bmi(70, 170)
+        
+        return jsonify({
+            'success': True,
+            'test_data': {
+                'weight': 70,
+                'height': 170,
+                'bmi': bmi,
+                'status': status
+            }
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
@@ -0,0 +1,127 @@
+"""Profile, dashboard and nutrition endpoints of the current user"""
+from flask import Blueprint, Response, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+
+from extensions import services
+from models.user import User
+from conditional import make_etag, not_modified, with_etag
+from validation import ValidationError, validate_profile_update, parse_recent_limit, parse_recommendation_args
+
+user_bp = Blueprint('user', __name__, url_prefix='/api')
+
+
+# Current user from the access token's profile snapshot, no database read
+@user_bp.route('/me', methods=['GET'])
+@jwt_required()
+def get_me():
+    user = User.profile_from_claims(get_jwt_identity(), get_jwt())
+
+    if user is None:
+        return jsonify({'success': False, 'message': 'Token tidak memuat profil, silakan refresh token'}), 401
+    return jsonify({'success': True, 'user': user}), 200
+
+# Get user profile
+@user_bp.route('/user/profile', methods=['GET'])
+@jwt_required()
+def get_user_profile():
+    try:
+        current_user_id = get_jwt_identity()
+        result = services.user_model.get_user_profile(current_user_id)
+        
+        if result['success']:
+            etag = make_etag('profile', current_user_id, result['user'].get('version', 0))
+            if not_modified(request, etag):
+                return with_etag(Response(status=304), etag)
+            return with_etag(jsonify(result), etag), 200
+        else:
+            return jsonify(result), 404
+            
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Update user profile
+@user_bp.route('/user/profile', methods=['PUT'])
+@jwt_required()
+def update_user_profile():
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
+        
+        validate_profile_update(data)
+        
+        result = services.user_model.update_user_profile(current_user_id, data)
+        
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+            
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+    
+# Get dashboard data (profile, latest BMI, recent trend) in one request
+@user_bp.route('/dashboard', methods=['GET'])
+@jwt_required()
+def get_dashboard():
+    try:
+        current_user_id = get_jwt_identity()
+        recent_limit = parse_recent_limit(request.args)
+
+        result = services.dashboard_model.get_dashboard(current_user_id, recent_limit)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 404
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Food recommendations for the current user's goal, BMI category and target weight
+@user_bp.route('/food/recommendations', methods=['GET'])
+@jwt_required()
+def get_food_recommendations():
+    try:
+        current_user_id = get_jwt_identity()
+        recommendation_args = parse_recommendation_args(request.args)
+
+        profile = services.user_model.get_user_profile(current_user_id)
+        if not profile['success']:
+            return jsonify(profile), 404
+
+        result = services.food_model.recommend(profile['user'], **recommendation_args)
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 500
+
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
+
+# Daily meal plan for the current user's profile, shared per calorie bucket
+@user_bp.route('/meal-plan', methods=['GET'])
+@jwt_required()
+def get_meal_plan():
+    try:
+        current_user_id = get_jwt_identity()
+
+        profile = services.user_model.get_user_profile(current_user_id)
+        if not profile['success']:
+            return jsonify(profile), 404
+
+        result = services.meal_plan_model.get_plan(profile['user'])
+
+        if result['success']:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 400
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Terjadi kesalahan server'}), 500
@@ -0,0 +1,292 @@
+"""Streaming import of historical BMI records from CSV or JSON-lines files
+
+Rows are read incrementally and handled in fixed-size chunks: each chunk is
+validated and scored with the vectorized BMI calculation, deduplicated against
+the user's stored (user_id, created_at) pairs and written with unordered
+insert_many batches, so memory stays bounded by the chunk size whatever the
+file size.
+
+CSV files need a header with date (or created_at), weight and height columns and
+an optional notes column; JSON-lines files hold one object with the same keys per line.
+
+Uploads through the API are spooled to a temporary file and imported by a
+background job (see models/import_jobs.py) that records progress per chunk, so
+large files are not bound by the request timeout. The spool file's mtime is
+touched with every chunk too: files of jobs whose worker died are removed once
+they are older than ImportJobs.STALE_AFTER.
+"""
+from datetime import datetime, timezone
+from itertools import islice
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+from models.bmi_calculator import to_float_array
+from models.import_jobs import ImportJobs
+
+IMPORT_FORMATS = ['csv', 'jsonl']
+DEFAULT_CHUNK_SIZE = 5000
+
+# Longest notes kept per record
+MAX_NOTES_LENGTH = 500
+
+# Name prefix of spooled uploads
+SPOOL_PREFIX = 'bmi-import-'
+
+
+def detect_format(filename, default='csv'):
+    """Import format from a file name extension"""
+    if filename and filename.lower().endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if filename and filename.lower().endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def text_stream(binary_stream):
+    """Decode a binary file stream lazily, a BOM written by spreadsheet tools is skipped"""
+    return io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+
+
+def iter_rows(stream, import_format):
+    """Yield one dict per record, None for lines that cannot be parsed"""
+    if import_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else None
+
+
+def iter_chunks(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_created_at(value):
+    """ISO 8601 date or datetime to naive UTC, truncated to the milliseconds MongoDB stores"""
+    if isinstance(value, (int, float)) or not value:
+        raise ValueError('Invalid date')
+    parsed = datetime.fromisoformat(str(value).strip())
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.replace(microsecond=parsed.microsecond // 1000 * 1000)
+
+
+def prepare_chunk(bmi_model, user_id, rows):
+    """Validate and score a chunk in one vectorized pass, return (records, invalid count)
+
+    Rows with an unparsable date or a weight/height that BMI.calculate_bmi would
+    reject are counted as invalid; repeated dates inside the chunk keep the first row.
+    """
+    dates = []
+    weights = []
+    heights = []
+
+    for row in rows:
+        row = row or {}
+        try:
+            dates.append(parse_created_at(row.get('date') or row.get('created_at')))
+        except (TypeError, ValueError):
+            dates.append(None)
+        weights.append(row.get('weight'))
+        heights.append(row.get('height'))
+
+    # Same rules as BMI.calculate_bmi, one call for the whole chunk (unparsable values become NaN)
+    weights = to_float_array(weights)
+    heights = to_float_array(heights)
+    bmi, status, valid = bmi_model.calculate_bmi_batch(weights, heights)
+
+    records = []
+    seen = set()
+    invalid = 0
+    for i, row in enumerate(rows):
+        created_at = dates[i]
+        if created_at is None or not valid[i]:
+            invalid += 1
+            continue
+        if created_at in seen:
+            continue
+        seen.add(created_at)
+
+        records.append({
+            'user_id': user_id,
+            'weight': float(weights[i]),
+            'height': float(heights[i]),
+            'bmi': float(bmi[i]),
+            'bmi_status': str(status[i]),
+            'notes': str((row or {}).get('notes') or '')[:MAX_NOTES_LENGTH],
+            'created_at': created_at,
+        })
+
+    return records, invalid
+
+
+def import_stats():
+    return {'rows': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0, 'chunks': 0}
+
+
+def add_chunk_stats(stats, rows, invalid, inserted):
+    stats['chunks'] += 1
+    stats['rows'] += rows
+    stats['invalid'] += invalid
+    stats['inserted'] += inserted
+    # Skipped as already stored or repeated inside the chunk
+    stats['duplicates'] += rows - invalid - inserted
+
+
+def prepare_next_chunk(bmi_model, user_id, chunks):
+    """Read and score the next chunk, return (row count, records, invalid count) or None at the end"""
+    rows = next(chunks, None)
+    if rows is None:
+        return None
+    records, invalid = prepare_chunk(bmi_model, user_id, rows)
+    return len(rows), records, invalid
+
+
+def run_import(bmi_model, user_id, stream, import_format, chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None):
+    """Import every record of a text stream for a user, return the totals
+
+    on_progress(stats) is called after every chunk.
+    """
+    stats = import_stats()
+    chunks = iter_chunks(iter_rows(stream, import_format), chunk_size)
+
+    while True:
+        chunk = prepare_next_chunk(bmi_model, user_id, chunks)
+        if chunk is None:
+            return stats
+
+        rows, records, invalid = chunk
+        inserted = bmi_model.import_records(user_id, records)
+        add_chunk_stats(stats, rows, invalid, inserted)
+        if on_progress is not None:
+            on_progress(stats)
+
+
+async def run_import_async(bmi_model, user_id, stream, import_format, chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None):
+    """run_import for the async BMI model (AsyncBMI)
+
+    Reading, parsing and scoring a chunk is file I/O and CPU work, it runs in a
+    worker thread so the event loop only waits on the inserts.
+    """
+    stats = import_stats()
+    chunks = iter_chunks(iter_rows(stream, import_format), chunk_size)
+
+    while True:
+        chunk = await asyncio.to_thread(prepare_next_chunk, bmi_model, user_id, chunks)
+        if chunk is None:
+            return stats
+
+        rows, records, invalid = chunk
+        inserted = await bmi_model.import_records(user_id, records)
+        add_chunk_stats(stats, rows, invalid, inserted)
+        if on_progress is not None:
+            on_progress(stats)
+
+
+def spool_dir():
+    """Directory of spooled uploads, BMI_IMPORT_SPOOL_DIR overrides the temporary directory"""
+    return os.getenv('BMI_IMPORT_SPOOL_DIR') or tempfile.gettempdir()
+
+
+def remove_stale_spool_files(max_age=ImportJobs.STALE_AFTER):
+    """Remove spooled uploads left by jobs whose worker stopped, return how many were removed"""
+    cutoff = time.time() - max_age.total_seconds()
+    removed = 0
+    for entry in os.scandir(spool_dir()):
+        try:
+            if entry.name.startswith(SPOOL_PREFIX) and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            # Finished and removed by its job meanwhile
+            continue
+    return removed
+
+
+def spool_file(import_format):
+    """Path of a new temporary file for an upload waiting to be imported"""
+    remove_stale_spool_files()
+    fd, path = tempfile.mkstemp(prefix=SPOOL_PREFIX, suffix=f'.{import_format}', dir=spool_dir())
+    os.close(fd)
+    return path
+
+
+def run_import_job(bmi_model, jobs, job_id, user_id, path, import_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Import a spooled upload, recording progress and the outcome on the job, then remove the file"""
+    progress = import_stats()
+
+    def on_progress(stats):
+        progress.update(stats)
+        jobs.progress(job_id, stats)
+        # Heartbeat of the spool file, see remove_stale_spool_files
+        os.utime(path)
+
+    try:
+        with open(path, 'rb') as upload:
+            stats = run_import(bmi_model, user_id, text_stream(upload), import_format, chunk_size, on_progress)
+        jobs.finish(job_id, stats)
+    except UnicodeDecodeError:
+        jobs.finish(job_id, progress, error='File harus berformat UTF-8')
+    except Exception as e:
+        print(f"Error importing BMI file: {str(e)}")
+        jobs.finish(job_id, progress, error='Terjadi kesalahan saat import')
+    finally:
+        os.remove(path)
+
+
+def start_import_job(bmi_model, jobs, job_id, user_id, path, import_format):
+    """Run an import job in a background thread of this worker"""
+    thread = threading.Thread(
+        target=run_import_job, args=(bmi_model, jobs, job_id, user_id, path, import_format),
+        name=f'bmi-import-{job_id}', daemon=True
+    )
+    thread.start()
+    return thread
+
+
+async def run_import_job_async(bmi_model, jobs, job_id, user_id, path, import_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """run_import_job for the async models (AsyncBMI, AsyncImportJobs), run as a Quart background task
+
+    Chunks are read and scored in a worker thread like in run_import_async, and
+    the job is updated after each chunk.
+    """
+    progress = import_stats()
+
+    try:
+        with open(path, 'rb') as upload:
+            chunks = iter_chunks(iter_rows(text_stream(upload), import_format), chunk_size)
+            while True:
+                chunk = await asyncio.to_thread(prepare_next_chunk, bmi_model, user_id, chunks)
+                if chunk is None:
+                    break
+
+                rows, records, invalid = chunk
+                inserted = await bmi_model.import_records(user_id, records)
+                add_chunk_stats(progress, rows, invalid, inserted)
+                await jobs.progress(job_id, progress)
+                os.utime(path)
+        await jobs.finish(job_id, progress)
+    except UnicodeDecodeError:
+        await jobs.finish(job_id, progress, error='File harus berformat UTF-8')
+    except Exception as e:
+        print(f"Error importing BMI file: {str(e)}")
+        await jobs.finish(job_id, progress, error='Terjadi kesalahan saat import')
+    finally:
+        os.remove(path)
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+import asyncio
+import json
+import threading
+import time
+
+
+class TTLCache:
+    """Bounded in-process cache with LRU eviction and per-entry time to live"""
+
+    # Lookups are dict operations under a short lock, safe to call from the event loop
+    blocking = False
+
+    def __init__(self, max_size=10000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class RedisCache:
+    """Shared cache on Redis so every worker sees the same entries, same interface as TTLCache"""
+
+    # Every call is a network round trip
+    blocking = True
+
+    def __init__(self, client, ttl=300, prefix='cache:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return json.loads(raw)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+    def stats(self):
+        # Redis evicts and expires on its own, only local hit/miss counts are known here
+        with self._lock:
+            return {
+                'backend': 'redis',
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': 0,
+                'expirations': 0,
+            }
+
+
+async def call_cache(method, *args):
+    """Call a cache method from async code, in a worker thread when the cache does network I/O"""
+    if method.__self__.blocking:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+
+def create_cache(max_size=10000, ttl=300, redis_url=None, prefix='cache:'):
+    """Create a shared Redis cache when redis_url is set, otherwise an in-process one"""
+    if redis_url:
+        # redis is an optional dependency, only needed for the shared backend
+        import redis
+        return RedisCache(redis.Redis.from_url(redis_url), ttl=ttl, prefix=prefix)
+
+    return TTLCache(max_size=max_size, ttl=ttl)
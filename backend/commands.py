@@ -0,0 +1,70 @@
+"""Maintenance commands (flask migrate, flask import-bmi, ...), registered by create_app"""
+from flask import Blueprint
+import click
+
+from extensions import services
+from models.bmi import BMI
+from migrations import run_migrations, check_indexes, migrate_bmi_to_timeseries
+from bmi_import import IMPORT_FORMATS, DEFAULT_CHUNK_SIZE, detect_format, text_stream, run_import
+
+# cli_group=None registers them as `flask migrate`, not `flask commands migrate`
+commands_bp = Blueprint('commands', __name__, cli_group=None)
+
+
+# CLI: flask migrate, the pre-deploy step: app workers never apply migrations themselves
+@commands_bp.cli.command('migrate')
+def migrate_command():
+    applied = run_migrations(services.mongo.db)
+    print(f"Applied migrations: {applied}" if applied else 'Schema is up to date')
+
+# CLI: flask check-indexes
+@commands_bp.cli.command('check-indexes')
+def check_indexes_command():
+    failures = check_indexes(services.mongo.db, services.bmi_model.collection.name)
+    for failure in failures:
+        print(f"COLLSCAN on {failure['collection']}: query={failure['query']} sort={failure['sort']}")
+    if failures:
+        raise SystemExit(1)
+    print('All model queries use an index')
+
+# CLI: flask rebuild-bmi-summaries
+@commands_bp.cli.command('rebuild-bmi-summaries')
+def rebuild_bmi_summaries_command():
+    users = services.bmi_summary_model.rebuild(services.bmi_model.collection)
+    print(f"Rebuilt BMI summaries for {users} users")
+
+# CLI: flask rebuild-bmi-forecasts
+@commands_bp.cli.command('rebuild-bmi-forecasts')
+def rebuild_bmi_forecasts_command():
+    users = services.forecast_model.rebuild(services.bmi_model.collection)
+    print(f"Rebuilt BMI forecasts for {users} users")
+
+# CLI: flask backfill-bmi-rollups
+@commands_bp.cli.command('backfill-bmi-rollups')
+def backfill_bmi_rollups_command():
+    rollups = services.analytics_model.backfill(services.bmi_model.collection)
+    print(f"Rebuilt {rollups} BMI rollup documents")
+
+# CLI: flask import-bmi USER_ID FILE
+@commands_bp.cli.command('import-bmi')
+@click.argument('user_id')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'import_format', type=click.Choice(IMPORT_FORMATS), help='Default: from the file extension')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True)
+def import_bmi_command(user_id, path, import_format, chunk_size):
+    if 'id' not in (services.user_model.get_user_by_id(user_id) or {}):
+        raise SystemExit(f"User {user_id} not found")
+
+    def report(stats):
+        print(f"Chunk {stats['chunks']}: {stats['rows']} rows read, {stats['inserted']} inserted, "
+              f"{stats['duplicates']} duplicates, {stats['invalid']} invalid")
+
+    with open(path, 'rb') as f:
+        stats = run_import(services.bmi_model, user_id, text_stream(f), import_format or detect_format(path), chunk_size, report)
+    print(f"Imported {stats['inserted']} of {stats['rows']} BMI records")
+
+# CLI: flask migrate-bmi-timeseries, resumable: run it again with BMI writes stopped as a final catch-up
+@commands_bp.cli.command('migrate-bmi-timeseries')
+def migrate_bmi_timeseries_command():
+    copied = migrate_bmi_to_timeseries(services.mongo.db, BMI.COLLECTION_NAME, BMI.TIMESERIES_COLLECTION_NAME)
+    print(f"Copied {copied} BMI records to {BMI.TIMESERIES_COLLECTION_NAME}, set BMI_COLLECTION={BMI.TIMESERIES_COLLECTION_NAME} to use it")
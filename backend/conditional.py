@@ -0,0 +1,23 @@
+import hashlib
+
+# Clients must revalidate, a matching ETag then costs a 304 without a body
+CACHE_CONTROL = 'private, no-cache'
+
+
+def make_etag(kind, user_id, version, variant=b''):
+    """Strong ETag from a per-user version, variant separates e.g. different query strings"""
+    tag = f'{kind}-{user_id}-{version}'
+    if variant:
+        tag += '-' + hashlib.sha1(variant).hexdigest()[:12]
+    return tag
+
+
+def not_modified(request, etag):
+    """True when the request's If-None-Match already has this ETag"""
+    return etag in request.if_none_match
+
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
@@ -0,0 +1,33 @@
+import csv
+import io
+
+# Columns of the CSV export, in order
+EXPORT_CSV_COLUMNS = ['id', 'date', 'weight', 'height', 'bmi', 'bmi_status', 'notes']
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def csv_line(values):
+    """Encode one CSV line"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def csv_header():
+    return csv_line(EXPORT_CSV_COLUMNS)
+
+
+def csv_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def csv_row(record):
+    return csv_line([csv_value(record.get(column, '')) for column in EXPORT_CSV_COLUMNS])
+
+
+def export_headers(export_format):
+    return {'Content-Disposition': f'attachment; filename=bmi_history.{export_format}'}
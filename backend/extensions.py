@@ -0,0 +1,166 @@
+"""Flask extensions and per-app services
+
+Extensions are created unbound here and attached in create_app. Models, caches
+and the MongoDB client live on a Services object per app and are built on first
+use, so a worker boots without loading datasets or building models it has not
+needed yet. Blueprints reach them through the `services` proxy.
+"""
+from flask import current_app
+from flask_cors import CORS
+from flask_jwt_extended import JWTManager
+from flask_pymongo import PyMongo
+from werkzeug.local import LocalProxy
+import os
+import threading
+
+from models.user import User
+from models.bmi import BMI
+from models.bmi_summary import BMISummary
+from models.forecast import Forecast
+from models.import_jobs import ImportJobs
+from models.dashboard import Dashboard
+from models.user_versions import UserVersions
+from models.analytics import Analytics
+from models.food import Food
+from models.meal_plan import MealPlan
+from cache import create_cache
+from hashing import PasswordHasher, DEFAULT_HASH_METHOD
+from health import ReadinessProbe
+from json_provider import init_json
+from mongo_pool import client_options
+from write_buffer import buffer_options
+
+jwt = JWTManager()
+cors = CORS()
+
+
+class lazy:
+    """Attribute computed once on first access, guarded by the instance lock"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        # The value is stored in the instance dict, later reads never reach this descriptor
+        with instance._lock:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.factory(instance)
+        return instance.__dict__[self.name]
+
+
+class Services:
+    """Models and shared resources of one Flask app, each created when first used"""
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+        # Reentrant: building a model builds the models it depends on
+        self._lock = threading.RLock()
+
+    def created(self, name):
+        """Whether a lazy service has been built yet"""
+        return name in self.__dict__
+
+    @lazy
+    def mongo(self):
+        mongo = PyMongo(self.app, event_listeners=self.metrics.event_listeners(), **client_options())
+        # PyMongo.init_app swaps app.json for its BSONProvider ({"$oid": ...}, {"$date": ...}), reinstall ours
+        init_json(self.app)
+        return mongo
+
+    @lazy
+    def profile_cache(self):
+        """In-process LRU+TTL, or shared Redis when PROFILE_CACHE_REDIS_URL is set"""
+        return create_cache(
+            max_size=int(os.getenv('PROFILE_CACHE_SIZE', 10000)),
+            ttl=int(os.getenv('PROFILE_CACHE_TTL', 300)),
+            redis_url=os.getenv('PROFILE_CACHE_REDIS_URL'),
+            prefix='profile:'
+        )
+
+    @lazy
+    def password_hasher(self):
+        """Password hashing process pool, HASH_WORKERS=0 hashes inline"""
+        return PasswordHasher(
+            method=os.getenv('HASH_METHOD', DEFAULT_HASH_METHOD),
+            workers=int(os.getenv('HASH_WORKERS')) if os.getenv('HASH_WORKERS') else None,
+            max_pending=int(os.getenv('HASH_MAX_PENDING')) if os.getenv('HASH_MAX_PENDING') else None,
+            timeout=float(os.getenv('HASH_TIMEOUT', 10)),
+            on_timing=self.metrics.observe_hash
+        )
+
+    @lazy
+    def analytics_model(self):
+        return Analytics(self.mongo, cache=self.profile_cache)
+
+    @lazy
+    def user_model(self):
+        return User(self.mongo, cache=self.profile_cache, hasher=self.password_hasher, listeners=[self.analytics_model])
+
+    @lazy
+    def bmi_summary_model(self):
+        return BMISummary(self.mongo)
+
+    @lazy
+    def user_versions(self):
+        """Per-user version counters (ETags)"""
+        return UserVersions(self.mongo)
+
+    @lazy
+    def forecast_model(self):
+        """Goal forecasts, FORECAST_HALF_LIFE_DAYS weights recent weigh-ins higher"""
+        return Forecast(self.mongo, half_life_days=float(os.getenv('FORECAST_HALF_LIFE_DAYS', 0)))
+
+    @lazy
+    def bmi_model(self):
+        bmi_model = BMI(
+            self.mongo, listeners=[self.bmi_summary_model, self.user_versions, self.analytics_model, self.forecast_model],
+            collection_name=os.getenv('BMI_COLLECTION')
+        )
+
+        # Optional write-behind mode: BMI saves are queued and inserted in batches (see write_buffer.py)
+        if os.getenv('BMI_WRITE_BEHIND', 'false').lower() == 'true':
+            bmi_model.start_write_behind(**buffer_options())
+        return bmi_model
+
+    @lazy
+    def import_jobs(self):
+        """Status of background BMI imports"""
+        return ImportJobs(self.mongo)
+
+    @lazy
+    def dashboard_model(self):
+        return Dashboard(self.mongo, self.user_model, self.bmi_model)
+
+    @lazy
+    def food_model(self):
+        """Nutrition dataset loaded once, FOOD_DATA_PATH overrides the bundled CSV"""
+        return Food(os.getenv('FOOD_DATA_PATH'))
+
+    @lazy
+    def meal_plan_cache(self):
+        """Solved meal plans per (calorie bucket, macro split, goal), few buckets cover most users"""
+        return create_cache(
+            max_size=int(os.getenv('MEAL_PLAN_CACHE_SIZE', 1000)),
+            ttl=int(os.getenv('MEAL_PLAN_CACHE_TTL', 86400)),
+            redis_url=os.getenv('PROFILE_CACHE_REDIS_URL'),
+            prefix='meal_plan:'
+        )
+
+    @lazy
+    def meal_plan_model(self):
+        return MealPlan(self.food_model, cache=self.meal_plan_cache)
+
+    @lazy
+    def readiness_probe(self):
+        """Cached MongoDB ping (no writes)"""
+        return ReadinessProbe(lambda: self.mongo.cx.admin.command('ping'), ttl=float(os.getenv('READINESS_CACHE_SECONDS', 5)))
+
+
+# Services of the current app
+services = LocalProxy(lambda: current_app.extensions['services'])
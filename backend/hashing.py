@@ -0,0 +1,112 @@
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+import multiprocessing
+import os
+import threading
+import time
+
+# Default werkzeug scrypt parameters (n:r:p)
+DEFAULT_HASH_METHOD = 'scrypt:32768:8:1'
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full, routes answer with 503"""
+
+
+def normalize_method(method):
+    """Method as werkzeug writes it into the hash prefix, short forms like 'scrypt' or 'pbkdf2' expanded"""
+    name, *args = method.split(':')
+    try:
+        if name == 'scrypt':
+            n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+            return f'scrypt:{n}:{r}:{p}'
+        if name == 'pbkdf2' and len(args) <= 2:
+            hash_name = args[0] if args else 'sha256'
+            iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+            return f'pbkdf2:{hash_name}:{iterations}'
+    except ValueError:
+        pass
+    # Invalid methods are left as they are, generate_password_hash reports them
+    return method
+
+
+def default_workers():
+    """Hashing processes per server worker, the CPUs shared by every gunicorn worker (GUNICORN_WORKERS)"""
+    server_workers = int(os.getenv('GUNICORN_WORKERS', 1))
+    return max((os.cpu_count() or 1) // max(server_workers, 1), 1)
+
+
+class PasswordHasher:
+    """Runs password hashing and verification on a bounded process pool
+
+    workers=0 hashes inline in the calling thread (useful for scripts and tests).
+    At most max_pending jobs may be queued or running, extra calls raise HasherBusy
+    instead of piling up behind a burst of logins.
+    """
+
+    def __init__(self, method=DEFAULT_HASH_METHOD, workers=None, max_pending=None, timeout=10, on_timing=None):
+        self.method = method
+        # Prefix of hashes made with the configured method, compared by needs_rehash
+        self.method_prefix = normalize_method(method)
+        # Optional callback(operation, seconds), see metrics.Metrics.observe_hash
+        self.on_timing = on_timing
+        self.workers = default_workers() if workers is None else workers
+        self.max_pending = max_pending or max(self.workers, 1) * 4
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created on first use so each server worker gets its own pool after fork
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._executor
+
+    def _run(self, func, *args):
+        if self.on_timing is None:
+            return self._execute(func, *args)
+
+        started = time.perf_counter()
+        try:
+            return self._execute(func, *args)
+        finally:
+            self.on_timing(func.__name__, time.perf_counter() - started)
+
+    def _execute(self, func, *args):
+        if self.workers == 0:
+            return func(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy('Password hashing queue is full')
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash"""
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when the stored hash was made with other parameters than the configured method"""
+        return password_hash.split('$', 1)[0] != self.method_prefix
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,58 @@
+import threading
+import time
+
+
+class ReadinessProbe:
+    """Caches the result of a connectivity check for `ttl` seconds
+
+    Load balancers can probe /readyz as often as they like, the database sees at
+    most one ping per worker per ttl.
+    """
+
+    def __init__(self, check, ttl=5):
+        self.check = check
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._result = None
+        self._checked_at = 0
+
+    def _cached(self):
+        if self._result is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._result
+        return None
+
+    def _store(self, ok, error):
+        self._result = (ok, error)
+        self._checked_at = time.monotonic()
+        return self._result
+
+    def status(self):
+        """Return (ok, error) from cache or a fresh check"""
+        cached = self._cached()
+        if cached:
+            return cached
+
+        with self._lock:
+            cached = self._cached()
+            if cached:
+                return cached
+            try:
+                self.check()
+                return self._store(True, None)
+            except Exception as e:
+                return self._store(False, str(e))
+
+
+class AsyncReadinessProbe(ReadinessProbe):
+    """ReadinessProbe for an async check, used by the ASGI mode"""
+
+    async def status(self):
+        cached = self._cached()
+        if cached:
+            return cached
+
+        try:
+            await self.check()
+            return self._store(True, None)
+        except Exception as e:
+            return self._store(False, str(e))
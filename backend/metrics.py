@@ -0,0 +1,229 @@
+"""In-process metrics exposed in Prometheus text format on /metrics
+
+Collects per-route request latency and status counts, per-collection/command
+MongoDB timings (PyMongo command monitoring, with slow-query logging),
+connection pool stats and password hashing time. Recording is a dict lookup
+plus a bisect under a lock, so the hot path overhead stays in microseconds.
+"""
+from bisect import bisect_left
+from pymongo import monitoring
+import logging
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, Prometheus style"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def max_rss_bytes():
+    """Peak resident memory of this process, None where the resource module is missing (Windows)"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+
+
+class Metrics:
+    def __init__(self, slow_query_ms=100):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self.request_latency = {}
+        self.request_count = {}
+        self.mongo_latency = {}
+        self.mongo_failures = {}
+        self.hash_latency = {}
+        self.pool = {'connections_open': 0, 'connections_checked_out': 0}
+        self.pool_checkout_failures = {}
+
+    def _observe(self, histograms, key, seconds):
+        with self._lock:
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def _increment(self, counters, key, amount=1):
+        with self._lock:
+            counters[key] = counters.get(key, 0) + amount
+
+    def observe_request(self, route, method, status, seconds):
+        self._observe(self.request_latency, (route, method), seconds)
+        self._increment(self.request_count, (route, method, status))
+
+    def observe_mongo(self, collection, command, seconds):
+        self._observe(self.mongo_latency, (collection, command), seconds)
+
+    def observe_hash(self, operation, seconds):
+        self._observe(self.hash_latency, (operation,), seconds)
+
+    def init_app(self, app):
+        """Time every request by its route template (bounded label cardinality)"""
+        @app.before_request
+        def start_timer():
+            from flask import g
+            g.metrics_started = time.perf_counter()
+
+        @app.after_request
+        def record_request(response):
+            from flask import g, request
+            started = g.pop('metrics_started', None)
+            if started is not None:
+                route = request.url_rule.rule if request.url_rule else 'unmatched'
+                self.observe_request(route, request.method, response.status_code, time.perf_counter() - started)
+            return response
+
+    def event_listeners(self):
+        """PyMongo listeners to pass as MongoClient(event_listeners=...)"""
+        return [CommandTimer(self), PoolStats(self)]
+
+    def render(self, gauges=None):
+        """Prometheus text exposition of every metric, plus extra {name: (help, value)} gauges"""
+        lines = []
+
+        def histogram_lines(name, help_text, label_names, histograms):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for key, histogram in sorted(histograms.items()):
+                labels = _labels(label_names, key)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+        def counter_lines(name, help_text, label_names, counters):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for key, value in sorted(counters.items()):
+                lines.append(f'{name}{{{_labels(label_names, key)}}} {value}')
+
+        with self._lock:
+            histogram_lines('http_request_duration_seconds', 'Request latency by route',
+                            ('route', 'method'), self.request_latency)
+            counter_lines('http_requests_total', 'Requests by route and status',
+                          ('route', 'method', 'status'), self.request_count)
+            histogram_lines('mongodb_command_duration_seconds', 'MongoDB command latency',
+                            ('collection', 'command'), self.mongo_latency)
+            counter_lines('mongodb_command_failures_total', 'Failed MongoDB commands',
+                          ('collection', 'command'), self.mongo_failures)
+            histogram_lines('password_hash_duration_seconds', 'Password hashing and verification time',
+                            ('operation',), self.hash_latency)
+            counter_lines('mongodb_pool_checkout_failures_total', 'Failed connection checkouts by reason',
+                          ('reason',), self.pool_checkout_failures)
+
+            for key, value in self.pool.items():
+                lines.append(f'# TYPE mongodb_pool_{key} gauge')
+                lines.append(f'mongodb_pool_{key} {value}')
+
+        for name, (help_text, value) in (gauges or {}).items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class CommandTimer(monitoring.CommandListener):
+    """Times every MongoDB command and logs the slow ones"""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self._collections = {}
+
+    def started(self, event):
+        # The collection name is only available on the started event
+        if event.command_name == 'getMore':
+            collection = event.command.get('collection')
+        else:
+            collection = event.command.get(event.command_name)
+        self._collections[(event.connection_id, event.request_id)] = (
+            collection if isinstance(collection, str) else event.database_name
+        )
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), event.database_name)
+        seconds = event.duration_micros / 1e6
+        self.metrics.observe_mongo(collection, event.command_name, seconds)
+
+        if seconds * 1000 >= self.metrics.slow_query_ms:
+            logger.warning('Slow MongoDB command %s on %s took %.1f ms',
+                           event.command_name, collection, seconds * 1000)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), event.database_name)
+        self.metrics.observe_mongo(collection, event.command_name, event.duration_micros / 1e6)
+        self.metrics._increment(self.metrics.mongo_failures, (collection, event.command_name))
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Tracks open and checked out connections of the MongoDB pool"""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def _add(self, key, amount):
+        self.metrics._increment(self.metrics.pool, key, amount)
+
+    def connection_created(self, event):
+        self._add('connections_open', 1)
+
+    def connection_closed(self, event):
+        self._add('connections_open', -1)
+
+    def connection_checked_out(self, event):
+        self._add('connections_checked_out', 1)
+
+    def connection_checked_in(self, event):
+        self._add('connections_checked_out', -1)
+
+    def connection_check_out_failed(self, event):
+        # Only ever grows, a counter and not one of the pool gauges
+        self.metrics._increment(self.metrics.pool_checkout_failures, (event.reason,))
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
@@ -0,0 +1,199 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+import pymongo
+
+# Collection that records the applied schema version
+MIGRATIONS_COLLECTION = 'schema_migrations'
+MIGRATIONS_DOC_ID = 'schema'
+
+
+def migration_001_initial_indexes(db):
+    """Unique email lookup for auth and per-user history ordered by newest first"""
+    db.users.create_index([('email', pymongo.ASCENDING)], unique=True, name='email_unique')
+    db.bmi_history.create_index(
+        [('user_id', pymongo.ASCENDING), ('created_at', pymongo.DESCENDING), ('_id', pymongo.DESCENDING)],
+        name='user_created_at'
+    )
+
+
+def migration_002_bmi_rollups(db):
+    """Analytics cohort queries read one source over a date range"""
+    db.bmi_rollups.create_index([('source', pymongo.ASCENDING), ('date', pymongo.ASCENDING)], name='source_date')
+
+
+def migration_003_email_key(db):
+    """Case-normalized unique email key, replaces the case-sensitive email index
+
+    Fails on existing users whose emails only differ by case, merge those first.
+    """
+    db.users.update_many(
+        {'email_key': {'$exists': False}},
+        [{'$set': {'email_key': {'$toLower': {'$trim': {'input': '$email'}}}}}]
+    )
+    db.users.create_index(
+        [('email_key', pymongo.ASCENDING)],
+        unique=True,
+        name='email_key_unique',
+        partialFilterExpression={'email_key': {'$exists': True}}
+    )
+    if 'email_unique' in db.users.index_information():
+        db.users.drop_index('email_unique')
+
+
+def migration_004_profile_days_ttl(db):
+    """Per-user day observations of the profile rollups expire once their day is over"""
+    db.bmi_profile_days.create_index([('expires_at', pymongo.ASCENDING)], expireAfterSeconds=0, name='expires_at_ttl')
+
+
+def migration_005_unique_import_keys(db):
+    """At most one imported BMI record per user and date, imports rely on it to skip records stored concurrently
+
+    Only imported records carry an import_key (see BMI.import_records), records
+    saved through the API are never rejected. Time-series collections cannot have
+    unique indexes, imports into bmi_history_ts only dedupe by reading first.
+    """
+    db.bmi_history.create_index(
+        [('user_id', pymongo.ASCENDING), ('import_key', pymongo.ASCENDING)],
+        unique=True,
+        name='user_import_key_unique',
+        partialFilterExpression={'import_key': {'$exists': True}}
+    )
+
+
+def migration_006_import_jobs_ttl(db):
+    """Finished import jobs expire after their retention period"""
+    db.bmi_import_jobs.create_index([('expires_at', pymongo.ASCENDING)], expireAfterSeconds=0, name='expires_at_ttl')
+
+
+# Ordered list of (version, description, function), append new migrations at the end
+MIGRATIONS = [
+    (1, 'Initial indexes for users and bmi_history', migration_001_initial_indexes),
+    (2, 'Index for analytics rollups', migration_002_bmi_rollups),
+    (3, 'Unique case-normalized email key for users', migration_003_email_key),
+    (4, 'Expiry of per-user day observations for profile rollups', migration_004_profile_days_ttl),
+    (5, 'Unique import key for imported BMI records', migration_005_unique_import_keys),
+    (6, 'Expiry of finished BMI import jobs', migration_006_import_jobs_ttl),
+]
+
+def checked_queries(bmi_collection='bmi_history'):
+    """Model queries that must be served by an index: (collection, filter, sort)
+
+    bmi_collection is the collection BMI records are read from (BMI_COLLECTION).
+    """
+    return [
+        ('users', {'email_key': 'check@example.com'}, None),
+        (bmi_collection, {'user_id': 'check'}, [('created_at', pymongo.DESCENDING), ('_id', pymongo.DESCENDING)]),
+        ('bmi_rollups', {'source': 'bmi', 'date': {'$gte': datetime(2000, 1, 1)}}, None),
+    ]
+
+
+# A re-run of migrate_bmi_to_timeseries checks again the records created this long before the newest
+# copied one: write-behind batches and other workers can insert a record with a slightly older _id later
+TIMESERIES_RESUME_OVERLAP = timedelta(minutes=5)
+
+
+def migrate_bmi_to_timeseries(db, source='bmi_history', target='bmi_history_ts', batch_size=1000):
+    """Copy BMI records into a time-series collection, return the number copied
+
+    The target uses user_id as metaField and created_at as timeField. A
+    time-series collection cannot have a unique index, so a re-run resumes after
+    the newest _id already copied (skipping the ones it finds again in the
+    overlap window) instead of inserting every record twice. Records saved while
+    it runs are left for the next run, so switch with: run it, stop BMI writes,
+    run it again as a final catch-up, then start the app with
+    BMI_COLLECTION=bmi_history_ts.
+    """
+    if target not in db.list_collection_names():
+        db.create_collection(target, timeseries={
+            'timeField': 'created_at',
+            'metaField': 'user_id',
+            'granularity': 'hours',
+        })
+        db[target].create_index(
+            [('user_id', pymongo.ASCENDING), ('created_at', pymongo.DESCENDING), ('_id', pymongo.DESCENDING)],
+            name='user_created_at'
+        )
+
+    query = {}
+    copied_ids = set()
+    newest = next(iter(db[target].find({}, {'_id': 1}).sort('_id', pymongo.DESCENDING).limit(1)), None)
+    if newest is not None:
+        query = {'_id': {'$gte': ObjectId.from_datetime(newest['_id'].generation_time - TIMESERIES_RESUME_OVERLAP)}}
+        copied_ids = {record['_id'] for record in db[target].find(query, {'_id': 1})}
+
+    copied = 0
+    batch = []
+    cursor = db[source].find(query).sort('_id', pymongo.ASCENDING).batch_size(batch_size)
+
+    try:
+        for record in cursor:
+            if record['_id'] in copied_ids:
+                continue
+            batch.append(record)
+            if len(batch) >= batch_size:
+                db[target].insert_many(batch, ordered=False)
+                copied += len(batch)
+                batch = []
+
+        if batch:
+            db[target].insert_many(batch, ordered=False)
+            copied += len(batch)
+    finally:
+        cursor.close()
+
+    return copied
+
+
+def get_schema_version(db):
+    """Get the currently applied schema version, 0 if nothing was applied"""
+    doc = db[MIGRATIONS_COLLECTION].find_one({'_id': MIGRATIONS_DOC_ID})
+    return doc['version'] if doc else 0
+
+
+def run_migrations(db):
+    """Apply pending migrations in order and return the list of applied versions"""
+    current_version = get_schema_version(db)
+    applied = []
+
+    for version, description, migrate in MIGRATIONS:
+        if version <= current_version:
+            continue
+
+        print(f"Applying migration {version}: {description}")
+        migrate(db)
+
+        db[MIGRATIONS_COLLECTION].update_one(
+            {'_id': MIGRATIONS_DOC_ID},
+            {'$set': {'version': version, 'applied_at': datetime.utcnow()}},
+            upsert=True
+        )
+        applied.append(version)
+
+    return applied
+
+
+def _find_stages(plan, stage):
+    """Recursively look for a stage name inside an explain plan"""
+    if isinstance(plan, dict):
+        if plan.get('stage') == stage:
+            return True
+        return any(_find_stages(value, stage) for value in plan.values())
+    if isinstance(plan, list):
+        return any(_find_stages(value, stage) for value in plan)
+    return False
+
+
+def check_indexes(db, bmi_collection='bmi_history'):
+    """Explain every checked model query and return those that fall back to COLLSCAN"""
+    failures = []
+
+    for collection_name, query, sort in checked_queries(bmi_collection):
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+
+        plan = cursor.limit(1).explain().get('queryPlanner', {}).get('winningPlan', {})
+        if _find_stages(plan, 'COLLSCAN'):
+            failures.append({'collection': collection_name, 'query': query, 'sort': sort})
+
+    return failures
@@ -0,0 +1,368 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from models.bmi_calculator import calculate_bmi
+from cache import call_cache
+
+class Analytics:
+    """Population BMI rollups for cohort analytics
+
+    One document per (day, source, BMI category, gender, age band) in `bmi_rollups`
+    holds counts and sums. Saved BMI records (source `bmi`, as a BMI listener) and
+    profile updates with a computable BMI (source `profile`, as a User listener)
+    increment them, so cohort queries read a few rollup documents per day instead
+    of every user or record.
+
+    Profile rollups count each user at most once per day, with their latest
+    values: `bmi_profile_days` keeps the observation a user added for a day, and a
+    later update that day takes it back out of its rollup before adding the new one.
+    """
+
+    COLLECTION_NAME = 'bmi_rollups'
+    PROFILE_DAYS_COLLECTION = 'bmi_profile_days'
+
+    # Profile fields the profile rollups depend on, edits of other fields are not recorded
+    PROFILE_FIELDS = ['height', 'currentWeight', 'gender', 'age']
+
+    # Per-user day observations are only needed while the day can still change
+    PROFILE_DAY_RETENTION = timedelta(days=2)
+
+    SOURCES = ['bmi', 'profile']
+    DIMENSIONS = ['category', 'gender', 'age_band']
+
+    # Age bands as (label, lower bound inclusive), checked from the top
+    AGE_BANDS = [('65+', 65), ('55-64', 55), ('45-54', 45), ('35-44', 35), ('25-34', 25), ('18-24', 18), ('<18', 0)]
+    GENDERS = ['Pria', 'Wanita']
+    UNKNOWN = 'unknown'
+
+    def __init__(self, mongo, cache=None):
+        self.mongo = mongo
+        self.collection = mongo.db[self.COLLECTION_NAME]
+        self.profile_days = mongo.db[self.PROFILE_DAYS_COLLECTION]
+        self.users = mongo.db.users
+        # Optional profile cache (see cache.py), saves the demographics lookup on BMI saves
+        self.cache = cache
+
+    @classmethod
+    def age_band(cls, age):
+        if not isinstance(age, (int, float)):
+            return cls.UNKNOWN
+        for label, lower in cls.AGE_BANDS:
+            if age >= lower:
+                return label
+        return cls.UNKNOWN
+
+    @classmethod
+    def demographics(cls, user):
+        """(gender, age band) of a user document or profile"""
+        gender = user.get('gender') if user.get('gender') in cls.GENDERS else cls.UNKNOWN
+        return gender, cls.age_band(user.get('age'))
+
+    @staticmethod
+    def rollup_key(day, source, category, gender, age_band):
+        return {'date': day, 'source': source, 'category': category, 'gender': gender, 'age_band': age_band}
+
+    @classmethod
+    def build_update(cls, at, source, category, gender, age_band, bmi, weight, count=1):
+        """Upsert (filter, update) adding observations (count, BMI and weight sums) to their daily rollup"""
+        day = datetime(at.year, at.month, at.day)
+        return (
+            {'_id': cls.rollup_key(day, source, category, gender, age_band)},
+            {
+                '$inc': {'count': count, 'sum_bmi': bmi, 'sum_weight': weight},
+                '$setOnInsert': cls.rollup_key(day, source, category, gender, age_band),
+            }
+        )
+
+    @classmethod
+    def batch_writes(cls, documents, demographics_by_user):
+        """One upsert per rollup touched by a batch of saved records"""
+        totals = {}
+        for bmi_data in documents:
+            at = bmi_data['created_at']
+            key = (datetime(at.year, at.month, at.day), bmi_data['bmi_status']) + demographics_by_user[bmi_data['user_id']]
+            total = totals.setdefault(key, [0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += bmi_data['bmi']
+            total[2] += bmi_data['weight']
+
+        return [
+            UpdateOne(*cls.build_update(day, 'bmi', category, gender, age_band, sum_bmi, sum_weight, count), upsert=True)
+            for (day, category, gender, age_band), (count, sum_bmi, sum_weight) in totals.items()
+        ]
+
+    def cached_profile(self, user_id):
+        return self.cache.get(user_id) if self.cache is not None else None
+
+    def record_bmi(self, bmi_data):
+        """Add a saved BMI record to the rollups"""
+        user = self.cached_profile(bmi_data['user_id']) or self.users.find_one(
+            {'_id': ObjectId(bmi_data['user_id'])}, {'gender': 1, 'age': 1}
+        ) or {}
+        gender, age_band = self.demographics(user)
+
+        self.collection.update_one(*self.build_update(
+            bmi_data['created_at'], 'bmi', bmi_data['bmi_status'], gender, age_band,
+            bmi_data['bmi'], bmi_data['weight']
+        ), upsert=True)
+
+    def record_bmi_many(self, documents):
+        """Add a batch of saved BMI records with one bulk write"""
+        demographics_by_user = {}
+        for user_id in {bmi_data['user_id'] for bmi_data in documents}:
+            user = self.cached_profile(user_id) or self.users.find_one(
+                {'_id': ObjectId(user_id)}, {'gender': 1, 'age': 1}
+            ) or {}
+            demographics_by_user[user_id] = self.demographics(user)
+
+        self.collection.bulk_write(self.batch_writes(documents, demographics_by_user), ordered=False)
+
+    @classmethod
+    def profile_changed(cls, user_data, previous):
+        """Whether an update touched a field the profile rollups depend on"""
+        return any(user_data.get(field) != previous.get(field) for field in cls.PROFILE_FIELDS)
+
+    @classmethod
+    def profile_observation(cls, user_data):
+        """Rollup values of a user document, None when its BMI cannot be calculated"""
+        if not user_data.get('height') or not user_data.get('currentWeight'):
+            return None
+
+        bmi, status = calculate_bmi(user_data['currentWeight'], user_data['height'])
+        if bmi is None:
+            return None
+
+        gender, age_band = cls.demographics(user_data)
+        return {
+            'category': status,
+            'gender': gender,
+            'age_band': age_band,
+            'bmi': bmi,
+            'weight': float(user_data['currentWeight']),
+        }
+
+    @classmethod
+    def profile_day(cls, user_data):
+        """(day, per-user day filter) of a profile update"""
+        at = user_data.get('updated_at') or datetime.utcnow()
+        day = datetime(at.year, at.month, at.day)
+        return day, {'_id': {'user_id': str(user_data['_id']), 'date': day}}
+
+    @classmethod
+    def profile_writes(cls, day, observation, replaced):
+        """Rollup writes for a user's new observation of a day, the one it replaces is subtracted"""
+        writes = []
+        if replaced is not None:
+            writes.append(UpdateOne(*cls.build_update(
+                day, 'profile', replaced['category'], replaced['gender'], replaced['age_band'],
+                -replaced['bmi'], -replaced['weight'], count=-1
+            )))
+        if observation is not None:
+            writes.append(UpdateOne(*cls.build_update(
+                day, 'profile', observation['category'], observation['gender'], observation['age_band'],
+                observation['bmi'], observation['weight']
+            ), upsert=True))
+        return writes
+
+    def record_profile(self, user_data, previous):
+        """Add an updated profile to the rollups, user_data and previous are the documents after and before it"""
+        if not self.profile_changed(user_data, previous):
+            return
+
+        day, day_filter = self.profile_day(user_data)
+        observation = self.profile_observation(user_data)
+
+        # Swap the user's observation of the day, the previous one (if any) is returned
+        if observation is None:
+            replaced = self.profile_days.find_one_and_delete(day_filter)
+        else:
+            replaced = self.profile_days.find_one_and_replace(
+                day_filter, dict(observation, expires_at=day + self.PROFILE_DAY_RETENTION), upsert=True
+            )
+
+        writes = self.profile_writes(day, observation, replaced)
+        if writes:
+            self.collection.bulk_write(writes)
+
+    @classmethod
+    def build_query_pipeline(cls, date_from, date_to, source, group_by):
+        """Sum the daily rollups in [date_from, date_to) over the requested dimensions"""
+        return [
+            {'$match': {'source': source, 'date': {'$gte': date_from, '$lt': date_to}}},
+            {'$group': {
+                '_id': {dimension: f'${dimension}' for dimension in group_by},
+                'count': {'$sum': '$count'},
+                'sum_bmi': {'$sum': '$sum_bmi'},
+                'sum_weight': {'$sum': '$sum_weight'},
+            }},
+            {'$sort': {f'_id.{dimension}': 1 for dimension in group_by} or {'count': -1}},
+        ]
+
+    @staticmethod
+    def format_rows(rows):
+        return [
+            dict(
+                row['_id'],
+                count=row['count'],
+                avg_bmi=round(row['sum_bmi'] / row['count'], 1),
+                avg_weight=round(row['sum_weight'] / row['count'], 1),
+            )
+            for row in rows if row['count']
+        ]
+
+    def query_response(self, rows, date_from, date_to, source, group_by):
+        data = self.format_rows(rows)
+        return {
+            'success': True,
+            'data': data,
+            'total': sum(row['count'] for row in data),
+            'query': {
+                'from': date_from.isoformat(),
+                'to': date_to.isoformat(),
+                'source': source,
+                'group_by': group_by,
+            }
+        }
+
+    def query(self, date_from, date_to, source='bmi', group_by=None):
+        """Cohort counts and averages from the rollups, cost bounded by days x cohorts, not users"""
+        try:
+            group_by = group_by if group_by is not None else self.DIMENSIONS
+            rows = list(self.collection.aggregate(self.build_query_pipeline(date_from, date_to, source, group_by)))
+            return self.query_response(rows, date_from, date_to, source, group_by)
+
+        except Exception as e:
+            print(f"Error querying BMI analytics: {str(e)}")
+            return {'success': False, 'message': 'Gagal mengambil data analitik', 'error': str(e)}
+
+    @classmethod
+    def build_backfill_pipeline(cls, users_collection='users', backfilled_at=None):
+        """Aggregation recomputing the `bmi` rollups from the whole BMI history, merged into the rollups
+
+        Every merged rollup is stamped with `backfilled_at`, so rollups of an earlier
+        run the history no longer produces can be told apart afterwards.
+        """
+        age_branches = [
+            {'case': {'$gte': ['$user.age', lower]}, 'then': label}
+            for label, lower in cls.AGE_BANDS
+        ]
+
+        return [
+            {'$lookup': {
+                'from': users_collection,
+                # A malformed user_id matches no user (unknown demographics) instead of failing the merge
+                'let': {'user_id': {'$convert': {'input': '$user_id', 'to': 'objectId', 'onError': None, 'onNull': None}}},
+                'pipeline': [
+                    {'$match': {'$expr': {'$eq': ['$_id', '$$user_id']}}},
+                    {'$project': {'gender': 1, 'age': 1}},
+                ],
+                'as': 'user'
+            }},
+            {'$set': {'user': {'$ifNull': [{'$first': '$user'}, {}]}}},
+            {'$group': {
+                '_id': {
+                    'date': {'$dateTrunc': {'date': '$created_at', 'unit': 'day'}},
+                    'source': 'bmi',
+                    'category': '$bmi_status',
+                    'gender': {'$cond': [{'$in': ['$user.gender', cls.GENDERS]}, '$user.gender', cls.UNKNOWN]},
+                    'age_band': {'$cond': [
+                        {'$isNumber': '$user.age'},
+                        {'$switch': {'branches': age_branches, 'default': cls.UNKNOWN}},
+                        cls.UNKNOWN
+                    ]},
+                },
+                'count': {'$sum': 1},
+                'sum_bmi': {'$sum': '$bmi'},
+                'sum_weight': {'$sum': '$weight'},
+            }},
+            {'$set': {
+                'date': '$_id.date',
+                'source': '$_id.source',
+                'category': '$_id.category',
+                'gender': '$_id.gender',
+                'age_band': '$_id.age_band',
+                'backfilled_at': backfilled_at or datetime.utcnow(),
+            }},
+            {'$merge': {'into': cls.COLLECTION_NAME, 'on': '_id', 'whenMatched': 'replace', 'whenNotMatched': 'insert'}},
+        ]
+
+    def backfill(self, history):
+        """Rebuild the `bmi` rollups from a BMI history collection, return the number of rollup documents
+
+        The merge replaces rollups in place and only rollups left over from earlier
+        runs are deleted after it succeeded, a failed backfill leaves the data as it was.
+        """
+        backfilled_at = datetime.utcnow()
+        history.aggregate(self.build_backfill_pipeline(self.users.name, backfilled_at), allowDiskUse=True)
+        self.collection.delete_many(self.stale_backfill_filter(backfilled_at))
+        return self.collection.count_documents({'source': 'bmi'})
+
+    @staticmethod
+    def stale_backfill_filter(backfilled_at):
+        # Rollups only created by live saves (never backfilled) are kept
+        return {'source': 'bmi', 'backfilled_at': {'$lt': backfilled_at}}
+
+
+class AsyncAnalytics(Analytics):
+    """Analytics on an async MongoDB database, used by the ASGI mode"""
+
+    def __init__(self, db, cache=None):
+        self.mongo = None
+        self.collection = db[self.COLLECTION_NAME]
+        self.profile_days = db[self.PROFILE_DAYS_COLLECTION]
+        self.users = db.users
+        self.cache = cache
+
+    async def cached_profile(self, user_id):
+        return await call_cache(self.cache.get, user_id) if self.cache is not None else None
+
+    async def record_bmi(self, bmi_data):
+        user = await self.cached_profile(bmi_data['user_id']) or await self.users.find_one(
+            {'_id': ObjectId(bmi_data['user_id'])}, {'gender': 1, 'age': 1}
+        ) or {}
+        gender, age_band = self.demographics(user)
+
+        await self.collection.update_one(*self.build_update(
+            bmi_data['created_at'], 'bmi', bmi_data['bmi_status'], gender, age_band,
+            bmi_data['bmi'], bmi_data['weight']
+        ), upsert=True)
+
+    async def record_bmi_many(self, documents):
+        demographics_by_user = {}
+        for user_id in {bmi_data['user_id'] for bmi_data in documents}:
+            user = await self.cached_profile(user_id) or await self.users.find_one(
+                {'_id': ObjectId(user_id)}, {'gender': 1, 'age': 1}
+            ) or {}
+            demographics_by_user[user_id] = self.demographics(user)
+
+        await self.collection.bulk_write(self.batch_writes(documents, demographics_by_user), ordered=False)
+
+    async def record_profile(self, user_data, previous):
+        if not self.profile_changed(user_data, previous):
+            return
+
+        day, day_filter = self.profile_day(user_data)
+        observation = self.profile_observation(user_data)
+
+        if observation is None:
+            replaced = await self.profile_days.find_one_and_delete(day_filter)
+        else:
+            replaced = await self.profile_days.find_one_and_replace(
+                day_filter, dict(observation, expires_at=day + self.PROFILE_DAY_RETENTION), upsert=True
+            )
+
+        writes = self.profile_writes(day, observation, replaced)
+        if writes:
+            await self.collection.bulk_write(writes)
+
+    async def query(self, date_from, date_to, source='bmi', group_by=None):
+        try:
+            group_by = group_by if group_by is not None else self.DIMENSIONS
+            cursor = await self.collection.aggregate(self.build_query_pipeline(date_from, date_to, source, group_by))
+            rows = await cursor.to_list()
+            return self.query_response(rows, date_from, date_to, source, group_by)
+
+        except Exception as e:
+            print(f"Error querying BMI analytics: {str(e)}")
+            return {'success': False, 'message': 'Gagal mengambil data analitik', 'error': str(e)}
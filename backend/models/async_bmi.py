@@ -0,0 +1,161 @@
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from models.bmi import BMI
+from write_buffer import AsyncWriteBehindBuffer, BufferFull
+
+class AsyncBMI(BMI):
+    """BMI model on an async MongoDB database (pymongo.AsyncMongoClient)
+
+    Calculation, record building and response formatting are shared with BMI,
+    only the database operations are awaited.
+    """
+
+    def __init__(self, db, listeners=None, collection_name=None):
+        self.mongo = None
+        self.collection = db[collection_name or self.COLLECTION_NAME]
+        # Derived data kept up to date on every save, each has async record_bmi(bmi_data)
+        self.listeners = listeners or []
+        self.write_buffer = None
+
+    def start_write_behind(self, **options):
+        """Queue saves and insert them in batches from a background task, call inside the event loop"""
+        self.write_buffer = AsyncWriteBehindBuffer(self.collection, on_flushed=self.notify_flushed, **options)
+        return self.write_buffer
+
+    async def save_bmi(self, user_id, weight, height, notes=''):
+        """Save BMI to database"""
+        try:
+            bmi_data = self.build_record(user_id, weight, height, notes)
+            
+            if bmi_data is None:
+                return {'success': False, 'message': 'Error menghitung BMI'}
+
+            if self.write_buffer is not None:
+                # Client-side _id, so the response is the same as for a direct insert
+                bmi_data['_id'] = ObjectId()
+                await self.write_buffer.put(bmi_data)
+                return self.saved_response(bmi_data['_id'], bmi_data)
+
+            result = await self.collection.insert_one(bmi_data)
+
+            if result.inserted_id:
+                await self.notify_saved(bmi_data)
+                return self.saved_response(result.inserted_id, bmi_data)
+            
+            return {'success': False, 'message': 'Gagal menyimpan BMI'}
+        
+        except BufferFull:
+            raise
+        except Exception as e:
+            print(f"Error saving BMI: {str(e)}")
+            return {'success': False, 'message': 'Error saving BMI', 'error': str(e)}
+
+    async def notify_saved(self, bmi_data):
+        """Update listeners after an insert, a failing listener does not fail the save"""
+        for listener in self.listeners:
+            try:
+                await listener.record_bmi(bmi_data)
+            except Exception as e:
+                print(f"Error updating {type(listener).__name__}: {str(e)}")
+
+    async def import_records(self, user_id, records):
+        """Insert validated records (see bmi_import.py) that are not stored yet, return the number inserted"""
+        if not records:
+            return 0
+
+        cursor = self.collection.find(*self.existing_dates(user_id, records))
+        existing = {record['created_at'] async for record in cursor}
+        fresh = [self.with_import_key(record) for record in records if record['created_at'] not in existing]
+
+        inserted = []
+        for start in range(0, len(fresh), self.IMPORT_BATCH_SIZE):
+            batch = fresh[start:start + self.IMPORT_BATCH_SIZE]
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                inserted.extend(batch)
+            except BulkWriteError as e:
+                inserted.extend(self.inserted_documents(batch, e))
+
+        if inserted:
+            await self.notify_saved_many(inserted)
+        return len(inserted)
+
+    async def notify_saved_many(self, documents):
+        for listener in self.listeners:
+            try:
+                if hasattr(listener, 'record_bmi_many'):
+                    await listener.record_bmi_many(documents)
+                else:
+                    for bmi_data in documents:
+                        await listener.record_bmi(bmi_data)
+            except Exception as e:
+                print(f"Error updating {type(listener).__name__}: {str(e)}")
+
+    async def notify_flushed(self, documents):
+        await self.notify_saved_many(documents)
+
+    async def get_user_bmi_history(self, user_id, limit=None, after=None, date_from=None, date_to=None, fields=None):
+        """Get one page of user BMI history, newest first"""
+        try:
+            limit = self.history_limit(limit)
+            query, projection = self.build_history_query(user_id, after, date_from, date_to, fields)
+
+            # Fetch one extra record to know whether another page exists
+            history = await (
+                self.collection.find(query, projection)
+                .sort(self.HISTORY_SORT)
+                .limit(limit + 1)
+                .to_list()
+            )
+
+            return self.build_history_page(history, limit)
+    
+        except Exception as e:
+            print(f"Error getting BMI history: {str(e)}")
+            return {'success': False, 'message': 'Gagal mengambil riwayat BMI', 'error': str(e)}
+
+    async def get_bmi_trend(self, user_id, bucket, date_from=None, date_to=None, timezone='UTC'):
+        """Get the user's BMI history downsampled to day/week/month buckets"""
+        try:
+            pipeline = self.build_trend_pipeline(user_id, bucket, date_from, date_to, timezone)
+            cursor = await self.collection.aggregate(pipeline)
+            return self.trend_response(bucket, await cursor.to_list())
+
+        except Exception as e:
+            print(f"Error getting BMI trend: {str(e)}")
+            return {'success': False, 'message': 'Gagal mengambil tren BMI', 'error': str(e)}
+
+    async def iter_user_bmi_history(self, user_id, batch_size=BMI.EXPORT_BATCH_SIZE):
+        """Stream the full user BMI history, newest first, from a server-side cursor"""
+        cursor = (
+            self.collection.find({'user_id': user_id}, self.EXPORT_PROJECTION)
+            .sort(self.HISTORY_SORT)
+            .batch_size(batch_size)
+        )
+
+        try:
+            async for record in cursor:
+                yield self.format_record(record)
+        finally:
+            await cursor.close()
+
+    async def get_latest_bmi(self, user_id):
+        """Get latest BMI record for user"""
+        try:
+            latest_record = await self.collection.find_one(
+                {'user_id': user_id},
+                sort=self.HISTORY_SORT
+            )
+
+            if latest_record:
+                return {
+                    'success': True,
+                    'data': self.format_record(latest_record)
+                }
+            else:
+                return {'success': False, 'message': 'Tidak ada data BMI ditemukan untuk pengguna ini'}
+        
+        except Exception as e:
+            print(f"Error getting latest BMI: {str(e)}")
+            return {'success': False, 'message': 'Gagal mengambil data BMI terbaru', 'error': str(e)}
@@ -0,0 +1,228 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import asyncio
+
+from models.user import User
+from migrations import MIGRATIONS_COLLECTION, MIGRATIONS_DOC_ID
+from cache import call_cache
+from hashing import PasswordHasher, HasherBusy
+from tokens import encode_access_token, encode_refresh_token
+
+class AsyncUser(User):
+    """User model on an async MongoDB database (pymongo.AsyncMongoClient)
+
+    Profile building, validation rules and responses are shared with User. Hashing
+    runs in a thread (backed by the hasher pool) and so do calls to a Redis profile
+    cache, so neither blocks the event loop.
+    """
+
+    def __init__(self, db, jwt_secret, cache=None, hasher=None, listeners=None):
+        self.mongo = None
+        self.collection = db.users
+        self.cache = cache
+        self.hasher = hasher or PasswordHasher(workers=0)
+        self.jwt_secret = jwt_secret
+        # Derived data kept up to date on every profile update, each has async record_profile(user_data, previous)
+        self.listeners = listeners or []
+        self.email_key_checked = False
+        self.email_index_ready = False
+        self.legacy_emails = True
+
+    # Access and refresh tokens, no Flask app context needed
+    def create_token(self, user_id, profile):
+        return encode_access_token(
+            user_id, self.jwt_secret,
+            expires_delta=self.ACCESS_TOKEN_EXPIRES,
+            additional_claims=self.profile_claims(profile)
+        )
+
+    def create_refresh_token(self, user_id):
+        return encode_refresh_token(user_id, self.jwt_secret, expires_delta=self.REFRESH_TOKEN_EXPIRES)
+
+    async def refresh_access_token(self, user_id):
+        result = await self.get_user_profile(user_id)
+        if not result['success']:
+            return result
+
+        return {'success': True, 'token': self.create_token(user_id, result['user'])}
+
+    async def prepare_email_key(self):
+        if self.email_key_checked:
+            return
+
+        try:
+            keys, options = self.email_key_index()
+            await self.collection.create_index(keys, **options)
+            self.email_index_ready = True
+            schema = await self.collection.database[MIGRATIONS_COLLECTION].find_one({'_id': MIGRATIONS_DOC_ID})
+            self.legacy_emails = not self.migrated_emails(schema)
+        except Exception as e:
+            print(f"Error preparing email key index: {str(e)}")
+        self.email_key_checked = True
+
+    async def email_key_enforced(self):
+        await self.prepare_email_key()
+        return self.email_index_ready and not self.legacy_emails
+
+    async def find_by_email(self, email):
+        await self.prepare_email_key()
+        user = await self.collection.find_one({'email_key': self.email_key(email)})
+        if user is None and self.legacy_emails:
+            user = await self.collection.find_one(self.legacy_email_filter(email))
+        return user
+
+    async def create_user(self, name, email, password):
+        # Register new user
+
+        # Hash password
+        hashed_password = await asyncio.to_thread(self.hasher.hash, password)
+
+        # Data user
+        user_data = self.new_user_document(name, email, hashed_password)
+
+        # Insert data user to database, the unique email key index rejects an existing email
+        try:
+            # Users without an email key are not covered by the index, look the email up first
+            if not await self.email_key_enforced() and await self.find_by_email(email) is not None:
+                return {'success': False, 'message': 'Email sudah terdaftar'}
+
+            result = await self.collection.insert_one(user_data)
+
+            if result.inserted_id:
+                return self.auth_response('Registrasi berhasil', user_data)
+            
+            return {'success': False, 'message': 'Gagal melakukan registrasi'}
+        
+        except DuplicateKeyError:
+            return {'success': False, 'message': 'Email sudah terdaftar'}
+        except Exception as e:
+            return {'success': False, 'message': 'Terjadi kesalahan saat registrasi', 'error': str(e)}
+
+    async def login_user(self, email, password):
+        # Login user
+        try:
+
+            # Check email
+            user = await self.find_by_email(email)
+
+            if not user:
+                return {'success': False, 'message': 'Email tidak terdaftar'}
+            
+            if not await asyncio.to_thread(self.hasher.verify, user['password'], password):
+                return {'success': False, 'message': 'Password salah'}
+
+            # Upgrade hashes made with outdated parameters, skipped when the hasher is busy or times out
+            if self.hasher.needs_rehash(user['password']):
+                try:
+                    await self.collection.update_one(
+                        {'_id': user['_id'], 'password': user['password']},
+                        {'$set': {'password': await asyncio.to_thread(self.hasher.hash, password)}}
+                    )
+                except Exception as e:
+                    # The password is verified, a busy or slow hasher only postpones the upgrade
+                    print(f"Error rehashing password: {type(e).__name__} {str(e)}")
+
+            return self.auth_response('Login berhasil', user)
+    
+        except HasherBusy:
+            raise
+        except Exception as e:
+            return {'success': False, 'message': 'Terjadi kesalahan saat login', 'error': str(e)}
+
+    # Get user by ID
+    async def get_user_by_id(self, user_id):
+        try:
+            user = await self.collection.find_one({'_id': ObjectId(user_id)})
+            if user:
+                return {
+                    'id': str(user['_id']),
+                    'name': user['name'],
+                    'email': user['email'],
+                    'created_at': user['created_at'],
+                }
+            return None
+        except Exception as e:
+            return {'success': False, 'message': 'Terjadi kesalahan saat mengambil data user', 'error': str(e)}
+
+    # Get full user profile
+    async def get_user_profile(self, user_id):
+        try:
+            # Serve from cache when possible
+            if self.cache is not None:
+                cached_profile = await call_cache(self.cache.get, user_id)
+                if cached_profile is not None:
+                    return {'success': True, 'user': cached_profile}
+
+            user_data = await self.collection.find_one({'_id': ObjectId(user_id)})
+            
+            if user_data:
+                profile = self.build_profile(user_data)
+
+                if self.cache is not None:
+                    await call_cache(self.cache.set, user_id, profile)
+
+                return {
+                    'success': True,
+                    'user': profile
+                }
+            else:
+                return {'success': False, 'message': 'User tidak ditemukan'}
+                
+        except Exception as e:
+            print(f"Get user profile error: {str(e)}")
+            return {'success': False, 'message': f'Error: {str(e)}'}
+
+    # Update user profile
+    async def update_user_profile(self, user_id, profile_data):
+        try:
+            changes = self.profile_changes(profile_data)
+
+            # Nothing to write when no field is provided, the response still carries a token like an update
+            if not changes:
+                current_profile = await self.get_user_profile(user_id)
+                if current_profile['success']:
+                    return self.profile_updated(user_id, current_profile['user'])
+                return current_profile
+
+            update_data = dict(changes, updated_at=datetime.utcnow())
+
+            # Apply the update and read the pre-image in one round trip, a no-op update matches nothing
+            previous = await self.collection.find_one_and_update(
+                self.profile_update_filter(ObjectId(user_id), changes),
+                {'$set': update_data, '$inc': {'profile_version': 1}},
+                projection={'password': 0},
+                return_document=ReturnDocument.BEFORE
+            )
+
+            if previous:
+                # The stored document is the pre-image with this update applied
+                user_data = self.apply_profile_update(previous, update_data)
+                await self.notify_updated(user_data, previous)
+            else:
+                user_data = await self.collection.find_one({'_id': ObjectId(user_id)}, {'password': 0})
+
+            return await self.profile_update_response(user_id, user_data)
+                
+        except Exception as e:
+            print(f"Update profile error: {str(e)}")
+            return {'success': False, 'message': f'Error: {str(e)}'}
+
+    async def profile_update_response(self, user_id, user_data):
+        if not user_data:
+            return {'success': False, 'message': 'User tidak ditemukan'}
+
+        profile = self.build_profile(user_data)
+
+        if self.cache is not None:
+            await call_cache(self.cache.set, user_id, profile)
+
+        return self.profile_updated(user_id, profile)
+
+    async def notify_updated(self, user_data, previous):
+        for listener in self.listeners:
+            try:
+                await listener.record_profile(user_data, previous)
+            except Exception as e:
+                print(f"Error updating {type(listener).__name__}: {str(e)}")
@@ -1,114 +1,391 @@
 from datetime import datetime
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
+import base64
+import json
 import pymongo
 
+from models.bmi_calculator import calculate_bmi, calculate_bmi_batch
+from write_buffer import WriteBehindBuffer, BufferFull
+
 class BMI:
-    def __init__(self, mongo):
+    # Plain collection, and the optional time-series layout (see migrations.migrate_bmi_to_timeseries)
+    COLLECTION_NAME = 'bmi_history'
+    TIMESERIES_COLLECTION_NAME = 'bmi_history_ts'
+
+    # History pagination settings
+    DEFAULT_HISTORY_LIMIT = 50
+    MAX_HISTORY_LIMIT = 200
+
+    # Fields a client may request through the history projection
+    HISTORY_FIELDS = ['weight', 'height', 'bmi', 'bmi_status', 'notes', 'created_at']
+
+    # Newest first, _id breaks ties between records with the same created_at
+    HISTORY_SORT = [('created_at', pymongo.DESCENDING), ('_id', pymongo.DESCENDING)]
+
+    # Export streams every history field in batches from the server-side cursor
+    EXPORT_BATCH_SIZE = 500
+    EXPORT_PROJECTION = dict({field: 1 for field in HISTORY_FIELDS}, user_id=1)
+
+    # Bulk imports insert at most this many records per insert_many
+    IMPORT_BATCH_SIZE = 1000
+
+    # Server error code of a unique index violation
+    DUPLICATE_KEY_ERROR = 11000
+
+    # Trend buckets for $dateTrunc and the maximum number of buckets returned
+    TREND_BUCKETS = ['day', 'week', 'month']
+    MAX_TREND_BUCKETS = 400
+
+    def __init__(self, mongo, listeners=None, collection_name=None):
         self.mongo = mongo
-        self.collection = mongo.db.bmi_history
+        self.collection = mongo.db[collection_name or self.COLLECTION_NAME]
+        # Derived data kept up to date on every save, each has record_bmi(bmi_data)
+        self.listeners = listeners or []
+        # Optional write-behind buffer, see start_write_behind
+        self.write_buffer = None
+
+    def start_write_behind(self, **options):
+        """Queue saves and insert them in batches in the background, see write_buffer.py"""
+        self.write_buffer = WriteBehindBuffer(self.collection, on_flushed=self.notify_flushed, **options)
+        return self.write_buffer
     
     def calculate_bmi(self, weight, height):
-        """Calculate BMI and return BMI value and status"""
-        try:
-            weight = float(weight)
-            height = float(height)
-
-            height_m = height / 100  # convert cm to m
-            bmi = weight / (height_m ** 2)
-            bmi = round(bmi, 1)
-
-            # Determine BMI category
-            if bmi < 18.5:
-                status = 'Kurus'
-            elif bmi < 25:
-                status = 'Normal'
-            elif bmi < 30:
-                status = 'Kelebihan Berat'
-            else:
-                status = 'Obesitas'
-            
-            return bmi, status
-        
-        except Exception as e:
-            print(f"Error calculating BMI: {str(e)}")
-            return None, None
+        """Calculate BMI and return BMI value and status, (None, None) for invalid input"""
+        return calculate_bmi(weight, height)
+
+    def calculate_bmi_batch(self, weights, heights):
+        """Calculate BMI for arrays of weights and heights, see bmi_calculator.calculate_bmi_batch"""
+        return calculate_bmi_batch(weights, heights)
+
+    def score_batch(self, weights, heights):
+        """Calculate a batch and build the response, invalid entries get None"""
+        bmi, status, valid = self.calculate_bmi_batch(weights, heights)
+
+        return {
+            'success': True,
+            'data': {
+                'bmi': [value if is_valid else None for value, is_valid in zip(bmi.tolist(), valid.tolist())],
+                'bmi_status': [value or None for value in status.tolist()],
+                'valid': valid.tolist()
+            },
+            'count': len(valid),
+            'invalid_count': int((~valid).sum())
+        }
     
+    def build_record(self, user_id, weight, height, notes=''):
+        """Build the BMI document to insert, None if BMI cannot be calculated"""
+        bmi, status = self.calculate_bmi(weight, height)
+        
+        if bmi is None or status is None:
+            return None
+
+        return {
+            'user_id': user_id,
+            'weight': float(weight),
+            'height': float(height),
+            'bmi': bmi,
+            'bmi_status': status,
+            'notes': notes,
+            'created_at': datetime.utcnow()
+        }
+
+    @staticmethod
+    def saved_response(inserted_id, bmi_data):
+        """Response returned after a BMI record was inserted"""
+        return {
+            'success': True,
+            'message': 'BMI berhasil disimpan',
+            'data': {
+                'id': str(inserted_id),
+                'bmi': bmi_data['bmi'],
+                'bmi_status': bmi_data['bmi_status'],
+                'weight': bmi_data['weight'],
+                'height': bmi_data['height'],
+                'created_at': bmi_data['created_at'].isoformat(),
+            }
+        }
+
     def save_bmi(self, user_id, weight, height, notes=''):
         """Save BMI to database"""
         try:
-            bmi, status = self.calculate_bmi(weight, height)
+            bmi_data = self.build_record(user_id, weight, height, notes)
             
-            if bmi is None or status is None:
+            if bmi_data is None:
                 return {'success': False, 'message': 'Error menghitung BMI'}
 
-            bmi_data = {
-                'user_id': user_id,
-                'weight': float(weight),
-                'height': float(height),
-                'bmi': bmi,
-                'bmi_status': status,
-                'notes': notes,
-                'created_at': datetime.utcnow()
-            }
+            if self.write_buffer is not None:
+                # Client-side _id, so the response is the same as for a direct insert
+                bmi_data['_id'] = ObjectId()
+                self.write_buffer.put(bmi_data)
+                return self.saved_response(bmi_data['_id'], bmi_data)
 
             result = self.collection.insert_one(bmi_data)
 
             if result.inserted_id:
-                return {
-                    'success': True,
-                    'message': 'BMI berhasil disimpan',
-                    'data': {
-                        'id': str(result.inserted_id),
-                        'bmi': bmi,
-                        'bmi_status': status,
-                        'weight': float(weight),
-                        'height': float(height),
-                        'created_at': bmi_data['created_at'].isoformat(),
-                    }
-                }
+                self.notify_saved(bmi_data)
+                return self.saved_response(result.inserted_id, bmi_data)
             
             return {'success': False, 'message': 'Gagal menyimpan BMI'}
         
+        except BufferFull:
+            raise
         except Exception as e:
             print(f"Error saving BMI: {str(e)}")
             return {'success': False, 'message': 'Error saving BMI', 'error': str(e)}
     
-    def get_user_bmi_history(self, user_id):
-        """Get user BMI history"""
+    @staticmethod
+    def encode_cursor(created_at, record_id):
+        """Encode the (created_at, _id) position of a record as an opaque cursor"""
+        raw = json.dumps([created_at.isoformat(), str(record_id)]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Decode an opaque cursor back to (created_at, ObjectId), raise ValueError if invalid"""
         try:
-            history = list(self.collection.find({'user_id': user_id}).sort('created_at', pymongo.DESCENDING))
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_at, record_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return datetime.fromisoformat(created_at), ObjectId(record_id)
+        except Exception:
+            raise ValueError('Cursor tidak valid')
 
-            # Convert ObjectId to string and format dates
-            for record in history:
-                record['id'] = str(record['_id'])
-                del record['_id']
-                record['date'] = record['created_at'].isoformat()
+    @staticmethod
+    def format_record(record):
+        """Expose _id as id and created_at as date, ObjectId/datetime are encoded by the JSON provider"""
+        record.pop('import_key', None)
+        record['id'] = record.pop('_id')
+        record['date'] = record['created_at']
+        return record
 
-            return {
-                'success': True,
-                'data': history
-            }
+    def build_history_query(self, user_id, after=None, date_from=None, date_to=None, fields=None):
+        """Build the (query, projection) for one history page
+
+        `after` is a decoded cursor (created_at, _id) returned by the previous page,
+        `date_from` is inclusive and `date_to` is exclusive.
+        """
+        conditions = [{'user_id': user_id}]
+
+        if date_from or date_to:
+            created_range = {}
+            if date_from:
+                created_range['$gte'] = date_from
+            if date_to:
+                created_range['$lt'] = date_to
+            conditions.append({'created_at': created_range})
+
+        # Keyset pagination: continue strictly after the last seen (created_at, _id)
+        if after:
+            after_created_at, after_id = after
+            conditions.append({'$or': [
+                {'created_at': {'$lt': after_created_at}},
+                {'created_at': after_created_at, '_id': {'$lt': after_id}}
+            ]})
+
+        query = conditions[0] if len(conditions) == 1 else {'$and': conditions}
+
+        # created_at is always needed to build the date and the next cursor
+        projection = None
+        if fields:
+            projection = {field: 1 for field in fields}
+            projection['created_at'] = 1
+
+        return query, projection
+
+    def history_limit(self, limit):
+        """Clamp a requested page size to the allowed maximum"""
+        return min(limit or self.DEFAULT_HISTORY_LIMIT, self.MAX_HISTORY_LIMIT)
+
+    def build_history_page(self, history, limit):
+        """Build the page response from up to limit + 1 fetched records"""
+        has_more = len(history) > limit
+        history = history[:limit]
+
+        next_cursor = None
+        if has_more:
+            next_cursor = self.encode_cursor(history[-1]['created_at'], history[-1]['_id'])
+
+        return {
+            'success': True,
+            'data': [self.format_record(record) for record in history],
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        }
+
+    def notify_saved(self, bmi_data):
+        """Update listeners after an insert, a failing listener does not fail the save"""
+        for listener in self.listeners:
+            try:
+                listener.record_bmi(bmi_data)
+            except Exception as e:
+                print(f"Error updating {type(listener).__name__}: {str(e)}")
+
+    def existing_dates(self, user_id, records):
+        """Query of the records' created_at values already stored for the user"""
+        return (
+            {'user_id': user_id, 'created_at': {'$in': [record['created_at'] for record in records]}},
+            {'created_at': 1, '_id': 0}
+        )
+
+    def import_records(self, user_id, records):
+        """Insert validated records (see bmi_import.py) that are not stored yet, return the number inserted"""
+        if not records:
+            return 0
+
+        existing = {record['created_at'] for record in self.collection.find(*self.existing_dates(user_id, records))}
+        fresh = [self.with_import_key(record) for record in records if record['created_at'] not in existing]
+
+        inserted = []
+        for start in range(0, len(fresh), self.IMPORT_BATCH_SIZE):
+            batch = fresh[start:start + self.IMPORT_BATCH_SIZE]
+            try:
+                self.collection.insert_many(batch, ordered=False)
+                inserted.extend(batch)
+            except BulkWriteError as e:
+                inserted.extend(self.inserted_documents(batch, e))
+
+        if inserted:
+            self.notify_saved_many(inserted)
+        return len(inserted)
+
+    # Imported records carry their date as import_key, unique per user among imported records (migration 5)
+    @staticmethod
+    def with_import_key(record):
+        return dict(record, import_key=record['created_at'])
+
+    @classmethod
+    def inserted_documents(cls, documents, error):
+        """Documents an unordered insert_many stored despite duplicate keys, re-raise any other failure
+
+        The unique (user_id, import_key) index rejects records a concurrent import
+        stored after the existing_dates read.
+        """
+        write_errors = error.details.get('writeErrors', [])
+        if error.details.get('writeConcernErrors') or any(e['code'] != cls.DUPLICATE_KEY_ERROR for e in write_errors):
+            raise error
+
+        duplicates = {e['index'] for e in write_errors}
+        return [document for index, document in enumerate(documents) if index not in duplicates]
+
+    def notify_saved_many(self, documents):
+        """Update listeners after a batch insert, with one bulk write each when they support it"""
+        for listener in self.listeners:
+            try:
+                if hasattr(listener, 'record_bmi_many'):
+                    listener.record_bmi_many(documents)
+                else:
+                    for bmi_data in documents:
+                        listener.record_bmi(bmi_data)
+            except Exception as e:
+                print(f"Error updating {type(listener).__name__}: {str(e)}")
+
+    def notify_flushed(self, documents):
+        """Update listeners after the write buffer inserted a batch"""
+        self.notify_saved_many(documents)
+
+    def get_user_bmi_history(self, user_id, limit=None, after=None, date_from=None, date_to=None, fields=None):
+        """Get one page of user BMI history, newest first"""
+        try:
+            limit = self.history_limit(limit)
+            query, projection = self.build_history_query(user_id, after, date_from, date_to, fields)
+
+            # Fetch one extra record to know whether another page exists
+            history = list(
+                self.collection.find(query, projection)
+                .sort(self.HISTORY_SORT)
+                .limit(limit + 1)
+            )
+
+            return self.build_history_page(history, limit)
     
         except Exception as e:
             print(f"Error getting BMI history: {str(e)}")
             return {'success': False, 'message': 'Gagal mengambil riwayat BMI', 'error': str(e)}
     
+    def build_trend_pipeline(self, user_id, bucket, date_from=None, date_to=None, timezone='UTC'):
+        """Aggregation that downsamples a user's history to day/week/month buckets"""
+        match = {'user_id': user_id}
+        if date_from or date_to:
+            match['created_at'] = {}
+            if date_from:
+                match['created_at']['$gte'] = date_from
+            if date_to:
+                match['created_at']['$lt'] = date_to
+
+        return [
+            {'$match': match},
+            {'$group': {
+                '_id': {'$dateTrunc': {
+                    'date': '$created_at',
+                    'unit': bucket,
+                    'timezone': timezone,
+                    'startOfWeek': 'monday'
+                }},
+                'count': {'$sum': 1},
+                'avg_weight': {'$avg': '$weight'},
+                'min_weight': {'$min': '$weight'},
+                'max_weight': {'$max': '$weight'},
+                'avg_bmi': {'$avg': '$bmi'},
+                'min_bmi': {'$min': '$bmi'},
+                'max_bmi': {'$max': '$bmi'},
+            }},
+            # Keep the most recent buckets when the range has more than the maximum
+            {'$sort': {'_id': -1}},
+            {'$limit': self.MAX_TREND_BUCKETS},
+            {'$sort': {'_id': 1}},
+            {'$project': {
+                '_id': 0,
+                'date': '$_id',
+                'count': 1,
+                'avg_weight': {'$round': ['$avg_weight', 1]},
+                'min_weight': 1,
+                'max_weight': 1,
+                'avg_bmi': {'$round': ['$avg_bmi', 1]},
+                'min_bmi': 1,
+                'max_bmi': 1,
+            }},
+        ]
+
+    @staticmethod
+    def trend_response(bucket, buckets):
+        return {'success': True, 'bucket': bucket, 'data': buckets}
+
+    def get_bmi_trend(self, user_id, bucket, date_from=None, date_to=None, timezone='UTC'):
+        """Get the user's BMI history downsampled to day/week/month buckets"""
+        try:
+            pipeline = self.build_trend_pipeline(user_id, bucket, date_from, date_to, timezone)
+            return self.trend_response(bucket, list(self.collection.aggregate(pipeline)))
+
+        except Exception as e:
+            print(f"Error getting BMI trend: {str(e)}")
+            return {'success': False, 'message': 'Gagal mengambil tren BMI', 'error': str(e)}
+
+    def iter_user_bmi_history(self, user_id, batch_size=EXPORT_BATCH_SIZE):
+        """Stream the full user BMI history, newest first, from a server-side cursor"""
+        cursor = (
+            self.collection.find({'user_id': user_id}, self.EXPORT_PROJECTION)
+            .sort(self.HISTORY_SORT)
+            .batch_size(batch_size)
+        )
+
+        try:
+            for record in cursor:
+                yield self.format_record(record)
+        finally:
+            cursor.close()
+    
     def get_latest_bmi(self, user_id):
         """Get latest BMI record for user"""
         try:
             latest_record = self.collection.find_one(
                 {'user_id': user_id},
-                sort=[('created_at', pymongo.DESCENDING)]
+                sort=self.HISTORY_SORT
             )
 
             if latest_record:
-                latest_record['id'] = str(latest_record['_id'])
-                del latest_record['_id']
-                latest_record['date'] = latest_record['created_at'].isoformat()
-                
                 return {
                     'success': True,
-                    'data': latest_record
+                    'data': self.format_record(latest_record)
                 }
             else:
                 return {'success': False, 'message': 'Tidak ada data BMI ditemukan untuk pengguna ini'}
@@ -0,0 +1,56 @@
+import numpy as np
+
+# BMI category thresholds and labels, category i covers [THRESHOLDS[i-1], THRESHOLDS[i])
+BMI_THRESHOLDS = np.array([18.5, 25.0, 30.0])
+BMI_CATEGORIES = np.array(['Kurus', 'Normal', 'Kelebihan Berat', 'Obesitas'])
+
+
+def to_float_array(values):
+    """Convert values to a float array, entries that cannot be converted become NaN"""
+    try:
+        return np.asarray(values, dtype=float).ravel()
+    except (TypeError, ValueError):
+        converted = np.empty(len(values), dtype=float)
+        for i, value in enumerate(values):
+            try:
+                converted[i] = float(value)
+            except (TypeError, ValueError):
+                converted[i] = np.nan
+        return converted
+
+
+def calculate_bmi_batch(weights, heights):
+    """Calculate BMI for arrays of weights (kg) and heights (cm)
+
+    Returns (bmi, status, valid): BMI rounded to one decimal, category labels and a
+    mask of valid inputs. Invalid entries get NaN BMI and an empty status.
+    """
+    weights = to_float_array(weights)
+    heights = to_float_array(heights)
+
+    if weights.shape != heights.shape:
+        raise ValueError('Jumlah data berat dan tinggi harus sama')
+
+    valid = np.isfinite(weights) & np.isfinite(heights) & (weights > 0) & (heights > 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        height_m = heights / 100  # convert cm to m
+        bmi = np.round(weights / (height_m ** 2), 1)
+
+    valid &= np.isfinite(bmi)
+    bmi[~valid] = np.nan
+
+    status = BMI_CATEGORIES[np.digitize(np.where(valid, bmi, 0), BMI_THRESHOLDS)]
+    status[~valid] = ''
+
+    return bmi, status, valid
+
+
+def calculate_bmi(weight, height):
+    """Calculate BMI for a single weight/height pair, (None, None) if invalid"""
+    bmi, status, valid = calculate_bmi_batch([weight], [height])
+
+    if not valid[0]:
+        return None, None
+
+    return float(bmi[0]), str(status[0])
@@ -0,0 +1,325 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+import pymongo
+
+class BMISummary:
+    """Per-user BMI summary kept up to date on every save
+
+    One document per user in `bmi_summary` (_id = user_id) holds running counts,
+    sums, min/max and the most recent points, so summary reads never touch
+    `bmi_history`. Every update increments `version`, rebuild only replaces a
+    summary no save has updated since the rebuild started.
+    """
+
+    # Number of most recent points kept for the rolling window, the window fields
+    # are only reported while these points reach back to the window start
+    RECENT_POINTS_LIMIT = 60
+
+    # Attempts to rebuild a user whose summary keeps changing during the rebuild
+    REBUILD_RETRIES = 3
+
+    DUPLICATE_KEY_ERROR = 11000
+
+    # Rolling window used for the "change over the last N days" fields
+    WINDOW_DAYS = 30
+
+    def __init__(self, mongo):
+        self.mongo = mongo
+        self.collection = mongo.db.bmi_summary
+
+    @classmethod
+    def build_update(cls, bmi_data):
+        """Atomic update applying one new BMI record to the summary"""
+        return cls.build_batch_update([bmi_data])
+
+    @classmethod
+    def build_batch_update(cls, records):
+        """Atomic update applying new BMI records of one user to the summary"""
+        bmis = [record['bmi'] for record in records]
+        weights = [record['weight'] for record in records]
+        dates = [record['created_at'] for record in records]
+
+        # Only the newest points of the batch can survive the cap
+        points = sorted(
+            ({'at': record['created_at'], 'weight': record['weight'], 'bmi': record['bmi']} for record in records),
+            key=lambda point: point['at']
+        )[-cls.RECENT_POINTS_LIMIT:]
+
+        return {
+            '$inc': {
+                'count': len(records),
+                'sum_bmi': sum(bmis),
+                'sum_weight': sum(weights),
+                'version': 1,
+            },
+            '$min': {
+                'min_bmi': min(bmis),
+                'min_weight': min(weights),
+                'first_at': min(dates),
+            },
+            '$max': {
+                'max_bmi': max(bmis),
+                'max_weight': max(weights),
+                'last_at': max(dates),
+            },
+            # Kept sorted by time and capped, so backdated records land in place
+            '$push': {
+                'recent': {
+                    '$each': points,
+                    '$sort': {'at': 1},
+                    '$slice': -cls.RECENT_POINTS_LIMIT,
+                }
+            },
+            '$set': {'updated_at': datetime.utcnow()},
+        }
+
+    @classmethod
+    def batch_writes(cls, documents):
+        """One upsert per user for a batch of saved records"""
+        by_user = {}
+        for bmi_data in documents:
+            by_user.setdefault(bmi_data['user_id'], []).append(bmi_data)
+
+        return [
+            UpdateOne({'_id': user_id}, cls.build_batch_update(records), upsert=True)
+            for user_id, records in by_user.items()
+        ]
+
+    def record_bmi(self, bmi_data):
+        """Apply a saved BMI record to the owner's summary"""
+        self.collection.update_one({'_id': bmi_data['user_id']}, self.build_update(bmi_data), upsert=True)
+
+    def record_bmi_many(self, documents):
+        """Apply a batch of saved BMI records with one bulk write"""
+        self.collection.bulk_write(self.batch_writes(documents), ordered=False)
+
+    @classmethod
+    def format_summary(cls, summary, now=None):
+        """Build the summary response data, rolling window fields from the recent points
+
+        With more than RECENT_POINTS_LIMIT records inside the window the points do
+        not cover it: the window fields are then None and window_truncated is set.
+        """
+        now = now or datetime.utcnow()
+        recent = summary.get('recent', [])
+        latest = recent[-1] if recent else None
+
+        window_start = now - timedelta(days=cls.WINDOW_DAYS)
+        window = [point for point in recent if point['at'] >= window_start]
+        # Complete when every record is kept or older points than the window start are
+        truncated = len(recent) < summary['count'] and bool(recent) and recent[0]['at'] >= window_start
+
+        return {
+            'count': summary['count'],
+            'avg_bmi': round(summary['sum_bmi'] / summary['count'], 1),
+            'avg_weight': round(summary['sum_weight'] / summary['count'], 1),
+            'min_bmi': summary['min_bmi'],
+            'max_bmi': summary['max_bmi'],
+            'min_weight': summary['min_weight'],
+            'max_weight': summary['max_weight'],
+            'latest_bmi': latest['bmi'] if latest else None,
+            'latest_weight': latest['weight'] if latest else None,
+            'first_date': summary['first_at'].isoformat(),
+            'last_date': summary['last_at'].isoformat(),
+            'window_days': cls.WINDOW_DAYS,
+            'window_points_limit': cls.RECENT_POINTS_LIMIT,
+            'window_truncated': truncated,
+            'window_count': None if truncated else len(window),
+            'window_bmi_change': round(window[-1]['bmi'] - window[0]['bmi'], 1) if window and not truncated else None,
+            'window_weight_change': round(window[-1]['weight'] - window[0]['weight'], 1) if window and not truncated else None,
+        }
+
+    def get_summary(self, user_id):
+        """Get the BMI summary of a user with one primary key read"""
+        try:
+            summary = self.collection.find_one({'_id': user_id})
+
+            if summary:
+                return {'success': True, 'data': self.format_summary(summary)}
+            else:
+                return {'success': False, 'message': 'Tidak ada data BMI ditemukan untuk pengguna ini'}
+
+        except Exception as e:
+            print(f"Error getting BMI summary: {str(e)}")
+            return {'success': False, 'message': 'Gagal mengambil ringkasan BMI', 'error': str(e)}
+
+    @staticmethod
+    def new_totals(record):
+        """Running totals of a user's records, starting from the newest one"""
+        return {
+            'recent': [],
+            'count': 0,
+            'sum_bmi': 0.0,
+            'sum_weight': 0.0,
+            'min_bmi': record['bmi'],
+            'max_bmi': record['bmi'],
+            'min_weight': record['weight'],
+            'max_weight': record['weight'],
+            'first_at': record['created_at'],
+            'last_at': record['created_at'],
+        }
+
+    def add_to_totals(self, totals, record):
+        totals['count'] += 1
+        totals['sum_bmi'] += record['bmi']
+        totals['sum_weight'] += record['weight']
+        totals['min_bmi'] = min(totals['min_bmi'], record['bmi'])
+        totals['max_bmi'] = max(totals['max_bmi'], record['bmi'])
+        totals['min_weight'] = min(totals['min_weight'], record['weight'])
+        totals['max_weight'] = max(totals['max_weight'], record['weight'])
+        # Records stream newest first, so the last one seen is the oldest
+        totals['first_at'] = record['created_at']
+
+        if len(totals['recent']) < self.RECENT_POINTS_LIMIT:
+            totals['recent'].append(record)
+
+    def summary_document(self, user_id, totals, version, rebuild_id):
+        """Full summary document from a user's totals, carrying the version it replaces"""
+        recent = [
+            {'at': record['created_at'], 'weight': record['weight'], 'bmi': record['bmi']}
+            for record in totals['recent']
+        ]
+        recent.reverse()
+
+        document = {key: value for key, value in totals.items() if key != 'recent'}
+        document.update({
+            '_id': user_id,
+            'recent': recent,
+            # $inc needs a number, a summary without a version yet counts as 0
+            'version': version or 0,
+            'rebuild_id': rebuild_id,
+            'updated_at': datetime.utcnow(),
+        })
+        return document
+
+    @staticmethod
+    def replace_filter(user_id, version):
+        """Match the summary only at the version read before its records, None matches a summary without one"""
+        return {'_id': user_id, 'version': version}
+
+    def write_rebuilt(self, writes):
+        """Apply rebuilt summaries, a replace losing to a concurrent save is retried later"""
+        try:
+            self.collection.bulk_write(writes, ordered=False)
+        except BulkWriteError as e:
+            # The upsert of a summary created meanwhile collides on _id
+            if any(error['code'] != self.DUPLICATE_KEY_ERROR for error in e.details.get('writeErrors', [])):
+                raise
+
+    def rebuild_user(self, history, user_id, rebuild_id):
+        """Recompute one user's summary, return whether it was replaced before a save changed it again"""
+        summary = self.collection.find_one({'_id': user_id}, {'version': 1})
+        version = summary.get('version') if summary else None
+
+        totals = None
+        cursor = history.find({'user_id': user_id}, {'user_id': 1, 'weight': 1, 'bmi': 1, 'created_at': 1}).sort('created_at', pymongo.DESCENDING)
+        try:
+            for record in cursor:
+                if totals is None:
+                    totals = self.new_totals(record)
+                self.add_to_totals(totals, record)
+        finally:
+            cursor.close()
+
+        if totals is None:
+            return True
+
+        try:
+            result = self.collection.replace_one(
+                self.replace_filter(user_id, version), self.summary_document(user_id, totals, version, rebuild_id), upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return bool(result.matched_count or result.upserted_id)
+
+    def rebuild(self, history, batch_size=1000, write_batch_size=500):
+        """Recompute every summary from the history collection in one streaming pass, return the number of users
+
+        Summary versions are read before the history, a save during the rebuild
+        increments its user's version so the replace skips it instead of losing
+        the save. Those users are recomputed one by one afterwards.
+        """
+        rebuild_id = ObjectId()
+        versions = {summary['_id']: summary.get('version') for summary in self.collection.find({}, {'version': 1})}
+
+        cursor = (
+            history
+            .find({}, {'user_id': 1, 'weight': 1, 'bmi': 1, 'created_at': 1})
+            .sort([('user_id', pymongo.ASCENDING), ('created_at', pymongo.DESCENDING)])
+            .batch_size(batch_size)
+        )
+
+        writes = []
+        rebuilt = []
+        user_id = None
+        totals = None
+
+        def flush_user():
+            version = versions.get(user_id)
+            writes.append(ReplaceOne(
+                self.replace_filter(user_id, version), self.summary_document(user_id, totals, version, rebuild_id), upsert=True
+            ))
+            rebuilt.append(user_id)
+
+        try:
+            for record in cursor:
+                if totals is None or record['user_id'] != user_id:
+                    if totals is not None:
+                        flush_user()
+                        if len(writes) >= write_batch_size:
+                            self.write_rebuilt(writes)
+                            writes = []
+
+                    user_id = record['user_id']
+                    totals = self.new_totals(record)
+
+                self.add_to_totals(totals, record)
+
+            if totals is not None:
+                flush_user()
+            if writes:
+                self.write_rebuilt(writes)
+        finally:
+            cursor.close()
+
+        # Users saved to during the pass kept their incremental summary, recompute them now
+        replaced = {summary['_id'] for summary in self.collection.find({'rebuild_id': rebuild_id}, {'_id': 1})}
+        for user_id in rebuilt:
+            if user_id in replaced:
+                continue
+            for _ in range(self.REBUILD_RETRIES):
+                if self.rebuild_user(history, user_id, rebuild_id):
+                    break
+            else:
+                print(f"Error rebuilding BMI summary of {user_id}: changed during every attempt")
+
+        return len(rebuilt)
+
+
+class AsyncBMISummary(BMISummary):
+    """BMISummary on an async MongoDB database, used by the ASGI mode"""
+
+    def __init__(self, db):
+        self.mongo = None
+        self.collection = db.bmi_summary
+
+    async def record_bmi(self, bmi_data):
+        await self.collection.update_one({'_id': bmi_data['user_id']}, self.build_update(bmi_data), upsert=True)
+
+    async def record_bmi_many(self, documents):
+        await self.collection.bulk_write(self.batch_writes(documents), ordered=False)
+
+    async def get_summary(self, user_id):
+        try:
+            summary = await self.collection.find_one({'_id': user_id})
+
+            if summary:
+                return {'success': True, 'data': self.format_summary(summary)}
+            else:
+                return {'success': False, 'message': 'Tidak ada data BMI ditemukan untuk pengguna ini'}
+
+        except Exception as e:
+            print(f"Error getting BMI summary: {str(e)}")
+            return {'success': False, 'message': 'Gagal mengambil ringkasan BMI', 'error': str(e)}
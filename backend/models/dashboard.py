@@ -0,0 +1,111 @@
+from bson import ObjectId
+
+from models.bmi_summary import BMISummary
+from cache import call_cache
+
+class Dashboard:
+    """Everything the dashboard shows, read with a single aggregation
+
+    The pipeline starts on the user document and pulls the most recent BMI records
+    and the BMI summary with uncorrelated $lookup sub-pipelines, so the profile,
+    latest BMI and recent trend cost one database round trip.
+    """
+
+    DEFAULT_RECENT_LIMIT = 7
+    MAX_RECENT_LIMIT = 30
+
+    def __init__(self, mongo, user_model, bmi_model):
+        self.mongo = mongo
+        self.collection = mongo.db.users
+        self.user_model = user_model
+        self.bmi_model = bmi_model
+
+    def recent_limit(self, limit):
+        return min(limit or self.DEFAULT_RECENT_LIMIT, self.MAX_RECENT_LIMIT)
+
+    def build_pipeline(self, user_id, recent_limit):
+        return [
+            {'$match': {'_id': ObjectId(user_id)}},
+            {'$project': {'password': 0}},
+            {'$lookup': {
+                'from': self.bmi_model.collection.name,
+                'pipeline': [
+                    {'$match': {'user_id': user_id}},
+                    {'$sort': dict(self.bmi_model.HISTORY_SORT)},
+                    {'$limit': recent_limit},
+                    {'$project': self.bmi_model.EXPORT_PROJECTION},
+                ],
+                'as': 'recent_bmi'
+            }},
+            {'$lookup': {
+                'from': 'bmi_summary',
+                'pipeline': [{'$match': {'_id': user_id}}],
+                'as': 'bmi_summary'
+            }},
+        ]
+
+    def dashboard_response(self, document):
+        recent = [self.bmi_model.format_record(record) for record in document.pop('recent_bmi')]
+        summaries = document.pop('bmi_summary')
+
+        return {
+            'success': True,
+            'data': {
+                'user': self.user_model.build_profile(document),
+                'latest_bmi': recent[0] if recent else None,
+                'recent_bmi': recent,
+                'summary': BMISummary.format_summary(summaries[0]) if summaries else None
+            }
+        }
+
+    def build_dashboard(self, user_id, document):
+        result = self.dashboard_response(document)
+
+        # The profile was read anyway, refresh the profile cache with it
+        if self.user_model.cache is not None:
+            self.user_model.cache.set(user_id, result['data']['user'])
+
+        return result
+
+    def get_dashboard(self, user_id, recent_limit=None):
+        """Get profile, latest BMI, recent BMI records and summary in one round trip"""
+        try:
+            pipeline = self.build_pipeline(user_id, self.recent_limit(recent_limit))
+            documents = list(self.collection.aggregate(pipeline))
+
+            if documents:
+                return self.build_dashboard(user_id, documents[0])
+            else:
+                return {'success': False, 'message': 'User tidak ditemukan'}
+
+        except Exception as e:
+            print(f"Error getting dashboard: {str(e)}")
+            return {'success': False, 'message': 'Gagal mengambil data dashboard', 'error': str(e)}
+
+
+class AsyncDashboard(Dashboard):
+    """Dashboard on an async MongoDB database, used by the ASGI mode"""
+
+    def __init__(self, db, user_model, bmi_model):
+        self.mongo = None
+        self.collection = db.users
+        self.user_model = user_model
+        self.bmi_model = bmi_model
+
+    async def get_dashboard(self, user_id, recent_limit=None):
+        try:
+            pipeline = self.build_pipeline(user_id, self.recent_limit(recent_limit))
+            cursor = await self.collection.aggregate(pipeline)
+            documents = await cursor.to_list()
+
+            if not documents:
+                return {'success': False, 'message': 'User tidak ditemukan'}
+
+            result = self.dashboard_response(documents[0])
+            if self.user_model.cache is not None:
+                await call_cache(self.user_model.cache.set, user_id, result['data']['user'])
+            return result
+
+        except Exception as e:
+            print(f"Error getting dashboard: {str(e)}")
+            return {'success': False, 'message': 'Gagal mengambil data dashboard', 'error': str(e)}
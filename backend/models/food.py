@@ -0,0 +1,156 @@
+import csv
+import os
+
+import numpy as np
+
+# Bundled nutrition dataset, values per serving
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'foods.csv')
+
+
+class Food:
+    """Food nutrition index and recommendations
+
+    The dataset is loaded once into a columnar matrix (one row per food, one column
+    per nutrient) and the per-food scoring features are precomputed, so a
+    recommendation is a single matrix-vector product plus argpartition over every
+    food, independent of how many foods there are.
+    """
+
+    # Matrix columns, per serving: energy (kcal) and grams of each macro
+    NUTRIENTS = ['kcal', 'protein', 'fat', 'carbs', 'fiber']
+
+    MEALS = ['breakfast', 'lunch', 'dinner', 'snack']
+
+    DEFAULT_TOP_K = 10
+    MAX_TOP_K = 50
+
+    # Feature weights (protein, fat, carbs share of energy, fiber per 100 kcal) and
+    # preferred kcal per serving for every fitness goal
+    GOAL_WEIGHTS = {
+        'Menurunkan Berat': ([1.0, -0.6, -0.3, 0.8], 350),
+        'Menambah Massa Otot': ([1.5, 0.0, 0.4, 0.2], 600),
+        'Menjaga Kesehatan': ([0.5, -0.2, 0.1, 0.8], 450),
+        'Meningkatkan Stamina': ([0.5, 0.0, 0.8, 0.4], 500),
+    }
+    DEFAULT_GOAL = 'Menjaga Kesehatan'
+
+    # Adjustments by BMI category: (added feature weights, kcal factor)
+    BMI_ADJUSTMENTS = {
+        'Kurus': ([0.2, 0.2, 0.3, 0.0], 1.2),
+        'Normal': ([0.0, 0.0, 0.0, 0.0], 1.0),
+        'Kelebihan Berat': ([0.2, -0.3, -0.1, 0.2], 0.85),
+        'Obesitas': ([0.3, -0.4, -0.2, 0.3], 0.75),
+    }
+
+    # Weight of the distance to the preferred kcal per serving
+    KCAL_PENALTY = 1.0
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_DATA_PATH
+        self.foods, self.matrix = self.load_csv(self.path)
+        self.meal_masks = {
+            meal: np.array([meal in food['meals'] for food in self.foods], dtype=bool)
+            for meal in self.MEALS
+        }
+        self.features = self.build_features(self.matrix)
+
+    @classmethod
+    def load_csv(cls, path):
+        """Read the dataset, return (food info dicts, nutrient matrix of shape (foods, nutrients))"""
+        foods = []
+        rows = []
+
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                rows.append([float(row[nutrient]) for nutrient in cls.NUTRIENTS])
+                foods.append({
+                    'id': row['id'],
+                    'name': row['name'],
+                    'category': row['category'],
+                    'meals': row['meals'].split('|'),
+                    'serving': row['serving'],
+                })
+
+        matrix = np.array(rows, dtype=float).reshape(-1, len(cls.NUTRIENTS))
+
+        # Nutrient values are part of the response, attach them once here
+        for food, values in zip(foods, matrix.tolist()):
+            food.update(zip(cls.NUTRIENTS, values))
+
+        return foods, matrix
+
+    @staticmethod
+    def build_features(matrix):
+        """Scoring features per food: protein/fat/carbs share of energy and fiber per 100 kcal (scaled to ~0-1)"""
+        kcal = np.maximum(matrix[:, 0], 1.0)
+        return np.column_stack([
+            matrix[:, 1] * 4 / kcal,
+            matrix[:, 2] * 9 / kcal,
+            matrix[:, 3] * 4 / kcal,
+            matrix[:, 4] / kcal * 10,
+        ])
+
+    def scoring_criteria(self, profile):
+        """Feature weights and preferred kcal per serving for a user profile"""
+        goal = profile.get('fitnessGoal') if profile.get('fitnessGoal') in self.GOAL_WEIGHTS else self.DEFAULT_GOAL
+        weights, target_kcal = self.GOAL_WEIGHTS[goal]
+        weights = np.array(weights, dtype=float)
+
+        bmi_status = profile.get('bmi_status')
+        if bmi_status in self.BMI_ADJUSTMENTS:
+            extra, factor = self.BMI_ADJUSTMENTS[bmi_status]
+            weights = weights + extra
+            target_kcal *= factor
+
+        # Direction to the target weight: lighter portions and more fiber to lose, more energy and protein to gain
+        current_weight = profile.get('currentWeight')
+        target_weight = profile.get('targetWeight')
+        if current_weight and target_weight:
+            if target_weight < current_weight - 1:
+                weights = weights + [0.0, 0.0, 0.0, 0.2]
+                target_kcal *= 0.9
+            elif target_weight > current_weight + 1:
+                weights = weights + [0.2, 0.0, 0.0, 0.0]
+                target_kcal *= 1.1
+
+        return goal, bmi_status, weights, round(target_kcal)
+
+    def score(self, weights, target_kcal):
+        """Score every food in one vectorized pass"""
+        kcal_distance = np.abs(self.matrix[:, 0] - target_kcal) / target_kcal
+        return self.features @ weights - self.KCAL_PENALTY * kcal_distance
+
+    def top_k(self, scores, k, mask=None):
+        """Indexes of the k best scores, best first"""
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+            k = min(k, int(mask.sum()))
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.array([], dtype=int)
+
+        # argpartition finds the k best in linear time, only those k are sorted
+        best = np.argpartition(-scores, k - 1)[:k]
+        return best[np.argsort(-scores[best])]
+
+    def recommend(self, profile, k=None, meal=None):
+        """Top-k foods for a user profile (see User.build_profile), optionally for one meal"""
+        try:
+            goal, bmi_status, weights, target_kcal = self.scoring_criteria(profile)
+            scores = self.score(weights, target_kcal)
+            best = self.top_k(scores, min(k or self.DEFAULT_TOP_K, self.MAX_TOP_K), self.meal_masks.get(meal))
+
+            return {
+                'success': True,
+                'data': [dict(self.foods[i], score=round(float(scores[i]), 3)) for i in best],
+                'criteria': {
+                    'fitnessGoal': goal,
+                    'bmi_status': bmi_status,
+                    'target_kcal': target_kcal,
+                    'meal': meal,
+                }
+            }
+
+        except Exception as e:
+            print(f"Error recommending food: {str(e)}")
+            return {'success': False, 'message': 'Gagal mengambil rekomendasi makanan', 'error': str(e)}
@@ -0,0 +1,337 @@
+from datetime import datetime, timedelta
+from math import sqrt
+from pymongo import ReplaceOne, UpdateOne
+import pymongo
+
+# Times are stored as days since this epoch
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_days(at):
+    return (at - EPOCH).total_seconds() / 86400
+
+
+class Forecast:
+    """Goal-weight forecasts from running least-squares statistics per user
+
+    One document per user in `bmi_forecast` (_id = user_id) holds the weighted
+    sums of a linear regression of weight on time (n, Σt, Σw, Σt², Σtw, plus Σw²
+    and Σu² for the confidence band), updated with one atomic write per saved
+    record (as a BMI listener). Forecasts are read back from that single
+    document, never from `bmi_history`.
+
+    With a half-life, older weigh-ins count exponentially less: the sums are kept
+    relative to an `anchor` time (the newest weigh-in) and rescaled on the server
+    whenever it moves forward, so weights never overflow.
+    """
+
+    COLLECTION_NAME = 'bmi_forecast'
+
+    # Statistic fields: weighted count, Σt, Σw, Σt², Σtw, Σw² and the sum of squared weights
+    STATS = ['n', 't', 'w', 'tt', 'tw', 'ww', 'uu']
+
+    # Minimum weigh-ins and time span (days) before a trend is reported
+    MIN_POINTS = 3
+    MIN_SPAN_DAYS = 1.0
+
+    # Target counts as reached within this many kg
+    GOAL_TOLERANCE = 0.5
+
+    # Goal dates further out than this are not reported
+    MAX_FORECAST_DAYS = 3 * 365
+
+    # Normal quantile of the confidence band (95%)
+    CONFIDENCE_Z = 1.96
+
+    def __init__(self, mongo, half_life_days=None):
+        self.mongo = mongo
+        self.collection = mongo.db[self.COLLECTION_NAME]
+        # None or 0 disables decay, every weigh-in then counts the same
+        self.half_life_days = half_life_days or None
+
+    def decay(self, age_days):
+        """Weight of an observation age_days older than the anchor"""
+        return 0.5 ** (age_days / self.half_life_days) if self.half_life_days else 1.0
+
+    def batch_stats(self, records):
+        """Weighted sums of one user's records relative to the newest of them, return (sums, anchor)"""
+        days = [to_days(record['created_at']) for record in records]
+        anchor = max(days)
+        sums = dict.fromkeys(self.STATS, 0.0)
+
+        for t, record in zip(days, records):
+            u = self.decay(anchor - t)
+            w = record['weight']
+            sums['n'] += u
+            sums['t'] += u * t
+            sums['w'] += u * w
+            sums['tt'] += u * t * t
+            sums['tw'] += u * t * w
+            sums['ww'] += u * w * w
+            sums['uu'] += u * u
+
+        return sums, anchor
+
+    def scale_expression(self, since):
+        """Server-side decay factor between the expression `since` and the stored anchor"""
+        if not self.half_life_days:
+            return 1.0
+        return {'$pow': [0.5, {'$divide': [{'$subtract': ['$anchor', since]}, self.half_life_days]}]}
+
+    def build_update(self, records):
+        """Atomic pipeline update adding new records of one user to the statistics
+
+        The anchor moves to the newest weigh-in seen, existing sums and the batch
+        sums are both decayed to it, so the update needs no prior read.
+        """
+        sums, anchor = self.batch_stats(records)
+        dates = [record['created_at'] for record in records]
+
+        return [
+            {'$set': {
+                '_previous_anchor': {'$ifNull': ['$anchor', anchor]},
+                'anchor': {'$max': [{'$ifNull': ['$anchor', anchor]}, anchor]},
+            }},
+            {'$set': {'_previous_scale': self.scale_expression('$_previous_anchor')}},
+            {'$set': dict(
+                {
+                    field: {'$add': [
+                        {'$multiply': [{'$ifNull': [f'${field}', 0]}, '$_previous_scale']},
+                        {'$multiply': [value, self.scale_expression(anchor)]},
+                    ]}
+                    for field, value in sums.items() if field != 'uu'
+                },
+                # Squared weights decay with the square of the factor
+                uu={'$add': [
+                    {'$multiply': [{'$ifNull': ['$uu', 0]}, '$_previous_scale', '$_previous_scale']},
+                    {'$multiply': [sums['uu'], self.scale_expression(anchor), self.scale_expression(anchor)]},
+                ]},
+                count={'$add': [{'$ifNull': ['$count', 0]}, len(records)]},
+                first_at={'$min': [{'$ifNull': ['$first_at', min(dates)]}, min(dates)]},
+                last_at={'$max': [{'$ifNull': ['$last_at', max(dates)]}, max(dates)]},
+                updated_at=datetime.utcnow(),
+            )},
+            {'$project': {'_previous_anchor': 0, '_previous_scale': 0}},
+        ]
+
+    def batch_writes(self, documents):
+        """One update per user for a batch of saved records"""
+        by_user = {}
+        for bmi_data in documents:
+            by_user.setdefault(bmi_data['user_id'], []).append(bmi_data)
+
+        return [
+            UpdateOne({'_id': user_id}, self.build_update(records), upsert=True)
+            for user_id, records in by_user.items()
+        ]
+
+    def record_bmi(self, bmi_data):
+        """Add a saved BMI record to the owner's statistics"""
+        self.collection.update_one({'_id': bmi_data['user_id']}, self.build_update([bmi_data]), upsert=True)
+
+    def record_bmi_many(self, documents):
+        """Add a batch of saved BMI records with one bulk write"""
+        self.collection.bulk_write(self.batch_writes(documents), ordered=False)
+
+    @classmethod
+    def fit(cls, stats):
+        """Weighted least-squares line from the sums, return (slope kg/day, slope std error, fitted weight at last_at)
+
+        None when there are too few weigh-ins or they span too little time.
+        """
+        n = stats.get('n', 0)
+        if stats.get('count', 0) < cls.MIN_POINTS or n <= 0:
+            return None
+
+        mean_t = stats['t'] / n
+        mean_w = stats['w'] / n
+        stt = stats['tt'] - stats['t'] * mean_t
+        stw = stats['tw'] - stats['t'] * mean_w
+        sww = stats['ww'] - stats['w'] * mean_w
+
+        span = (stats['last_at'] - stats['first_at']).total_seconds() / 86400
+        if stt <= 0 or span < cls.MIN_SPAN_DAYS:
+            return None
+
+        slope = stw / stt
+        fitted = mean_w + slope * (to_days(stats['last_at']) - mean_t)
+
+        # Effective sample size under decay (Kish), equals count without it
+        effective = n * n / stats['uu'] if stats.get('uu') else stats['count']
+        if effective <= 2:
+            return slope, None, fitted
+
+        # Residual variance per unit weight and the slope error scaled to the effective sample size
+        residual = max(sww - slope * stw, 0.0) / n * effective / (effective - 2)
+        error = sqrt(residual / (stt * effective / n))
+
+        return slope, error, fitted
+
+    @classmethod
+    def days_to_goal(cls, remaining, slope):
+        """Days until a remaining weight change is covered at a slope, None if moving away or too slow"""
+        if slope == 0 or remaining / slope <= 0:
+            return None
+        days = remaining / slope
+        return days if days <= cls.MAX_FORECAST_DAYS else None
+
+    @classmethod
+    def format_forecast(cls, stats, target_weight):
+        """Projected goal date, weekly rate and confidence band"""
+        last_at = stats['last_at']
+        data = {
+            'count': stats['count'],
+            'target_weight': target_weight,
+            'last_date': last_at.isoformat(),
+            'current_weight': None,
+            'rate_per_week': None,
+            'rate_band_per_week': None,
+            'goal_date': None,
+            'goal_date_band': None,
+            'status': 'insufficient_data',
+        }
+
+        result = cls.fit(stats)
+        if result is None:
+            return data
+
+        slope, error, fitted = result
+        data['current_weight'] = round(fitted, 1)
+        data['rate_per_week'] = round(slope * 7, 2)
+
+        if error is not None:
+            low = slope - cls.CONFIDENCE_Z * error
+            high = slope + cls.CONFIDENCE_Z * error
+            data['rate_band_per_week'] = [round(low * 7, 2), round(high * 7, 2)]
+
+        if target_weight is None:
+            data['status'] = 'no_target'
+            return data
+
+        remaining = target_weight - fitted
+        if abs(remaining) <= cls.GOAL_TOLERANCE:
+            data['status'] = 'reached'
+            return data
+
+        days = cls.days_to_goal(remaining, slope)
+        if days is None:
+            data['status'] = 'off_track'
+            return data
+
+        data['status'] = 'on_track'
+        data['goal_date'] = (last_at + timedelta(days=days)).date().isoformat()
+
+        if error is not None:
+            # The steepest plausible slope gives the earliest date, the flattest the latest (open if it may stall)
+            steep, flat = (low, high) if slope < 0 else (high, low)
+            earliest = cls.days_to_goal(remaining, steep)
+            latest = cls.days_to_goal(remaining, flat)
+            data['goal_date_band'] = {
+                'earliest': (last_at + timedelta(days=earliest)).date().isoformat() if earliest is not None else None,
+                'latest': (last_at + timedelta(days=latest)).date().isoformat() if latest is not None else None,
+            }
+
+        return data
+
+    def forecast_response(self, stats, profile):
+        if not stats:
+            return {'success': False, 'message': 'Tidak ada data BMI ditemukan untuk pengguna ini'}
+
+        target_weight = profile.get('targetWeight')
+        return {
+            'success': True,
+            'data': self.format_forecast(stats, float(target_weight) if target_weight else None),
+        }
+
+    def get_forecast(self, user_id, profile):
+        """Goal forecast of a user with one primary key read, profile as from User.get_user_profile"""
+        try:
+            return self.forecast_response(self.collection.find_one({'_id': user_id}), profile)
+
+        except Exception as e:
+            print(f"Error getting BMI forecast: {str(e)}")
+            return {'success': False, 'message': 'Gagal menghitung perkiraan target', 'error': str(e)}
+
+    def rebuild(self, history, batch_size=1000, write_batch_size=500):
+        """Recompute every user's statistics from the history collection in one streaming pass, return the number of users"""
+        cursor = (
+            history
+            .find({}, {'user_id': 1, 'weight': 1, 'created_at': 1})
+            .sort([('user_id', pymongo.ASCENDING), ('created_at', pymongo.DESCENDING)])
+            .batch_size(batch_size)
+        )
+
+        writes = []
+        users = 0
+        current = None
+
+        def flush_user():
+            nonlocal users
+            document = {key: value for key, value in current.items() if key != 'user_id'}
+            document.update({'_id': current['user_id'], 'updated_at': datetime.utcnow()})
+            writes.append(ReplaceOne({'_id': document['_id']}, document, upsert=True))
+            users += 1
+
+        try:
+            for record in cursor:
+                t = to_days(record['created_at'])
+                if current is None or record['user_id'] != current['user_id']:
+                    if current is not None:
+                        flush_user()
+                        if len(writes) >= write_batch_size:
+                            self.collection.bulk_write(writes, ordered=False)
+                            writes = []
+
+                    # Records stream newest first, the first one is the anchor
+                    current = dict.fromkeys(self.STATS, 0.0)
+                    current.update({
+                        'user_id': record['user_id'],
+                        'anchor': t,
+                        'count': 0,
+                        'first_at': record['created_at'],
+                        'last_at': record['created_at'],
+                    })
+
+                u = self.decay(current['anchor'] - t)
+                w = record['weight']
+                current['n'] += u
+                current['t'] += u * t
+                current['w'] += u * w
+                current['tt'] += u * t * t
+                current['tw'] += u * t * w
+                current['ww'] += u * w * w
+                current['uu'] += u * u
+                current['count'] += 1
+                current['first_at'] = record['created_at']
+
+            if current is not None:
+                flush_user()
+            if writes:
+                self.collection.bulk_write(writes, ordered=False)
+        finally:
+            cursor.close()
+
+        return users
+
+
+class AsyncForecast(Forecast):
+    """Forecast on an async MongoDB database, used by the ASGI mode"""
+
+    def __init__(self, db, half_life_days=None):
+        self.mongo = None
+        self.collection = db[self.COLLECTION_NAME]
+        self.half_life_days = half_life_days or None
+
+    async def record_bmi(self, bmi_data):
+        await self.collection.update_one({'_id': bmi_data['user_id']}, self.build_update([bmi_data]), upsert=True)
+
+    async def record_bmi_many(self, documents):
+        await self.collection.bulk_write(self.batch_writes(documents), ordered=False)
+
+    async def get_forecast(self, user_id, profile):
+        try:
+            return self.forecast_response(await self.collection.find_one({'_id': user_id}), profile)
+
+        except Exception as e:
+            print(f"Error getting BMI forecast: {str(e)}")
+            return {'success': False, 'message': 'Gagal menghitung perkiraan target', 'error': str(e)}
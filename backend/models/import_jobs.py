@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+
+class ImportJobs:
+    """Status of background BMI imports, one document per uploaded file in `bmi_import_jobs`
+
+    A job is `queued` when the upload is stored, `running` while chunks are
+    imported (stats updated after every chunk), then `done` or `failed`. Imports
+    skip records that are already stored, so a failed job is resumed by uploading
+    the same file again.
+
+    The import runs inside a worker, which may be restarted or recycled
+    (max_requests) partway through. updated_at is the job's heartbeat: a status
+    request for an active job not updated for STALE_AFTER marks it failed.
+    """
+
+    COLLECTION_NAME = 'bmi_import_jobs'
+
+    # Jobs are kept this long for status requests (TTL index, see migrations), from creation and again once finished
+    RETENTION = timedelta(days=7)
+
+    # An active job without progress for this long lost its worker
+    STALE_AFTER = timedelta(minutes=10)
+    STALE_ERROR = 'Import terhenti, silakan unggah ulang file'
+
+    ACTIVE_STATUSES = ['queued', 'running']
+
+    def __init__(self, mongo):
+        self.mongo = mongo
+        self.collection = mongo.db[self.COLLECTION_NAME]
+
+    @classmethod
+    def new_job_document(cls, user_id, import_format, filename, stats):
+        now = datetime.utcnow()
+        return {
+            'user_id': user_id,
+            'status': 'queued',
+            'format': import_format,
+            'filename': filename,
+            'stats': stats,
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+            'finished_at': None,
+            'expires_at': now + cls.RETENTION,
+        }
+
+    @staticmethod
+    def format_job(job):
+        return {
+            'id': str(job['_id']),
+            'status': job['status'],
+            'format': job['format'],
+            'filename': job['filename'],
+            'stats': job['stats'],
+            'error': job['error'],
+            'created_at': job['created_at'],
+            'finished_at': job['finished_at'],
+        }
+
+    @staticmethod
+    def job_filter(job_id, user_id):
+        """Filter of a user's job, None for an id that is not an ObjectId"""
+        try:
+            return {'_id': ObjectId(job_id), 'user_id': user_id}
+        except (InvalidId, TypeError):
+            return None
+
+    @classmethod
+    def active_filter(cls, job_id):
+        """Filter of a job still queued or running, a job failed as stale is not revived by its worker"""
+        return {'_id': job_id, 'status': {'$in': cls.ACTIVE_STATUSES}}
+
+    @classmethod
+    def stale_filter(cls, job_filter):
+        return dict(job_filter, status={'$in': cls.ACTIVE_STATUSES}, updated_at={'$lt': datetime.utcnow() - cls.STALE_AFTER})
+
+    @classmethod
+    def is_stale(cls, job):
+        return bool(job) and job['status'] in cls.ACTIVE_STATUSES and job['updated_at'] < datetime.utcnow() - cls.STALE_AFTER
+
+    @staticmethod
+    def progress_update(stats):
+        return {'$set': {'status': 'running', 'stats': dict(stats), 'updated_at': datetime.utcnow()}}
+
+    @classmethod
+    def finish_update(cls, stats, error=None):
+        """Final status update, stats None keeps the last recorded progress"""
+        now = datetime.utcnow()
+        fields = {
+            'status': 'failed' if error else 'done',
+            'error': error,
+            'updated_at': now,
+            'finished_at': now,
+            'expires_at': now + cls.RETENTION,
+        }
+        if stats is not None:
+            fields['stats'] = dict(stats)
+        return {'$set': fields}
+
+    @classmethod
+    def job_response(cls, job):
+        if not job:
+            return {'success': False, 'message': 'Import tidak ditemukan'}
+        return {'success': True, 'data': cls.format_job(job)}
+
+    def create(self, user_id, import_format, filename, stats):
+        """Store a queued job, return its document"""
+        job = self.new_job_document(user_id, import_format, filename, stats)
+        self.collection.insert_one(job)
+        return job
+
+    def progress(self, job_id, stats):
+        self.collection.update_one(self.active_filter(job_id), self.progress_update(stats))
+
+    def finish(self, job_id, stats, error=None):
+        self.collection.update_one(self.active_filter(job_id), self.finish_update(stats, error))
+
+    def get_job(self, job_id, user_id):
+        """Status of one of the user's import jobs, an abandoned job is failed first"""
+        try:
+            job_filter = self.job_filter(job_id, user_id)
+            if job_filter is None:
+                return self.job_response(None)
+
+            job = self.collection.find_one(job_filter)
+            if self.is_stale(job):
+                self.collection.update_one(self.stale_filter(job_filter), self.finish_update(None, self.STALE_ERROR))
+                job = self.collection.find_one(job_filter)
+            return self.job_response(job)
+
+        except Exception as e:
+            print(f"Error getting import job: {str(e)}")
+            return {'success': False, 'message': 'Gagal mengambil status import', 'error': str(e)}
+
+
+class AsyncImportJobs(ImportJobs):
+    """ImportJobs on an async MongoDB database, used by the ASGI mode"""
+
+    def __init__(self, db):
+        self.mongo = None
+        self.collection = db[self.COLLECTION_NAME]
+
+    async def create(self, user_id, import_format, filename, stats):
+        job = self.new_job_document(user_id, import_format, filename, stats)
+        await self.collection.insert_one(job)
+        return job
+
+    async def progress(self, job_id, stats):
+        await self.collection.update_one(self.active_filter(job_id), self.progress_update(stats))
+
+    async def finish(self, job_id, stats, error=None):
+        await self.collection.update_one(self.active_filter(job_id), self.finish_update(stats, error))
+
+    async def get_job(self, job_id, user_id):
+        try:
+            job_filter = self.job_filter(job_id, user_id)
+            if job_filter is None:
+                return self.job_response(None)
+
+            job = await self.collection.find_one(job_filter)
+            if self.is_stale(job):
+                await self.collection.update_one(self.stale_filter(job_filter), self.finish_update(None, self.STALE_ERROR))
+                job = await self.collection.find_one(job_filter)
+            return self.job_response(job)
+
+        except Exception as e:
+            print(f"Error getting import job: {str(e)}")
+            return {'success': False, 'message': 'Gagal mengambil status import', 'error': str(e)}
@@ -0,0 +1,210 @@
+import numpy as np
+
+
+class MealPlan:
+    """Daily meal plans built from the food index (see models/food.py)
+
+    The daily calorie and macro target comes from the stored profile. Plans are
+    solved per meal with a greedy-with-repair search over (food, portion) pairs
+    and cached by (calorie bucket, macro split, goal), so users that fall in the
+    same bucket share one solved plan.
+    """
+
+    # Share of the daily energy per meal and the maximum number of dishes in it
+    MEALS = [
+        ('breakfast', 0.25, 2),
+        ('lunch', 0.35, 3),
+        ('dinner', 0.30, 3),
+        ('snack', 0.10, 1),
+    ]
+
+    # Portions a dish can be served in, multiples of the dataset serving
+    PORTIONS = np.array([0.5, 1.0, 1.5, 2.0])
+
+    # Energy share of protein/fat/carbs (percent) per fitness goal
+    MACRO_SPLITS = {
+        'Menurunkan Berat': (30, 30, 40),
+        'Menambah Massa Otot': (30, 25, 45),
+        'Menjaga Kesehatan': (20, 30, 50),
+        'Meningkatkan Stamina': (20, 25, 55),
+    }
+    DEFAULT_GOAL = 'Menjaga Kesehatan'
+
+    # Daily energy change per fitness goal (kcal)
+    GOAL_ADJUSTMENTS = {
+        'Menurunkan Berat': -500,
+        'Menambah Massa Otot': 300,
+        'Menjaga Kesehatan': 0,
+        'Meningkatkan Stamina': 200,
+    }
+
+    # Light activity multiplier on the basal metabolic rate
+    ACTIVITY_FACTOR = 1.4
+
+    # Safe daily minimum per gender
+    MIN_CALORIES = {'Pria': 1500, 'Wanita': 1200}
+
+    # Targets are rounded to this many kcal before solving, the cache key granularity
+    CALORIE_BUCKET = 100
+
+    # Relative weight of the energy error against the macro errors
+    KCAL_ERROR_WEIGHT = 2.0
+    MAX_REPAIR_ROUNDS = 10
+
+    def __init__(self, food_model, cache=None):
+        self.food_model = food_model
+        # Optional cache of solved plans keyed by bucket, split and goal (see cache.py)
+        self.cache = cache
+
+        # Candidate (food, portion) pairs: nutrient rows are (kcal, protein, fat, carbs)
+        nutrients = food_model.matrix[:, :4]
+        self.candidate_food = np.repeat(np.arange(len(food_model.foods)), len(self.PORTIONS))
+        self.candidate_portion = np.tile(self.PORTIONS, len(food_model.foods))
+        self.candidate_nutrients = nutrients[self.candidate_food] * self.candidate_portion[:, None]
+
+    @classmethod
+    def daily_target(cls, profile):
+        """Daily kcal and macro grams from the profile (Mifflin-St Jeor), None if fields are missing"""
+        age = profile.get('age')
+        gender = profile.get('gender')
+        height = profile.get('height')
+        weight = profile.get('currentWeight')
+
+        if not age or not height or not weight or gender not in cls.MIN_CALORIES:
+            return None
+
+        goal = profile.get('fitnessGoal')
+        if goal not in cls.MACRO_SPLITS:
+            # Without a goal, follow the direction of the target weight
+            target_weight = profile.get('targetWeight')
+            if target_weight and target_weight < weight - 1:
+                goal = 'Menurunkan Berat'
+            elif target_weight and target_weight > weight + 1:
+                goal = 'Menambah Massa Otot'
+            else:
+                goal = cls.DEFAULT_GOAL
+
+        bmr = 10 * weight + 6.25 * height - 5 * age + (5 if gender == 'Pria' else -161)
+        kcal = max(bmr * cls.ACTIVITY_FACTOR + cls.GOAL_ADJUSTMENTS[goal], cls.MIN_CALORIES[gender])
+        bucket = int(round(kcal / cls.CALORIE_BUCKET) * cls.CALORIE_BUCKET)
+
+        return goal, cls.MACRO_SPLITS[goal], bucket
+
+    @staticmethod
+    def macro_grams(kcal, split):
+        """Target (kcal, protein, fat, carbs) vector for an energy amount and split"""
+        protein, fat, carbs = split
+        return np.array([kcal, kcal * protein / 400, kcal * fat / 900, kcal * carbs / 400])
+
+    def errors(self, totals, target):
+        """Distance of every row of totals to the target, energy weighted higher"""
+        relative = np.abs(totals - target) / np.maximum(target, 1)
+        return self.KCAL_ERROR_WEIGHT * relative[..., 0] + relative[..., 1:].sum(axis=-1)
+
+    def solve_meal(self, target, allowed, max_items):
+        """Greedy-with-repair: add the best (food, portion) while it helps, then swap picks while that helps"""
+        candidates = self.candidate_nutrients
+        picks = []
+        totals = np.zeros(4)
+        current_error = self.errors(totals, target)
+
+        def available():
+            used = np.isin(self.candidate_food, [self.candidate_food[pick] for pick in picks])
+            return allowed & ~used
+
+        # Greedy fill
+        while len(picks) < max_items:
+            mask = available()
+            if not mask.any():
+                break
+            errors = np.where(mask, self.errors(totals + candidates, target), np.inf)
+            best = int(np.argmin(errors))
+            if errors[best] >= current_error:
+                break
+            picks.append(best)
+            totals = totals + candidates[best]
+            current_error = errors[best]
+
+        # Repair: replace one pick at a time with the best alternative
+        for _ in range(self.MAX_REPAIR_ROUNDS):
+            best_swap = None
+            for position, pick in enumerate(picks):
+                others = picks[:position] + picks[position + 1:]
+                used = np.isin(self.candidate_food, [self.candidate_food[other] for other in others])
+                without = totals - candidates[pick]
+                errors = np.where(allowed & ~used, self.errors(without + candidates, target), np.inf)
+                best = int(np.argmin(errors))
+                if errors[best] < current_error - 1e-9 and (best_swap is None or errors[best] < best_swap[2]):
+                    best_swap = (position, best, errors[best])
+
+            if best_swap is None:
+                break
+
+            position, best, error = best_swap
+            totals = totals - candidates[picks[position]] + candidates[best]
+            picks[position] = best
+            current_error = error
+
+        return picks, totals
+
+    @staticmethod
+    def round_totals(totals):
+        return {
+            'kcal': round(float(totals[0])),
+            'protein': round(float(totals[1]), 1),
+            'fat': round(float(totals[2]), 1),
+            'carbs': round(float(totals[3]), 1),
+        }
+
+    def solve(self, bucket, split):
+        """Solve a full day for a calorie bucket and macro split"""
+        meals = {}
+        used = np.zeros(len(self.candidate_food), dtype=bool)
+        day_totals = np.zeros(4)
+
+        for meal, share, max_items in self.MEALS:
+            target = self.macro_grams(bucket * share, split)
+            allowed = np.repeat(self.food_model.meal_masks[meal], len(self.PORTIONS)) & ~used
+            picks, totals = self.solve_meal(target, allowed, max_items)
+
+            # A dish is served at most once a day
+            used |= np.isin(self.candidate_food, [self.candidate_food[pick] for pick in picks])
+            day_totals += totals
+
+            meals[meal] = {
+                'target': self.round_totals(target),
+                'items': [
+                    dict(self.food_model.foods[self.candidate_food[pick]], portion=float(self.candidate_portion[pick]))
+                    for pick in picks
+                ],
+                'totals': self.round_totals(totals),
+            }
+
+        return {'meals': meals, 'totals': self.round_totals(day_totals)}
+
+    def get_plan(self, profile):
+        """Daily meal plan for a user profile (see User.build_profile)"""
+        try:
+            target = self.daily_target(profile)
+            if target is None:
+                return {'success': False, 'message': 'Lengkapi profil (umur, gender, tinggi, berat badan) untuk membuat rencana makan'}
+
+            goal, split, bucket = target
+            key = f'{bucket}:{"-".join(map(str, split))}:{goal}'
+
+            plan = self.cache.get(key) if self.cache is not None else None
+            cached = plan is not None
+            if plan is None:
+                plan = self.solve(bucket, split)
+                if self.cache is not None:
+                    self.cache.set(key, plan)
+
+            return {
+                'success': True,
+                'data': dict(plan, target=dict(self.round_totals(self.macro_grams(bucket, split)), fitnessGoal=goal)),
+                'cached': cached
+            }
+
+        except Exception as e:
+            print(f"Error building meal plan: {str(e)}")
+            return {'success': False, 'message': 'Gagal membuat rencana makan', 'error': str(e)}
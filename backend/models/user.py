@@ -1,26 +1,149 @@
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token
+from flask_jwt_extended import create_access_token, create_refresh_token
 from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import pymongo
+
+from models.bmi_calculator import calculate_bmi
+from hashing import PasswordHasher, HasherBusy
+from migrations import MIGRATIONS_COLLECTION, MIGRATIONS_DOC_ID
 
 class User:
-    def __init__(self, mongo):
+    # Allowed fields to update
+    PROFILE_FIELDS = ['name', 'age', 'gender', 'height', 'currentWeight', 'targetWeight', 'fitnessGoal']
+
+    # Access tokens are short-lived because they carry a profile snapshot, refresh tokens reissue them
+    ACCESS_TOKEN_EXPIRES = timedelta(minutes=15)
+    REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+
+    # Layout version of the profile snapshot claim, bump when its fields change
+    PROFILE_CLAIM_VERSION = 1
+
+    def __init__(self, mongo, cache=None, hasher=None, listeners=None):
         self.mongo = mongo
         self.collection = mongo.db.users
+        # Optional profile cache keyed by user id (see cache.py)
+        self.cache = cache
+        # Password hasher, inline unless a process-pool hasher is given (see hashing.py)
+        self.hasher = hasher or PasswordHasher(workers=0)
+        # Derived data kept up to date on every profile update, each has record_profile(user_data, previous)
+        self.listeners = listeners or []
+        # Set by prepare_email_key on the first registration or login of this process
+        self.email_key_checked = False
+        self.email_index_ready = False
+        self.legacy_emails = True
 
-    def create_user(self, name, email, password):
-        # Register new user
+    # Compact profile snapshot embedded in access tokens
+    @classmethod
+    def profile_claims(cls, profile):
+        return {
+            'profile': {
+                'v': cls.PROFILE_CLAIM_VERSION,
+                'name': profile.get('name', ''),
+                'email': profile.get('email', ''),
+                'goal': profile.get('fitnessGoal'),
+                'pv': profile.get('version', 0),
+            }
+        }
 
-        # Check email already exist
-        if self.collection.find_one({'email': email}):
-            return {'success': False, 'message': 'Email sudah terdaftar'}
-        
-        # Hash password
-        hashed_password = generate_password_hash(password)
+    # Current user from verified token claims, None for tokens without a current snapshot
+    @classmethod
+    def profile_from_claims(cls, user_id, claims):
+        snapshot = claims.get('profile')
+        if not snapshot or snapshot.get('v') != cls.PROFILE_CLAIM_VERSION:
+            return None
 
-        # Data user
-        user_data = {
+        return {
+            'id': user_id,
+            'name': snapshot['name'],
+            'email': snapshot['email'],
+            'fitnessGoal': snapshot['goal'],
+            'version': snapshot['pv'],
+        }
+
+    # Lookup key for an email address, case and surrounding whitespace do not matter
+    @staticmethod
+    def email_key(email):
+        return email.strip().lower()
+
+    # Unique, case-normalized email key: registration relies on it to reject duplicates
+    EMAIL_KEY_INDEX = 'email_key_unique'
+
+    # Schema version from which every user has an email key (migration 3 backfills it)
+    EMAIL_KEY_MIGRATION = 3
+
+    @classmethod
+    def email_key_index(cls):
+        """(keys, options) of the unique email key index, users without a key are left out until migrated"""
+        return [('email_key', pymongo.ASCENDING)], {
+            'unique': True,
+            'name': cls.EMAIL_KEY_INDEX,
+            'partialFilterExpression': {'email_key': {'$exists': True}},
+        }
+
+    @classmethod
+    def migrated_emails(cls, schema):
+        """Whether every user has an email key, from the schema_migrations document"""
+        return bool(schema) and schema['version'] >= cls.EMAIL_KEY_MIGRATION
+
+    # Lookup of a user created before email keys, by the address as stored
+    @staticmethod
+    def legacy_email_filter(email):
+        return {'email': email.strip(), 'email_key': {'$exists': False}}
+
+    def prepare_email_key(self):
+        """Make sure the unique email key index exists, once per process (idempotent)
+
+        Workers do not run migrations, so a deployment that has not run `flask
+        migrate` yet still rejects duplicate emails. Until migration 3 has run,
+        lookups also match users without an email key by their stored email.
+        """
+        if self.email_key_checked:
+            return
+
+        try:
+            keys, options = self.email_key_index()
+            self.collection.create_index(keys, **options)
+            self.email_index_ready = True
+            schema = self.collection.database[MIGRATIONS_COLLECTION].find_one({'_id': MIGRATIONS_DOC_ID})
+            self.legacy_emails = not self.migrated_emails(schema)
+        except Exception as e:
+            # Registration then looks the email up before inserting
+            print(f"Error preparing email key index: {str(e)}")
+        self.email_key_checked = True
+
+    # Whether the unique index alone rejects duplicate emails: it exists and every user has a key
+    def email_key_enforced(self):
+        self.prepare_email_key()
+        return self.email_index_ready and not self.legacy_emails
+
+    # User with an email address, also matching users not migrated to email keys yet
+    def find_by_email(self, email):
+        self.prepare_email_key()
+        user = self.collection.find_one({'email_key': self.email_key(email)})
+        if user is None and self.legacy_emails:
+            user = self.collection.find_one(self.legacy_email_filter(email))
+        return user
+
+    # Access token for a user id, with the snapshot of its public profile
+    def create_token(self, user_id, profile):
+        return create_access_token(
+            identity=user_id,
+            expires_delta=self.ACCESS_TOKEN_EXPIRES,
+            additional_claims=self.profile_claims(profile)
+        )
+
+    # Refresh token for a user id, only accepted by /api/auth/refresh
+    def create_refresh_token(self, user_id):
+        return create_refresh_token(identity=user_id, expires_delta=self.REFRESH_TOKEN_EXPIRES)
+
+    # New user document with empty profile fields
+    @staticmethod
+    def new_user_document(name, email, hashed_password):
+        return {
             'name': name,
             'email': email,
+            'email_key': User.email_key(email),
             'password': hashed_password,
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow(),
@@ -31,28 +154,58 @@ class User:
             'currentWeight': None,
             'targetWeight': None,
             'fitnessGoal': None,
+            # Version counters behind the profile/history ETags (see models/user_versions.py)
+            'profile_version': 0,
+            'history_version': 0,
+        }
+
+    # Register/login response with fresh access and refresh tokens
+    def auth_response(self, message, user_data):
+        user_id = str(user_data['_id'])
+        return {
+            'success': True,
+            'message': message,
+            'user': {
+                'id': user_id,
+                'name': user_data['name'],
+                'email': user_data['email']
+            },
+            'token': self.create_token(user_id, self.build_profile(user_data)),
+            'refresh_token': self.create_refresh_token(user_id)
         }
 
-        # Insert data user to database
+    # New access token with an up-to-date profile snapshot
+    def refresh_access_token(self, user_id):
+        result = self.get_user_profile(user_id)
+        if not result['success']:
+            return result
+
+        return {'success': True, 'token': self.create_token(user_id, result['user'])}
+
+    def create_user(self, name, email, password):
+        # Register new user
+
+        # Hash password
+        hashed_password = self.hasher.hash(password)
+
+        # Data user
+        user_data = self.new_user_document(name, email, hashed_password)
+
+        # Insert data user to database, the unique email key index rejects an existing email
         try:
+            # Users without an email key are not covered by the index, look the email up first
+            if not self.email_key_enforced() and self.find_by_email(email) is not None:
+                return {'success': False, 'message': 'Email sudah terdaftar'}
+
             result = self.collection.insert_one(user_data)
 
             if result.inserted_id:
-                # Generate token
-                token = create_access_token(identity=str(result.inserted_id), expires_delta=timedelta(days=7))
-                return {
-                    'success': True,
-                    'message': 'Registrasi berhasil',
-                    'user': {
-                        'id': str(result.inserted_id),
-                        'name': name,
-                        'email': email
-                    },
-                    'token': token
-                }
+                return self.auth_response('Registrasi berhasil', user_data)
             
             return {'success': False, 'message': 'Gagal melakukan registrasi'}
         
+        except DuplicateKeyError:
+            return {'success': False, 'message': 'Email sudah terdaftar'}
         except Exception as e:
             return {'success': False, 'message': 'Terjadi kesalahan saat registrasi', 'error': str(e)}
     
@@ -61,28 +214,29 @@ class User:
         try:
 
             # Check email
-            user = self.collection.find_one({'email': email})
+            user = self.find_by_email(email)
 
             if not user:
                 return {'success': False, 'message': 'Email tidak terdaftar'}
             
-            if not check_password_hash(user['password'], password):
+            if not self.hasher.verify(user['password'], password):
                 return {'success': False, 'message': 'Password salah'}
-            
-            # Generate token
-            token = create_access_token(identity=str(user['_id']), expires_delta=timedelta(days=7))
 
-            return {
-                'success': True,
-                'message': 'Login berhasil',
-                'user': {
-                    'id': str(user['_id']),
-                    'name': user['name'],
-                    'email': user['email']
-                },
-                'token': token
-            }
+            # Upgrade hashes made with outdated parameters, skipped when the hasher is busy or times out
+            if self.hasher.needs_rehash(user['password']):
+                try:
+                    self.collection.update_one(
+                        {'_id': user['_id'], 'password': user['password']},
+                        {'$set': {'password': self.hasher.hash(password)}}
+                    )
+                except Exception as e:
+                    # The password is verified, a busy or slow hasher only postpones the upgrade
+                    print(f"Error rehashing password: {type(e).__name__} {str(e)}")
+
+            return self.auth_response('Login berhasil', user)
     
+        except HasherBusy:
+            raise
         except Exception as e:
             return {'success': False, 'message': 'Terjadi kesalahan saat login', 'error': str(e)}
     
@@ -102,52 +256,57 @@ class User:
         except Exception as e:
             return {'success': False, 'message': 'Terjadi kesalahan saat mengambil data user', 'error': str(e)}
     
+    # Build the public profile (with BMI) from a user document
+    def build_profile(self, user_data):
+        # Calculate BMI if height and weight exist
+        bmi = None
+        bmi_status = None
+        
+        current_height = user_data.get('height')
+        current_weight = user_data.get('currentWeight')
+        
+        if current_height and current_weight:
+            bmi, bmi_status = calculate_bmi(current_weight, current_height)
+        
+        return {
+            'id': str(user_data['_id']),
+            'name': user_data.get('name', ''),
+            'email': user_data.get('email', ''),
+            'age': user_data.get('age'),
+            'gender': user_data.get('gender'),
+            'height': user_data.get('height'),
+            'currentWeight': user_data.get('currentWeight'),
+            'targetWeight': user_data.get('targetWeight'),
+            'fitnessGoal': user_data.get('fitnessGoal'),
+            'bmi': bmi,
+            'bmi_status': bmi_status,
+            'joinDate': user_data.get('created_at').isoformat() if user_data.get('created_at') else None,
+            'created_at': user_data.get('created_at').isoformat() if user_data.get('created_at') else None,
+            'updated_at': user_data.get('updated_at').isoformat() if user_data.get('updated_at') else None,
+            'version': user_data.get('profile_version', 0)
+        }
+
     # Get full user profile
     def get_user_profile(self, user_id):
         try:
+            # Serve from cache when possible
+            if self.cache is not None:
+                cached_profile = self.cache.get(user_id)
+                if cached_profile is not None:
+                    return {'success': True, 'user': cached_profile}
+
             from bson import ObjectId
             user_data = self.collection.find_one({'_id': ObjectId(user_id)})
             
             if user_data:
-                # Calculate BMI if height and weight exist
-                bmi = None
-                bmi_status = None
-                
-                current_height = user_data.get('height')
-                current_weight = user_data.get('currentWeight')
-                
-                if current_height and current_weight:
-                    height_m = current_height / 100  # convert cm to m
-                    bmi = current_weight / (height_m ** 2)
-                    
-                    # BMI categories
-                    if bmi < 18.5:
-                        bmi_status = 'Kurang'
-                    elif bmi < 25:
-                        bmi_status = 'Normal'
-                    elif bmi < 30:
-                        bmi_status = 'Berlebih'
-                    else:
-                        bmi_status = 'Obesitas'
-                
+                profile = self.build_profile(user_data)
+
+                if self.cache is not None:
+                    self.cache.set(user_id, profile)
+
                 return {
                     'success': True,
-                    'user': {
-                        'id': str(user_data['_id']),
-                        'name': user_data.get('name', ''),
-                        'email': user_data.get('email', ''),
-                        'age': user_data.get('age'),
-                        'gender': user_data.get('gender'),
-                        'height': user_data.get('height'),
-                        'currentWeight': user_data.get('currentWeight'),
-                        'targetWeight': user_data.get('targetWeight'),
-                        'fitnessGoal': user_data.get('fitnessGoal'),
-                        'bmi': round(bmi, 1) if bmi else None,
-                        'bmi_status': bmi_status,
-                        'joinDate': user_data.get('created_at').isoformat() if user_data.get('created_at') else None, 
-        'created_at': user_data.get('created_at').isoformat() if user_data.get('created_at') else None, 
-        'updated_at': user_data.get('updated_at').isoformat() if user_data.get('updated_at') else None 
-                    }
+                    'user': profile
                 }
             else:
                 return {'success': False, 'message': 'User tidak ditemukan'}
@@ -156,43 +315,84 @@ class User:
             print(f"Get user profile error: {str(e)}")
             return {'success': False, 'message': f'Error: {str(e)}'}
 
+    # Ony update allowed fields that are provided
+    def profile_changes(self, profile_data):
+        return {field: profile_data[field] for field in self.PROFILE_FIELDS if field in profile_data}
+
     # Update user profile
     def update_user_profile(self, user_id, profile_data):
         try:
             from bson import ObjectId
 
-            # Allowed fields to update
-            allowed_fields = ['name', 'age', 'gender', 'height', 'currentWeight', 'targetWeight', 'fitnessGoal']
+            changes = self.profile_changes(profile_data)
 
-            update_data = {
-                'updated_at': datetime.utcnow()
-            }
+            # Nothing to write when no field is provided, the response still carries a token like an update
+            if not changes:
+                current_profile = self.get_user_profile(user_id)
+                if current_profile['success']:
+                    return self.profile_updated(user_id, current_profile['user'])
+                return current_profile
 
-            # Ony update allowed fields that are provided
-            for field in allowed_fields:
-                if field in profile_data:
-                    update_data[field] = profile_data[field]
-            
-            # Perform the update
-            result = self.collection.update_one(
-                {'_id': ObjectId(user_id)},
-                {'$set': update_data}
+            update_data = dict(changes, updated_at=datetime.utcnow())
+
+            # Apply the update and read the pre-image in one round trip, a no-op update matches nothing
+            previous = self.collection.find_one_and_update(
+                self.profile_update_filter(ObjectId(user_id), changes),
+                {'$set': update_data, '$inc': {'profile_version': 1}},
+                projection={'password': 0},
+                return_document=ReturnDocument.BEFORE
             )
 
-            if result.modified_count > 0 or result.matched_count > 0:
-                # Get updated user profile
-                updated_profile = self.get_user_profile(user_id)
-                if updated_profile['success']:
-                    return {
-                        'success': True,
-                        'message': 'Profil berhasil diupdate',
-                        'user': updated_profile['user']
-                    }
-                else:
-                    return updated_profile
+            if previous:
+                # The stored document is the pre-image with this update applied
+                user_data = self.apply_profile_update(previous, update_data)
+                self.notify_updated(user_data, previous)
             else:
-                return {'success': False, 'message': 'User tidak ditemukan'}
+                # Values already stored (or no such user): answer from the database, never from the cache
+                user_data = self.collection.find_one({'_id': ObjectId(user_id)}, {'password': 0})
+
+            return self.profile_update_response(user_id, user_data)
                 
         except Exception as e:
             print(f"Update profile error: {str(e)}")
             return {'success': False, 'message': f'Error: {str(e)}'}
+
+    # Update listeners after a profile update with the documents after and before it, a failing listener does not fail the update
+    def notify_updated(self, user_data, previous):
+        for listener in self.listeners:
+            try:
+                listener.record_profile(user_data, previous)
+            except Exception as e:
+                print(f"Error updating {type(listener).__name__}: {str(e)}")
+
+    # Stored document after an update, from the pre-image and the applied $set/$inc
+    @staticmethod
+    def apply_profile_update(previous, update_data):
+        return dict(previous, **update_data, profile_version=previous.get('profile_version', 0) + 1)
+
+    # Match the user only when at least one field differs from the stored value, so
+    # the no-op check is decided by the database and not by a per-worker cache
+    @staticmethod
+    def profile_update_filter(object_id, changes):
+        return {'_id': object_id, '$or': [{field: {'$ne': value}} for field, value in changes.items()]}
+
+    # Response of a profile update from the stored user document
+    def profile_update_response(self, user_id, user_data):
+        if not user_data:
+            return {'success': False, 'message': 'User tidak ditemukan'}
+
+        profile = self.build_profile(user_data)
+
+        if self.cache is not None:
+            self.cache.set(user_id, profile)
+
+        return self.profile_updated(user_id, profile)
+
+    # New token so the client's profile snapshot follows the update
+    def profile_updated(self, user_id, profile):
+        return {
+            'success': True,
+            'message': 'Profil berhasil diupdate',
+            'user': profile,
+            'token': self.create_token(user_id, profile)
+        }
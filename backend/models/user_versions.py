@@ -0,0 +1,53 @@
+from bson import ObjectId
+from pymongo import UpdateOne
+
+class UserVersions:
+    """Per-user version counters stored on the user document
+
+    `profile_version` is incremented by User.update_user_profile and
+    `history_version` by every saved BMI record (as a BMI listener). ETags are
+    derived from them, so conditional requests are answered without loading data.
+    """
+
+    FIELDS = {'profile': 'profile_version', 'history': 'history_version'}
+
+    def __init__(self, mongo):
+        self.mongo = mongo
+        self.collection = mongo.db.users
+
+    def get_version(self, user_id, kind):
+        """Current version of a user's profile or history, None if the user does not exist"""
+        field = self.FIELDS[kind]
+        user = self.collection.find_one({'_id': ObjectId(user_id)}, {field: 1})
+        return user.get(field, 0) if user else None
+
+    def record_bmi(self, bmi_data):
+        self.collection.update_one({'_id': ObjectId(bmi_data['user_id'])}, {'$inc': {'history_version': 1}})
+
+    @staticmethod
+    def batch_writes(documents):
+        """One version bump per user for a batch of saved records"""
+        user_ids = {bmi_data['user_id'] for bmi_data in documents}
+        return [UpdateOne({'_id': ObjectId(user_id)}, {'$inc': {'history_version': 1}}) for user_id in user_ids]
+
+    def record_bmi_many(self, documents):
+        self.collection.bulk_write(self.batch_writes(documents), ordered=False)
+
+
+class AsyncUserVersions(UserVersions):
+    """UserVersions on an async MongoDB database, used by the ASGI mode"""
+
+    def __init__(self, db):
+        self.mongo = None
+        self.collection = db.users
+
+    async def get_version(self, user_id, kind):
+        field = self.FIELDS[kind]
+        user = await self.collection.find_one({'_id': ObjectId(user_id)}, {field: 1})
+        return user.get(field, 0) if user else None
+
+    async def record_bmi(self, bmi_data):
+        await self.collection.update_one({'_id': ObjectId(bmi_data['user_id'])}, {'$inc': {'history_version': 1}})
+
+    async def record_bmi_many(self, documents):
+        await self.collection.bulk_write(self.batch_writes(documents), ordered=False)
@@ -0,0 +1,24 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+
+def client_options():
+    """MongoClient pool and timeout options, tunable per deployment through the environment"""
+    return {
+        'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', 100)),
+        'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', 0)),
+        'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 300000)),
+        'waitQueueTimeoutMS': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000)),
+        'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        'connectTimeoutMS': int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+        'socketTimeoutMS': int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 10000)),
+    }
+
+
+def warm_up(client, connections):
+    """Open up to `connections` pooled connections with concurrent pings, so the first requests don't pay for them"""
+    if connections <= 0:
+        return
+
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        list(executor.map(lambda _: client.admin.command('ping'), range(connections)))
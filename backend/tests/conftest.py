@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the app modules the way app.py does, from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def bulk_write(monkeypatch):
+    """Unordered bulk_write for mongomock, whose own one does not accept current pymongo operations"""
+    mongomock = pytest.importorskip('mongomock')
+    from pymongo import InsertOne, ReplaceOne, UpdateOne
+    from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+    def bulk_write(self, requests, ordered=True, **kwargs):
+        errors = []
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self.insert_one(request._doc)
+                elif isinstance(request, ReplaceOne):
+                    self.replace_one(request._filter, request._doc, upsert=request._upsert)
+                elif isinstance(request, UpdateOne):
+                    self.update_one(request._filter, request._doc, upsert=request._upsert)
+                else:
+                    raise NotImplementedError(type(request).__name__)
+            except DuplicateKeyError as e:
+                errors.append({'index': index, 'code': 11000, 'errmsg': str(e)})
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'writeConcernErrors': []})
+
+    monkeypatch.setattr(mongomock.collection.Collection, 'bulk_write', bulk_write)
+
+
+@pytest.fixture
+def app(monkeypatch, bulk_write):
+    """Flask app on an in-memory mongomock database, without migrations applied"""
+    mongomock = pytest.importorskip('mongomock')
+    monkeypatch.setenv('MONGO_URI', 'mongodb://localhost:27017/fitamin_test')
+    monkeypatch.setenv('JWT_SECRET_KEY', 'test-secret-key-with-enough-bytes')
+    monkeypatch.setenv('HASH_WORKERS', '0')
+    # Flask-PyMongo creates its client from its own module namespace
+    monkeypatch.setattr('flask_pymongo.MongoClient', mongomock.MongoClient)
+
+    from app import create_app
+    return create_app({'TESTING': True})
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db(app):
+    with app.app_context():
+        yield app.extensions['services'].mongo.db
+
+
+def register(client, email, password='secret123'):
+    """Register a user, return the Authorization headers of its access token"""
+    response = client.post('/api/auth/register', json={'name': 'Test', 'email': email, 'password': password})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
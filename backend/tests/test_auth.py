@@ -0,0 +1,45 @@
+"""Registration rejects duplicate emails with or without migrations, legacy users can log in"""
+from datetime import datetime
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from conftest import register
+
+mongomock = pytest.importorskip('mongomock')
+
+
+def test_duplicate_email_rejected_before_migrations(client, db):
+    register(client, 'dup@example.com')
+
+    response = client.post('/api/auth/register', json={'name': 'Other', 'email': ' Dup@Example.com', 'password': 'secret123'})
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Email sudah terdaftar'
+    assert db.users.count_documents({}) == 1
+    assert 'email_key_unique' in db.users.index_information()
+
+
+def test_legacy_user_without_email_key(client, db):
+    # Created before email keys, migration 3 has not backfilled it yet
+    db.users.insert_one({
+        'name': 'Legacy', 'email': 'legacy@example.com', 'password': generate_password_hash('secret123'),
+        'created_at': datetime.utcnow(), 'updated_at': datetime.utcnow(),
+    })
+
+    response = client.post('/api/auth/login', json={'email': 'legacy@example.com', 'password': 'secret123'})
+    assert response.status_code == 200
+
+    response = client.post('/api/auth/register', json={'name': 'Other', 'email': 'legacy@example.com', 'password': 'secret123'})
+    assert response.get_json()['message'] == 'Email sudah terdaftar'
+    assert db.users.count_documents({}) == 1
+
+
+def test_login_after_migrations(app, client, db):
+    from migrations import run_migrations
+
+    register(client, 'migrated@example.com')
+    run_migrations(db)
+
+    response = client.post('/api/auth/login', json={'email': 'MIGRATED@example.com', 'password': 'secret123'})
+    assert response.status_code == 200
@@ -0,0 +1,82 @@
+"""Keyset-paginated BMI history: cursors, ties on created_at, filters and projections"""
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from models.bmi import BMI
+from validation import ValidationError, parse_history_args
+
+mongomock = pytest.importorskip('mongomock')
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def bmi_model():
+    return BMI(type('Mongo', (), {'db': mongomock.MongoClient().db})())
+
+
+def store(bmi_model, user_id, created_at):
+    document = {
+        '_id': ObjectId(), 'user_id': user_id, 'weight': 70.0, 'height': 170.0, 'bmi': 24.2,
+        'bmi_status': 'Normal', 'notes': '', 'created_at': created_at,
+    }
+    bmi_model.collection.insert_one(document)
+    return document['_id']
+
+
+def test_cursor_round_trip():
+    record_id = ObjectId()
+    cursor = BMI.encode_cursor(START, record_id)
+
+    assert BMI.decode_cursor(cursor) == (START, record_id)
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', BMI.encode_cursor(START, ObjectId())[:-3]])
+def test_invalid_cursor_is_a_validation_error(cursor):
+    with pytest.raises(ValidationError):
+        parse_history_args({'cursor': cursor})
+
+
+def test_empty_cursor_is_the_first_page():
+    assert parse_history_args({'cursor': ''})['after'] is None
+
+
+def test_pages_cover_every_record_once_with_ties(bmi_model):
+    # Three records share each timestamp, pages must split ties without skipping or repeating
+    ids = [store(bmi_model, 'user-1', START + timedelta(days=day)) for day in range(4) for _ in range(3)]
+    store(bmi_model, 'user-2', START)
+
+    seen = []
+    after = None
+    while True:
+        page = bmi_model.get_user_bmi_history('user-1', limit=5, after=after)
+        seen.extend(record['id'] for record in page['data'])
+        if not page['has_more']:
+            assert page['next_cursor'] is None
+            break
+        after = BMI.decode_cursor(page['next_cursor'])
+
+    assert len(seen) == len(set(seen)) == len(ids)
+    assert set(seen) == set(ids)
+    # Newest first, _id breaks ties
+    expected = sorted(bmi_model.collection.find({'user_id': 'user-1'}), key=lambda r: (r['created_at'], r['_id']), reverse=True)
+    assert seen == [record['_id'] for record in expected]
+
+
+def test_date_range_and_projection(bmi_model):
+    for day in range(5):
+        store(bmi_model, 'user-1', START + timedelta(days=day))
+
+    page = bmi_model.get_user_bmi_history(
+        'user-1', date_from=START + timedelta(days=1), date_to=START + timedelta(days=3), fields=['weight']
+    )
+
+    assert [record['date'] for record in page['data']] == [START + timedelta(days=2), START + timedelta(days=1)]
+    assert set(page['data'][0]) == {'id', 'weight', 'created_at', 'date'}
+
+
+def test_limit_is_clamped(bmi_model):
+    assert bmi_model.history_limit(10 ** 6) == BMI.MAX_HISTORY_LIMIT
+    assert bmi_model.history_limit(None) == BMI.DEFAULT_HISTORY_LIMIT
@@ -0,0 +1,112 @@
+"""Chunked BMI import: parsing, validation, deduplication and totals"""
+from datetime import datetime
+import io
+import time
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from bmi_import import add_chunk_stats, import_stats, parse_created_at, prepare_chunk, run_import, text_stream
+from models.bmi import BMI
+
+from conftest import register
+
+mongomock = pytest.importorskip('mongomock')
+
+
+@pytest.fixture
+def bmi_model(bulk_write):
+    return BMI(type('Mongo', (), {'db': mongomock.MongoClient().db})())
+
+
+def import_text(bmi_model, text, import_format='csv', chunk_size=1000):
+    return run_import(bmi_model, 'user-1', text_stream(io.BytesIO(text.encode())), import_format, chunk_size)
+
+
+def test_parse_created_at_normalizes_to_naive_utc_milliseconds():
+    assert parse_created_at('2024-01-02T03:04:05.123456+02:00') == datetime(2024, 1, 2, 1, 4, 5, 123000)
+    assert parse_created_at('2024-01-02') == datetime(2024, 1, 2)
+    with pytest.raises(ValueError):
+        parse_created_at('')
+
+
+def test_prepare_chunk_validates_and_dedupes_inside_the_chunk(bmi_model):
+    rows = [
+        {'date': '2024-01-01', 'weight': '70', 'height': '170', 'notes': 'x' * 1000},
+        {'date': '2024-01-01', 'weight': '71', 'height': '170'},
+        {'date': 'yesterday', 'weight': '70', 'height': '170'},
+        {'date': '2024-01-02', 'weight': '-1', 'height': '170'},
+        {'created_at': '2024-01-03', 'weight': 72, 'height': 170},
+        None,
+    ]
+
+    records, invalid = prepare_chunk(bmi_model, 'user-1', rows)
+
+    assert [record['created_at'].day for record in records] == [1, 3]
+    assert records[0]['weight'] == 70.0
+    bmi, status = bmi_model.calculate_bmi(70, 170)
+    assert records[0]['bmi'] == pytest.approx(bmi)
+    assert records[0]['bmi_status'] == status
+    assert len(records[0]['notes']) == 500
+    assert invalid == 3
+
+
+def test_add_chunk_stats_counts_skipped_rows_as_duplicates():
+    stats = import_stats()
+    add_chunk_stats(stats, rows=10, invalid=2, inserted=5)
+    add_chunk_stats(stats, rows=4, invalid=0, inserted=4)
+
+    assert stats == {'rows': 14, 'inserted': 9, 'duplicates': 3, 'invalid': 2, 'chunks': 2}
+
+
+def test_import_skips_stored_records_and_saves_are_untouched(bmi_model):
+    bmi_model.collection.insert_one({'user_id': 'user-1', 'weight': 70.0, 'bmi': 24.2, 'created_at': datetime(2024, 1, 1)})
+    text = 'date,weight,height\n2024-01-01,70,170\n2024-01-02,71,170\n2024-01-03,72,170\n'
+
+    stats = import_text(bmi_model, text, chunk_size=2)
+
+    assert stats == {'rows': 3, 'inserted': 2, 'duplicates': 1, 'invalid': 0, 'chunks': 2}
+    # Importing the same file again inserts nothing
+    assert import_text(bmi_model, text)['inserted'] == 0
+    assert bmi_model.collection.count_documents({}) == 3
+    # Only imported records carry an import key
+    assert bmi_model.collection.count_documents({'import_key': {'$exists': True}}) == 2
+
+
+def test_jsonl_import_counts_unparsable_lines_as_invalid(bmi_model):
+    text = '{"date": "2024-01-01", "weight": 70, "height": 170}\nnot json\n[1, 2]\n\n'
+
+    assert import_text(bmi_model, text, 'jsonl') == {'rows': 3, 'inserted': 1, 'duplicates': 0, 'invalid': 2, 'chunks': 1}
+
+
+def test_concurrent_duplicates_are_skipped_other_errors_raise(bmi_model):
+    documents = [{'_id': i} for i in range(3)]
+    duplicate = BulkWriteError({'writeErrors': [{'index': 1, 'code': 11000}], 'writeConcernErrors': []})
+    other = BulkWriteError({'writeErrors': [{'index': 1, 'code': 121}], 'writeConcernErrors': []})
+
+    assert BMI.inserted_documents(documents, duplicate) == [{'_id': 0}, {'_id': 2}]
+    with pytest.raises(BulkWriteError):
+        BMI.inserted_documents(documents, other)
+
+
+def test_import_updates_listeners_with_inserted_records_only(client, db):
+    headers = register(client, 'import@example.com')
+    client.post('/api/bmi/save', json={'weight': 70, 'height': 170}, headers=headers)
+    text = b'date,weight,height\n2024-01-01,70,170\n2024-01-02,71,170\n2024-01-02,72,170\n'
+
+    response = client.post(
+        '/api/bmi/import', data={'file': (io.BytesIO(text), 'history.csv')}, headers=headers,
+        content_type='multipart/form-data'
+    )
+    assert response.status_code == 202
+    job_path = response.headers['Location']
+
+    for _ in range(100):
+        job = client.get(job_path, headers=headers).get_json()['data']
+        if job['status'] not in ('queued', 'running'):
+            break
+        time.sleep(0.02)
+
+    assert job['status'] == 'done'
+    assert job['stats'] == {'rows': 3, 'inserted': 2, 'duplicates': 1, 'invalid': 0, 'chunks': 1}
+    assert db.bmi_summary.find_one()['count'] == 3
@@ -0,0 +1,76 @@
+"""Incremental BMI summaries, their rolling window and the rebuild from history"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.bmi_summary import BMISummary
+
+mongomock = pytest.importorskip('mongomock')
+
+NOW = datetime(2024, 6, 1)
+
+
+def record(user_id, days_ago, weight=70.0, bmi=24.2):
+    return {'user_id': user_id, 'weight': weight, 'bmi': bmi, 'created_at': NOW - timedelta(days=days_ago)}
+
+
+@pytest.fixture
+def summary_model(bulk_write):
+    return BMISummary(type('Mongo', (), {'db': mongomock.MongoClient().db})())
+
+
+def test_incremental_summary_matches_rebuild(summary_model):
+    history = summary_model.mongo.db.bmi_history
+    records = [record('user-1', day, weight=70.0 + day % 5, bmi=24.0 + day % 3 / 2) for day in range(90, 0, -3)]
+    records.append(record('user-2', 5))
+    history.insert_many([dict(r) for r in records])
+
+    summary_model.record_bmi_many(records[:10])
+    for bmi_data in records[10:]:
+        summary_model.record_bmi(bmi_data)
+    incremental = {s['_id']: summary_model.format_summary(s, NOW) for s in summary_model.collection.find()}
+
+    assert summary_model.rebuild(history) == 2
+    rebuilt = {s['_id']: summary_model.format_summary(s, NOW) for s in summary_model.collection.find()}
+
+    assert rebuilt.keys() == incremental.keys()
+    for user_id, data in incremental.items():
+        assert rebuilt[user_id] == pytest.approx(data)
+    assert incremental['user-1']['count'] == 30
+    assert incremental['user-1']['window_count'] == 10
+
+
+def test_window_is_not_reported_from_truncated_points(summary_model):
+    # Four weigh-ins a day: the window holds more records than the kept points
+    records = [record('user-1', hours / 24) for hours in range(0, 24 * 20, 6)]
+    summary_model.record_bmi_many(records)
+
+    data = summary_model.format_summary(summary_model.collection.find_one({'_id': 'user-1'}), NOW)
+
+    assert data['count'] == len(records)
+    assert data['window_truncated'] is True
+    assert data['window_count'] is None
+    assert data['window_weight_change'] is None
+    assert data['window_points_limit'] == BMISummary.RECENT_POINTS_LIMIT
+
+
+def test_rebuild_keeps_saves_made_while_it_runs(summary_model):
+    history = summary_model.mongo.db.bmi_history
+    history.insert_many([record('user-1', day) for day in (3, 2)])
+    summary_model.record_bmi_many([record('user-1', day) for day in (3, 2)])
+
+    # A save lands between the version snapshot and the replace of its user
+    replace = summary_model.write_rebuilt
+
+    def save_then_replace(writes):
+        saved = record('user-1', 1, weight=69.0)
+        history.insert_one(dict(saved))
+        summary_model.record_bmi(saved)
+        replace(writes)
+
+    summary_model.write_rebuilt = save_then_replace
+    summary_model.rebuild(history)
+
+    summary = summary_model.collection.find_one({'_id': 'user-1'})
+    assert summary['count'] == 3
+    assert summary['recent'][-1]['weight'] == 69.0
@@ -0,0 +1,103 @@
+"""Profile caches: LRU and TTL of the in-process cache, the Redis cache, write invalidation"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+import cache
+from cache import RedisCache, TTLCache, call_cache
+
+from conftest import register
+
+
+class FakeRedis:
+    """The part of the redis client RedisCache uses, on a dict"""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.expiry[key] = ex
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def scan_iter(self, pattern):
+        return [key for key in list(self.data) if key.startswith(pattern.rstrip('*'))]
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    profiles = TTLCache(max_size=2)
+    profiles.set('a', 1)
+    profiles.set('b', 2)
+    profiles.get('a')
+    profiles.set('c', 3)
+
+    assert profiles.get('b') is None
+    assert profiles.get('a') == 1
+    assert profiles.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    profiles = TTLCache(ttl=300)
+    profiles.set('a', 1)
+
+    now[0] += 299
+    assert profiles.get('a') == 1
+    now[0] += 2
+    assert profiles.get('a') is None
+    assert profiles.stats()['expirations'] == 1
+
+
+def test_redis_cache_round_trip_with_prefix_and_ttl():
+    client = FakeRedis()
+    profiles = RedisCache(client, ttl=60, prefix='profile:')
+    meal_plans = RedisCache(client, prefix='meal_plan:')
+
+    profiles.set('user-1', {'name': 'A'})
+    meal_plans.set('user-1', {'kcal': 2000})
+
+    assert json.loads(client.data['profile:user-1']) == {'name': 'A'}
+    assert client.expiry['profile:user-1'] == 60
+    assert profiles.get('user-1') == {'name': 'A'}
+
+    profiles.clear()
+    assert profiles.get('user-1') is None
+    assert meal_plans.get('user-1') == {'kcal': 2000}
+    assert profiles.stats()['misses'] == 1
+
+
+def test_call_cache_runs_blocking_caches_in_a_thread():
+    threads = []
+
+    class Recording(RedisCache):
+        def get(self, key):
+            threads.append(threading.current_thread())
+            return super().get(key)
+
+    async def lookups():
+        await call_cache(Recording(FakeRedis()).get, 'a')
+        await call_cache(TTLCache().get, 'a')
+
+    asyncio.run(lookups())
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_profile_update_refreshes_the_cached_profile(app, client):
+    headers = register(client, 'cached@example.com')
+    user_id = client.get('/api/user/profile', headers=headers).get_json()['user']['id']
+    profiles = app.extensions['services'].profile_cache
+    assert profiles.get(user_id)['height'] is None
+
+    client.put('/api/user/profile', json={'height': 180}, headers=headers)
+
+    assert profiles.get(user_id)['height'] == 180
+    assert client.get('/api/user/profile', headers=headers).get_json()['user']['height'] == 180
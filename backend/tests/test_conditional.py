@@ -0,0 +1,51 @@
+"""ETag conditional GETs of the profile and the BMI history"""
+import pytest
+
+from conftest import register
+from conditional import make_etag
+
+mongomock = pytest.importorskip('mongomock')
+
+
+def revalidate(client, path, headers, etag):
+    return client.get(path, headers=dict(headers, **{'If-None-Match': etag}))
+
+
+def test_make_etag_variants():
+    assert make_etag('history', 'u', 1) != make_etag('history', 'u', 2)
+    assert make_etag('history', 'u', 1, b'limit=10') != make_etag('history', 'u', 1, b'limit=20')
+
+
+def test_profile_not_modified_until_updated(client):
+    headers = register(client, 'etag@example.com')
+
+    response = client.get('/api/user/profile', headers=headers)
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    response = revalidate(client, '/api/user/profile', headers, etag)
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+    client.put('/api/user/profile', json={'height': 175}, headers=headers)
+
+    response = revalidate(client, '/api/user/profile', headers, etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_history_not_modified_until_a_save(client):
+    headers = register(client, 'history-etag@example.com')
+    client.post('/api/bmi/save', json={'weight': 70, 'height': 170}, headers=headers)
+
+    etag = client.get('/api/bmi/history?limit=5', headers=headers).headers['ETag']
+    assert revalidate(client, '/api/bmi/history?limit=5', headers, etag).status_code == 304
+    # Another page size is another representation
+    assert revalidate(client, '/api/bmi/history?limit=6', headers, etag).status_code == 200
+
+    client.post('/api/bmi/save', json={'weight': 71, 'height': 170}, headers=headers)
+
+    response = revalidate(client, '/api/bmi/history?limit=5', headers, etag)
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == 2
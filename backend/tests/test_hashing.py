@@ -0,0 +1,117 @@
+"""Password hashing pool: method parsing, backpressure and rehash on login"""
+from concurrent.futures import Future
+from datetime import datetime
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from hashing import HasherBusy, PasswordHasher, normalize_method
+
+CHEAP_METHOD = 'pbkdf2:sha256:1000'
+
+
+class PendingExecutor:
+    """Executor whose jobs only finish when the test completes their futures"""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, func, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+
+@pytest.mark.parametrize('method', ['scrypt', 'scrypt:16384:8:1', 'pbkdf2', 'pbkdf2:sha512', CHEAP_METHOD])
+def test_normalize_method_matches_werkzeug_prefix(method):
+    assert normalize_method(method) == generate_password_hash('secret', method).split('$', 1)[0]
+
+
+def test_needs_rehash_only_for_other_parameters():
+    hasher = PasswordHasher(method=CHEAP_METHOD, workers=0)
+
+    assert not hasher.needs_rehash(hasher.hash('secret'))
+    assert hasher.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:500'))
+    assert hasher.verify(hasher.hash('secret'), 'secret')
+
+
+def start_hash(hasher, executor, results):
+    """Hash in a thread, return once its job is waiting on the executor"""
+    submitted = len(executor.futures)
+    thread = threading.Thread(target=lambda: results.append(hasher.hash('secret')))
+    thread.start()
+    while len(executor.futures) == submitted:
+        pass
+    return thread
+
+
+def test_full_queue_raises_busy_and_frees_slots():
+    hasher = PasswordHasher(method=CHEAP_METHOD, workers=1, max_pending=1, timeout=5)
+    executor = hasher._executor = PendingExecutor()
+    results = []
+
+    waiting = start_hash(hasher, executor, results)
+    with pytest.raises(HasherBusy):
+        hasher.hash('secret')
+
+    executor.futures[0].set_result('first')
+    waiting.join()
+
+    # The finished job gave its slot back
+    waiting = start_hash(hasher, executor, results)
+    executor.futures[1].set_result('second')
+    waiting.join()
+    assert results == ['first', 'second']
+
+
+def test_process_pool_hashes():
+    hasher = PasswordHasher(method=CHEAP_METHOD, workers=1)
+    try:
+        assert hasher.verify(hasher.hash('secret'), 'secret')
+    finally:
+        hasher.shutdown()
+
+
+@pytest.fixture
+def legacy_user(db):
+    """User whose hash was made with outdated parameters"""
+    db.users.insert_one({
+        'name': 'Old', 'email': 'old@example.com', 'email_key': 'old@example.com',
+        'password': generate_password_hash('secret123', 'pbkdf2:sha256:500'),
+        'created_at': datetime.utcnow(), 'updated_at': datetime.utcnow(),
+    })
+    return db.users
+
+
+def test_login_upgrades_outdated_hash(app, client, legacy_user):
+    response = client.post('/api/auth/login', json={'email': 'old@example.com', 'password': 'secret123'})
+
+    assert response.status_code == 200
+    stored = legacy_user.find_one({'email_key': 'old@example.com'})['password']
+    assert not app.extensions['services'].password_hasher.needs_rehash(stored)
+
+
+def test_busy_hasher_only_postpones_the_upgrade(app, client, legacy_user, monkeypatch):
+    hasher = app.extensions['services'].password_hasher
+    before = legacy_user.find_one()['password']
+
+    def busy(password):
+        raise HasherBusy('Password hashing queue is full')
+
+    monkeypatch.setattr(hasher, 'hash', busy)
+    response = client.post('/api/auth/login', json={'email': 'old@example.com', 'password': 'secret123'})
+
+    assert response.status_code == 200
+    assert legacy_user.find_one()['password'] == before
+
+
+def test_busy_hasher_answers_503(app, client, legacy_user, monkeypatch):
+    def busy(password_hash, password):
+        raise HasherBusy('Password hashing queue is full')
+
+    monkeypatch.setattr(app.extensions['services'].password_hasher, 'verify', busy)
+    response = client.post('/api/auth/login', json={'email': 'old@example.com', 'password': 'secret123'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
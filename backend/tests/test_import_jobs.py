@@ -0,0 +1,70 @@
+"""Background import jobs: status, expiry and jobs abandoned by a stopped worker"""
+from datetime import datetime, timedelta
+import os
+import time
+
+import pytest
+
+import bmi_import
+from models.import_jobs import ImportJobs
+
+mongomock = pytest.importorskip('mongomock')
+
+
+@pytest.fixture
+def jobs():
+    return ImportJobs(mongomock.MongoClient().db)
+
+
+def test_new_job_expires_even_if_never_finished(jobs):
+    job = jobs.create('user-1', 'csv', 'history.csv', bmi_import.import_stats())
+
+    assert job['status'] == 'queued'
+    assert job['expires_at'] > datetime.utcnow() + timedelta(days=6)
+
+
+def test_stale_running_job_is_failed_on_status_request(jobs):
+    job = jobs.create('user-1', 'csv', 'history.csv', bmi_import.import_stats())
+    jobs.progress(job['_id'], dict(bmi_import.import_stats(), rows=100, chunks=1))
+    jobs.collection.update_one({'_id': job['_id']}, {'$set': {'updated_at': datetime.utcnow() - timedelta(hours=1)}})
+
+    result = jobs.get_job(str(job['_id']), 'user-1')
+
+    assert result['data']['status'] == 'failed'
+    assert result['data']['error'] == ImportJobs.STALE_ERROR
+    # The progress recorded before the worker stopped is kept
+    assert result['data']['stats']['rows'] == 100
+
+    # The worker (if it is still alive after all) cannot revive it
+    jobs.finish(job['_id'], bmi_import.import_stats())
+    assert jobs.get_job(str(job['_id']), 'user-1')['data']['status'] == 'failed'
+
+
+def test_recent_running_job_is_left_alone(jobs):
+    job = jobs.create('user-1', 'csv', 'history.csv', bmi_import.import_stats())
+    jobs.progress(job['_id'], bmi_import.import_stats())
+
+    assert jobs.get_job(str(job['_id']), 'user-1')['data']['status'] == 'running'
+
+
+def test_job_of_another_user_or_bad_id_is_not_found(jobs):
+    job = jobs.create('user-1', 'csv', 'history.csv', bmi_import.import_stats())
+
+    assert not jobs.get_job(str(job['_id']), 'user-2')['success']
+    assert not jobs.get_job('not-an-id', 'user-1')['success']
+
+
+def test_stale_spool_files_are_removed(tmp_path, monkeypatch):
+    monkeypatch.setenv('BMI_IMPORT_SPOOL_DIR', str(tmp_path))
+    stale = bmi_import.spool_file('csv')
+    an_hour_ago = time.time() - 3600
+    os.utime(stale, (an_hour_ago, an_hour_ago))
+    other = tmp_path / 'other.csv'
+    other.write_text('')
+    os.utime(other, (an_hour_ago, an_hour_ago))
+
+    fresh = bmi_import.spool_file('csv')
+
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
+    assert other.exists()
@@ -0,0 +1,30 @@
+"""Responses built from MongoDB documents are encoded by our JSON provider
+
+Flask-PyMongo installs its own BSONProvider when the client is created, which
+would render ObjectId and datetime as {"$oid": ...} and {"$date": ...}.
+"""
+from datetime import datetime
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+
+def test_mongo_backed_response_has_plain_ids_and_iso_dates(client):
+    response = client.post('/api/auth/register', json={
+        'name': 'Test', 'email': 'json@example.com', 'password': 'secret123'
+    })
+    headers = {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+    response = client.post('/api/bmi/save', json={'weight': 70, 'height': 170}, headers=headers)
+    assert response.status_code == 200
+
+    # History records are raw documents, _id is exposed as id without conversion in the model
+    response = client.get('/api/bmi/history', headers=headers)
+    assert response.status_code == 200
+    record = response.get_json()['data'][0]
+
+    assert isinstance(record['id'], str)
+    assert len(record['id']) == 24
+    assert isinstance(record['created_at'], str)
+    datetime.fromisoformat(record['created_at'])
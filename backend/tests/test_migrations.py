@@ -0,0 +1,49 @@
+"""Schema migrations and the time-series copy"""
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from migrations import migrate_bmi_to_timeseries
+
+mongomock = pytest.importorskip('mongomock')
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().db
+    # mongomock has no time-series collections, a plain target stands in for one
+    db.create_collection('bmi_history_ts')
+    return db
+
+
+def record(at, weight=70.0):
+    return {'_id': ObjectId.from_datetime(at), 'user_id': 'user-1', 'weight': weight, 'created_at': at}
+
+
+def test_timeseries_copy_resumes_without_duplicates(db):
+    start = datetime(2024, 1, 1)
+    db.bmi_history.insert_many([record(start + timedelta(hours=hour)) for hour in range(3)])
+
+    assert migrate_bmi_to_timeseries(db, batch_size=2) == 3
+    # Nothing new: a re-run copies nothing
+    assert migrate_bmi_to_timeseries(db) == 0
+
+    # Saved during the copy
+    db.bmi_history.insert_one(record(start + timedelta(hours=5)))
+    assert migrate_bmi_to_timeseries(db) == 1
+
+    # A late write-behind record with a slightly older _id than the newest copied one
+    db.bmi_history.insert_one(record(start + timedelta(hours=4, minutes=58)))
+    assert migrate_bmi_to_timeseries(db) == 1
+
+    assert db.bmi_history_ts.count_documents({}) == db.bmi_history.count_documents({}) == 5
+
+
+def test_checked_queries_follow_the_bmi_collection():
+    from migrations import checked_queries
+
+    collections = [collection for collection, _, _ in checked_queries('bmi_history_ts')]
+
+    assert 'bmi_history_ts' in collections
+    assert 'bmi_history' not in collections
@@ -0,0 +1,33 @@
+"""Profile updates answer with the same shape whether or not anything changed"""
+import pytest
+
+from conftest import register
+
+mongomock = pytest.importorskip('mongomock')
+
+
+@pytest.mark.parametrize('payload', [
+    {'height': 170, 'currentWeight': 70},
+    # Only unknown fields: nothing to write
+    {'unknown': 1},
+])
+def test_profile_update_response_shape(client, payload):
+    headers = register(client, 'profile@example.com')
+
+    response = client.put('/api/user/profile', json=payload, headers=headers)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert set(data) == {'success', 'message', 'user', 'token'}
+    assert data['user']['email'] == 'profile@example.com'
+
+
+def test_repeated_update_keeps_shape_and_version(client):
+    headers = register(client, 'repeat@example.com')
+    first = client.put('/api/user/profile', json={'height': 170}, headers=headers).get_json()
+
+    # Same value again matches nothing in the database
+    second = client.put('/api/user/profile', json={'height': 170}, headers=headers).get_json()
+
+    assert set(second) == set(first)
+    assert second['user']['version'] == first['user']['version']
@@ -0,0 +1,103 @@
+"""Write-behind buffer: batching, partial failures, backpressure and shutdown"""
+import asyncio
+import threading
+import time
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from write_buffer import AsyncWriteBehindBuffer, BufferFull, WriteBehindBuffer
+
+
+class FakeCollection:
+    """insert_many recorder, rejecting the _ids listed in fail and blocking while `unblocked` is clear"""
+
+    def __init__(self, fail=()):
+        self.inserted = []
+        self.fail = set(fail)
+        self.unblocked = threading.Event()
+        self.unblocked.set()
+
+    def with_options(self, **kwargs):
+        return self
+
+    def insert_many(self, documents, ordered=True):
+        self.unblocked.wait()
+        errors = [{'index': i, 'code': 11000} for i, document in enumerate(documents) if document['_id'] in self.fail]
+        self.inserted.extend(document for document in documents if document['_id'] not in self.fail)
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'writeConcernErrors': []})
+
+
+class AsyncFakeCollection(FakeCollection):
+    async def insert_many(self, documents, ordered=True):
+        while not self.unblocked.is_set():
+            await asyncio.sleep(0.01)
+        FakeCollection.insert_many(self, documents, ordered)
+
+
+def test_flushes_in_batches_and_reports_written_documents():
+    collection = FakeCollection(fail={3})
+    flushed = []
+    buffer = WriteBehindBuffer(collection, batch_size=4, flush_interval=0.01, on_flushed=flushed.extend)
+
+    for i in range(6):
+        buffer.put({'_id': i})
+    buffer.close()
+
+    assert [document['_id'] for document in collection.inserted] == [0, 1, 2, 4, 5]
+    assert flushed == collection.inserted
+    assert buffer.stats['queued'] == 6
+    assert buffer.stats['flushed'] == 5
+    assert buffer.stats['failed'] == 1
+
+
+def test_full_queue_raises_buffer_full():
+    collection = FakeCollection()
+    collection.unblocked.clear()
+    buffer = WriteBehindBuffer(collection, max_size=1, batch_size=1, put_timeout=0.01)
+
+    buffer.put({'_id': 0})
+    # The flusher takes the first document and blocks on the insert, then the queue fills up
+    time.sleep(0.05)
+    buffer.put({'_id': 1})
+    with pytest.raises(BufferFull):
+        buffer.put({'_id': 2})
+
+    collection.unblocked.set()
+    buffer.close()
+    with pytest.raises(BufferFull):
+        buffer.put({'_id': 3})
+
+
+def test_close_does_not_hang_on_a_stuck_flusher(capsys):
+    collection = FakeCollection()
+    collection.unblocked.clear()
+    buffer = WriteBehindBuffer(collection, max_size=1, batch_size=1, put_timeout=0.01)
+    buffer.put({'_id': 0})
+    time.sleep(0.05)
+    buffer.put({'_id': 1})
+
+    started = time.monotonic()
+    buffer.close(timeout=0.2)
+
+    assert time.monotonic() - started < 1
+    assert '1 records not written' in capsys.readouterr().out
+    collection.unblocked.set()
+
+
+def test_async_close_does_not_hang_on_a_stuck_flusher(capsys):
+    async def scenario():
+        collection = AsyncFakeCollection()
+        collection.unblocked.clear()
+        buffer = AsyncWriteBehindBuffer(collection, max_size=1, batch_size=1, put_timeout=0.01)
+        await buffer.put({'_id': 0})
+        await asyncio.sleep(0.05)
+        await buffer.put({'_id': 1})
+
+        started = time.monotonic()
+        await buffer.close(timeout=0.2)
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 1
+    assert '1 records not written' in capsys.readouterr().out
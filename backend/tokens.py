@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+import uuid
+
+import jwt
+
+# Same algorithm and claim layout as flask_jwt_extended, so tokens work in both serving modes
+JWT_ALGORITHM = 'HS256'
+
+
+def encode_token(identity, secret, token_type, expires_delta, additional_claims=None):
+    """Create an access or refresh token outside of a Flask app context"""
+    now = datetime.now(timezone.utc)
+    payload = dict(additional_claims or {})
+    payload.update({
+        'fresh': False,
+        'iat': now,
+        'jti': str(uuid.uuid4()),
+        'type': token_type,
+        'sub': identity,
+        'nbf': now,
+        'exp': now + expires_delta,
+    })
+    if token_type == 'refresh':
+        # flask_jwt_extended does not put the fresh claim on refresh tokens
+        del payload['fresh']
+    return jwt.encode(payload, secret, algorithm=JWT_ALGORITHM)
+
+
+def encode_access_token(identity, secret, expires_delta=timedelta(days=7), additional_claims=None):
+    return encode_token(identity, secret, 'access', expires_delta, additional_claims)
+
+
+def encode_refresh_token(identity, secret, expires_delta=timedelta(days=30)):
+    return encode_token(identity, secret, 'refresh', expires_delta)
+
+
+def decode_token(token, secret, token_type='access'):
+    """Verify a token and return its claims, raise jwt.InvalidTokenError if invalid"""
+    claims = jwt.decode(token, secret, algorithms=[JWT_ALGORITHM])
+    if claims.get('type') != token_type:
+        # Same messages as flask_jwt_extended
+        if token_type == 'refresh':
+            raise jwt.InvalidTokenError('Only refresh tokens are allowed')
+        raise jwt.InvalidTokenError('Only non-refresh tokens are allowed')
+    return claims
+
+
+def decode_access_token(token, secret):
+    return decode_token(token, secret, 'access')
+
+
+class TokenError(Exception):
+    """Missing, malformed or invalid token, with the status flask_jwt_extended answers with"""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def claims_from_header(auth_header, secret, token_type='access'):
+    """Verify an `Authorization: Bearer <JWT>` header and return the claims, raise TokenError if invalid
+
+    Same checks and error messages as flask_jwt_extended's jwt_required, for the
+    ASGI mode where its Flask-bound decorator cannot run.
+    """
+    if not auth_header:
+        raise TokenError('Missing Authorization Header', 401)
+
+    parts = auth_header.split()
+    if len(parts) != 2 or parts[0] != 'Bearer':
+        raise TokenError("Bad Authorization header. Expected 'Authorization: Bearer <JWT>'", 422)
+
+    try:
+        return decode_token(parts[1], secret, token_type)
+    except jwt.ExpiredSignatureError:
+        raise TokenError('Token has expired', 401)
+    except jwt.InvalidTokenError as e:
+        raise TokenError(str(e), 422)
@@ -0,0 +1,211 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import re
+
+from models.bmi import BMI
+from models.food import Food
+from models.analytics import Analytics
+from bmi_import import IMPORT_FORMATS, detect_format
+
+# Maximum number of weight/height pairs in one batch calculation
+MAX_BATCH_SIZE = 50000
+
+
+class ValidationError(Exception):
+    """Invalid request input, the message is returned to the client with a 400"""
+
+
+def validate_register(data):
+    if not data or not data.get('name') or not data.get('email') or not data.get('password'):
+        raise ValidationError('Invalid input')
+
+
+def validate_login(data):
+    if not data or not data.get('email') or not data.get('password'):
+        raise ValidationError('Email atau password tidak valid')
+
+
+def validate_profile_update(data):
+    if not data:
+        raise ValidationError('Data tidak valid')
+
+    # Basic validation
+    if 'name' in data and not data['name'].strip():
+        raise ValidationError('Nama tidak boleh kosong')
+
+    if 'age' in data and (not isinstance(data['age'], int) or data['age'] < 1 or data['age'] > 150):
+        raise ValidationError('Umur tidak valid (1-150 tahun)')
+
+    if 'height' in data and (not isinstance(data['height'], (int, float)) or data['height'] < 100 or data['height'] > 250):
+        raise ValidationError('Tinggi badan tidak valid (100-250 cm)')
+
+    if 'currentWeight' in data and (not isinstance(data['currentWeight'], (int, float)) or data['currentWeight'] < 30 or data['currentWeight'] > 300):
+        raise ValidationError('Berat badan tidak valid (30-300 kg)')
+
+    if 'targetWeight' in data and (not isinstance(data['targetWeight'], (int, float)) or data['targetWeight'] < 30 or data['targetWeight'] > 300):
+        raise ValidationError('Target berat tidak valid (30-300 kg)')
+
+
+def validate_save_bmi(data):
+    if not data or not data.get('weight') or not data.get('height'):
+        raise ValidationError('Invalid input')
+
+
+def validate_batch(data):
+    if not data or not isinstance(data.get('weights'), list) or not isinstance(data.get('heights'), list):
+        raise ValidationError('Invalid input')
+
+    if len(data['weights']) != len(data['heights']):
+        raise ValidationError('Jumlah data berat dan tinggi harus sama')
+
+    if len(data['weights']) > MAX_BATCH_SIZE:
+        raise ValidationError(f'Maksimal {MAX_BATCH_SIZE} data per request')
+
+
+def parse_date_param(value, end=False):
+    """Parse a from/to query date (ISO 8601) into naive UTC, date-only `to` covers the whole day"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def parse_history_args(args):
+    """Parse the history query string into get_user_bmi_history keyword arguments"""
+    try:
+        limit = int(args.get('limit', BMI.DEFAULT_HISTORY_LIMIT))
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        raise ValidationError('Limit tidak valid')
+
+    after = None
+    if args.get('cursor'):
+        try:
+            after = BMI.decode_cursor(args['cursor'])
+        except ValueError:
+            raise ValidationError('Cursor tidak valid')
+
+    try:
+        date_from = parse_date_param(args['from']) if args.get('from') else None
+        date_to = parse_date_param(args['to'], end=True) if args.get('to') else None
+    except ValueError:
+        raise ValidationError('Format tanggal tidak valid')
+
+    fields = None
+    if args.get('fields'):
+        fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+        if any(field not in BMI.HISTORY_FIELDS for field in fields):
+            raise ValidationError('Field tidak valid')
+
+    return {
+        'limit': limit,
+        'after': after,
+        'date_from': date_from,
+        'date_to': date_to,
+        'fields': fields
+    }
+
+
+def parse_trend_args(args):
+    """Parse the trend query string into get_bmi_trend keyword arguments"""
+    bucket = args.get('bucket', 'week')
+    if bucket not in BMI.TREND_BUCKETS:
+        raise ValidationError('Bucket tidak valid (day/week/month)')
+
+    try:
+        date_from = parse_date_param(args['from']) if args.get('from') else None
+        date_to = parse_date_param(args['to'], end=True) if args.get('to') else None
+    except ValueError:
+        raise ValidationError('Format tanggal tidak valid')
+
+    return {
+        'bucket': bucket,
+        'date_from': date_from,
+        'date_to': date_to,
+        'timezone': parse_timezone(args.get('tz') or 'UTC')
+    }
+
+
+# UTC offsets MongoDB accepts as a timezone besides IANA names: +07, +0700, +07:00
+UTC_OFFSET_PATTERN = re.compile(r'[+-]\d{2}(:?\d{2})?')
+
+
+def parse_timezone(tz):
+    """IANA timezone name or UTC offset for $dateTrunc, checked here so a bad value is a 400 and not a failed aggregation"""
+    if UTC_OFFSET_PATTERN.fullmatch(tz):
+        return tz
+    try:
+        ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError('Zona waktu tidak valid')
+    return tz
+
+
+def parse_recent_limit(args):
+    """Number of recent BMI records for the dashboard, None for the default"""
+    if not args.get('recent'):
+        return None
+    try:
+        recent = int(args['recent'])
+        if recent < 1:
+            raise ValueError
+        return recent
+    except ValueError:
+        raise ValidationError('Jumlah data terbaru tidak valid')
+
+
+def parse_export_format(args):
+    export_format = args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        raise ValidationError('Format export tidak valid (csv/ndjson)')
+    return export_format
+
+
+def parse_recommendation_args(args):
+    """Parse the food recommendation query string into Food.recommend keyword arguments"""
+    try:
+        k = int(args.get('k', Food.DEFAULT_TOP_K))
+        if k < 1:
+            raise ValueError
+    except ValueError:
+        raise ValidationError('Jumlah rekomendasi tidak valid')
+
+    meal = args.get('meal') or None
+    if meal is not None and meal not in Food.MEALS:
+        raise ValidationError('Waktu makan tidak valid (breakfast/lunch/dinner/snack)')
+
+    return {'k': k, 'meal': meal}
+
+
+def parse_analytics_args(args, now=None):
+    """Parse the cohort query string into Analytics.query keyword arguments, default range is this month"""
+    now = now or datetime.utcnow()
+
+    try:
+        date_from = parse_date_param(args['from']) if args.get('from') else datetime(now.year, now.month, 1)
+        date_to = parse_date_param(args['to'], end=True) if args.get('to') else now
+    except ValueError:
+        raise ValidationError('Format tanggal tidak valid')
+
+    source = args.get('source', 'bmi')
+    if source not in Analytics.SOURCES:
+        raise ValidationError('Sumber data tidak valid (bmi/profile)')
+
+    group_by = Analytics.DIMENSIONS
+    if 'group_by' in args:
+        group_by = [dimension.strip() for dimension in args['group_by'].split(',') if dimension.strip()]
+        if any(dimension not in Analytics.DIMENSIONS for dimension in group_by):
+            raise ValidationError('Dimensi tidak valid (category/gender/age_band)')
+
+    return {'date_from': date_from, 'date_to': date_to, 'source': source, 'group_by': group_by}
+
+
+def parse_import_format(args, filename=None):
+    """Import format from ?format=, else from the uploaded file name"""
+    import_format = args.get('format') or detect_format(filename)
+    if import_format not in IMPORT_FORMATS:
+        raise ValidationError('Format import tidak valid (csv/jsonl)')
+    return import_format
@@ -0,0 +1,264 @@
+"""Write-behind buffer for BMI inserts
+
+Saves go into a bounded in-process queue and a background flusher writes them
+with unordered insert_many once batch_size records are waiting or flush_interval
+seconds have passed, so a burst of weigh-ins costs one round trip per batch
+instead of one per record. Documents get their _id before they are queued, so
+callers can answer right away with the same response as a direct insert.
+
+Records still in the queue are lost if the process dies without draining it;
+close() (registered with atexit) flushes everything on a normal shutdown.
+"""
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+import asyncio
+import atexit
+import os
+import queue
+import threading
+import time
+
+
+class BufferFull(Exception):
+    """Raised when the write queue is full, routes answer with 503"""
+
+
+def write_concern(w=None, j=None):
+    """WriteConcern from config values, w may be a number or a tag like 'majority'; None keeps the client's"""
+    if w is None and j is None:
+        return None
+    if w is not None and str(w).isdigit():
+        w = int(w)
+    return WriteConcern(w=w, j=j)
+
+
+def buffer_options():
+    """Write-behind queue, batch and write concern settings, tunable through the environment"""
+    journal = os.getenv('BMI_WRITE_CONCERN_J')
+    return {
+        'max_size': int(os.getenv('BMI_WRITE_QUEUE_SIZE', 10000)),
+        'batch_size': int(os.getenv('BMI_WRITE_BATCH_SIZE', 500)),
+        'flush_interval': float(os.getenv('BMI_WRITE_FLUSH_MS', 50)) / 1000,
+        'put_timeout': float(os.getenv('BMI_WRITE_PUT_TIMEOUT_MS', 100)) / 1000,
+        'concern': write_concern(
+            os.getenv('BMI_WRITE_CONCERN_W'),
+            journal.lower() == 'true' if journal else None
+        ),
+    }
+
+
+def _failed_indexes(error):
+    return {write_error['index'] for write_error in error.details.get('writeErrors', [])}
+
+
+class WriteBehindBuffer:
+    """Bounded queue plus a flusher thread doing batched unordered inserts
+
+    on_flushed(documents) is called from the flusher thread with the documents
+    that were written, e.g. to update derived data.
+    """
+
+    def __init__(self, collection, max_size=10000, batch_size=500, flush_interval=0.05,
+                 put_timeout=0.1, concern=None, on_flushed=None):
+        self.collection = collection.with_options(write_concern=concern) if concern else collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.on_flushed = on_flushed
+        self.stats = {'queued': 0, 'flushed': 0, 'failed': 0, 'batches': 0}
+        self._queue = queue.Queue(maxsize=max_size)
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _start(self):
+        # Started on first use so each server worker gets its own flusher after fork
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='bmi-write-behind', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def put(self, document):
+        """Queue a document that already has its _id, raise BufferFull under backpressure"""
+        if self._closed:
+            raise BufferFull('Write buffer is closed')
+
+        self._start()
+        try:
+            self._queue.put(document, timeout=self.put_timeout)
+        except queue.Full:
+            raise BufferFull('Write buffer is full')
+        with self._lock:
+            self.stats['queued'] += 1
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _next_batch(self):
+        """Block for the first document, then collect more until the batch is full or the interval ends"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = None in batch
+            self.flush([document for document in batch if document is not None])
+            if stop:
+                return
+
+    def flush(self, documents):
+        """Insert one batch, failed documents are logged and dropped"""
+        if not documents:
+            return
+
+        written = documents
+        try:
+            self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = _failed_indexes(e)
+            written = [document for index, document in enumerate(documents) if index not in failed]
+            print(f"Error flushing BMI write buffer: {len(failed)} of {len(documents)} records failed")
+        except Exception as e:
+            written = []
+            print(f"Error flushing BMI write buffer: {str(e)}")
+
+        self.stats['batches'] += 1
+        self.stats['flushed'] += len(written)
+        self.stats['failed'] += len(documents) - len(written)
+
+        if written and self.on_flushed is not None:
+            try:
+                self.on_flushed(written)
+            except Exception as e:
+                print(f"Error after flushing BMI write buffer: {str(e)}")
+
+    def close(self, timeout=30):
+        """Stop accepting writes and drain the queue, waiting at most timeout seconds in total"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        if self._thread is not None:
+            deadline = time.monotonic() + timeout
+            # The sentinel lands after every queued document, so they are all flushed first.
+            # A full queue means the flusher is stuck (e.g. MongoDB is down), shutdown does not wait for it
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                print(f"Error closing BMI write buffer: queue still full, {self.pending()} records not written")
+                return
+
+            self._thread.join(max(deadline - time.monotonic(), 0))
+            if self._thread.is_alive():
+                print(f"Error closing BMI write buffer: drain timed out, {self.pending()} records not written")
+
+
+class AsyncWriteBehindBuffer(WriteBehindBuffer):
+    """WriteBehindBuffer on an async collection, the flusher is an asyncio task
+
+    on_flushed must be a coroutine function. Create it inside the running event loop.
+    """
+
+    def __init__(self, collection, max_size=10000, batch_size=500, flush_interval=0.05,
+                 put_timeout=0.1, concern=None, on_flushed=None):
+        super().__init__(collection, max_size, batch_size, flush_interval, put_timeout, concern, on_flushed)
+        self._queue = asyncio.Queue(maxsize=max_size)
+        self._task = None
+
+    def _start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def put(self, document):
+        if self._closed:
+            raise BufferFull('Write buffer is closed')
+
+        self._start()
+        try:
+            await asyncio.wait_for(self._queue.put(document), self.put_timeout)
+        except asyncio.TimeoutError:
+            raise BufferFull('Write buffer is full')
+        self.stats['queued'] += 1
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            stop = None in batch
+            await self.flush([document for document in batch if document is not None])
+            if stop:
+                return
+
+    async def flush(self, documents):
+        if not documents:
+            return
+
+        written = documents
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = _failed_indexes(e)
+            written = [document for index, document in enumerate(documents) if index not in failed]
+            print(f"Error flushing BMI write buffer: {len(failed)} of {len(documents)} records failed")
+        except Exception as e:
+            written = []
+            print(f"Error flushing BMI write buffer: {str(e)}")
+
+        self.stats['batches'] += 1
+        self.stats['flushed'] += len(written)
+        self.stats['failed'] += len(documents) - len(written)
+
+        if written and self.on_flushed is not None:
+            try:
+                await self.on_flushed(written)
+            except Exception as e:
+                print(f"Error after flushing BMI write buffer: {str(e)}")
+
+    async def close(self, timeout=30):
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._task is not None:
+            deadline = time.monotonic() + timeout
+            try:
+                await asyncio.wait_for(self._queue.put(None), timeout)
+            except asyncio.TimeoutError:
+                print(f"Error closing BMI write buffer: queue still full, {self.pending()} records not written")
+                self._task.cancel()
+                return
+
+            try:
+                await asyncio.wait_for(self._task, max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                # wait_for cancelled the flusher
+                print(f"Error closing BMI write buffer: drain timed out, {self.pending()} records not written")
@@ -0,0 +1,21 @@
+"""Production WSGI entrypoint
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Gunicorn imports this module in every worker after fork (preload_app is off),
+so each worker creates its own MongoDB client and connection pool. Workers do
+not migrate the schema, apply pending migrations as a pre-deploy step:
+
+    flask --app app migrate
+"""
+from app import create_app
+from mongo_pool import warm_up
+import os
+
+app = create_app()
+
+# Open pooled connections up front so the first requests of a new worker are not slower
+try:
+    warm_up(app.extensions['services'].mongo.cx, int(os.getenv('MONGO_WARMUP_CONNECTIONS', 2)))
+except Exception as e:
+    app.logger.warning(f"Error warming up MongoDB pool: {str(e)}")
@@ -23,6 +23,7 @@ export default function DashboardPage() {
   const router = useRouter()
   const [activeMenu, setActiveMenu] = useState('dashboard')
   const [currentUser, setCurrentUser] = useState<UserProfile | null>(null)
+  const [latestBmiDate, setLatestBmiDate] = useState<string | null>(null)
   const [currentTime, setCurrentTime] = useState('')
   const [isLoading, setIsLoading] = useState(true)
 
@@ -62,16 +63,18 @@ export default function DashboardPage() {
 
   const fetchUserProfile = async () => {
     try {
-      const result = await ApiClient.getUserProfile()
+      const result = await ApiClient.getDashboard()
       
       if (result.success) {
-        setCurrentUser(result.user)
+        setCurrentUser(result.data.user)
+        setLatestBmiDate(result.data.latest_bmi?.date || null)
         // Also save name to localStorage for offline usage
-        localStorage.setItem('userName', result.user.name)
+        localStorage.setItem('userName', result.data.user.name)
       } else {
         // If token invalid, redirect to login
         if (result.message?.includes('token') || result.message?.includes('authorization')) {
           localStorage.removeItem('token')
+          localStorage.removeItem('refresh_token')
           localStorage.removeItem('user')
           localStorage.removeItem('userName')
           router.push('/login')
@@ -121,7 +124,9 @@ export default function DashboardPage() {
     bmi: {
       value: currentUser?.bmi || 22.4,
       status: currentUser?.bmi_status || "Normal",
-      lastUpdate: "27 April 2024"
+      lastUpdate: latestBmiDate
+        ? new Date(latestBmiDate).toLocaleDateString('id-ID', { year: 'numeric', month: 'long', day: 'numeric' })
+        : "27 April 2024"
     },
     calories: {
       current: 1850,
@@ -92,6 +92,7 @@ export default function LoginPage() {
         try {
           // Backend return structure: {success: true, token: "...", user: {...}}
           localStorage.setItem('token', result.token)
+          localStorage.setItem('refresh_token', result.refresh_token)
           localStorage.setItem('user', JSON.stringify(result.user))
           
           console.log('Redirecting to dashboard...') 
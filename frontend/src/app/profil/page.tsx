@@ -62,6 +62,7 @@ export default function ProfilPage() {
         // If token invalid, redirect to login
         if (result.message?.includes('token') || result.message?.includes('authorization')) {
           localStorage.removeItem('token')
+          localStorage.removeItem('refresh_token')
           localStorage.removeItem('user')
           router.push('/login')
           return
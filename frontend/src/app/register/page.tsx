@@ -120,6 +120,7 @@ export default function RegisterPage() {
         try {
           // save token and user data to localStorage
           localStorage.setItem('token', result.token)
+          localStorage.setItem('refresh_token', result.refresh_token)
           localStorage.setItem('user', JSON.stringify(result.user))
           
           console.log('Redirecting to dashboard...')
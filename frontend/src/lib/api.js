@@ -35,23 +35,155 @@ class ApiClient {
         }
     }
 
+    // Exchange the refresh token for a new short-lived access token
+    static async refreshToken() {
+        const refreshToken = localStorage.getItem('refresh_token')
+        if (!refreshToken) {
+            return false
+        }
+
+        const response = await fetch(`${API_BASE_URL}/auth/refresh`, {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${refreshToken}`
+            }
+        })
+
+        const result = await response.json()
+        if (!result.success) {
+            return false
+        }
+
+        localStorage.setItem('token', result.token)
+        return true
+    }
+
+    // Authorized request, refreshes the access token once when it has expired
+    static async authorizedFetch(path, options = {}) {
+        const request = () => fetch(`${API_BASE_URL}${path}`, {
+            ...options,
+            headers: {
+                // Let the browser set the multipart boundary for file uploads
+                ...(options.body instanceof FormData ? {} : {'Content-Type': 'application/json'}),
+                'Authorization': `Bearer ${localStorage.getItem('token')}`
+            }
+        })
+
+        let response = await request()
+        if (response.status === 401 && await this.refreshToken()) {
+            response = await request()
+        }
+
+        return await response.json();
+    }
+
+    // Get current user (name, email, goal) from the access token, no database read
+    static async getMe() {
+        try {
+            if (!localStorage.getItem('token')) {
+                return {success: false, message: 'No token found'}
+            }
+
+            return await this.authorizedFetch('/me', {method: 'GET'})
+        } catch (error) {
+            return {success: false, message: 'Network error'}
+        }
+    }
+
     // Get User Profile
     static async getUserProfile() {
         try {
-            const token = localStorage.getItem('token')
-            if (!token) {
+            if (!localStorage.getItem('token')) {
                 return {success: false, message: 'No token found'}
             }
 
-            const response = await fetch(`${API_BASE_URL}/user/profile`, {
-                method: 'GET',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'Authorization': `Bearer ${token}`
-                }
-            })
+            return await this.authorizedFetch('/user/profile', {method: 'GET'})
+        } catch (error) {
+            return {success: false, message: 'Network error'}
+        }
+    }
 
-            return await response.json();
+    // Get Dashboard (profile, latest BMI and recent trend in one request)
+    static async getDashboard() {
+        try {
+            if (!localStorage.getItem('token')) {
+                return {success: false, message: 'No token found'}
+            }
+
+            return await this.authorizedFetch('/dashboard', {method: 'GET'})
+        } catch (error) {
+            return {success: false, message: 'Network error'}
+        }
+    }
+
+    // Get food recommendations for the user's goal and BMI, meal is breakfast/lunch/dinner/snack
+    static async getFoodRecommendations(k = 10, meal = null) {
+        try {
+            if (!localStorage.getItem('token')) {
+                return {success: false, message: 'No token found'}
+            }
+
+            const params = new URLSearchParams({k: String(k)})
+            if (meal) {
+                params.set('meal', meal)
+            }
+
+            return await this.authorizedFetch(`/food/recommendations?${params}`, {method: 'GET'})
+        } catch (error) {
+            return {success: false, message: 'Network error'}
+        }
+    }
+
+    // Get the daily meal plan for the user's profile
+    static async getMealPlan() {
+        try {
+            if (!localStorage.getItem('token')) {
+                return {success: false, message: 'No token found'}
+            }
+
+            return await this.authorizedFetch('/meal-plan', {method: 'GET'})
+        } catch (error) {
+            return {success: false, message: 'Network error'}
+        }
+    }
+
+    // Get the projected date for reaching the target weight
+    static async getBmiForecast() {
+        try {
+            if (!localStorage.getItem('token')) {
+                return {success: false, message: 'No token found'}
+            }
+
+            return await this.authorizedFetch('/bmi/forecast', {method: 'GET'})
+        } catch (error) {
+            return {success: false, message: 'Network error'}
+        }
+    }
+
+    // Import BMI history from a CSV or JSON-lines file, runs in the background: poll getBmiImportStatus with data.id
+    static async importBmi(file) {
+        try {
+            if (!localStorage.getItem('token')) {
+                return {success: false, message: 'No token found'}
+            }
+
+            const body = new FormData()
+            body.append('file', file)
+
+            return await this.authorizedFetch('/bmi/import', {method: 'POST', body})
+        } catch (error) {
+            return {success: false, message: 'Network error'}
+        }
+    }
+
+    // Status of a BMI import: queued, running, done or failed, with the totals so far
+    static async getBmiImportStatus(jobId) {
+        try {
+            if (!localStorage.getItem('token')) {
+                return {success: false, message: 'No token found'}
+            }
+
+            return await this.authorizedFetch(`/bmi/import/${jobId}`, {method: 'GET'})
         } catch (error) {
             return {success: false, message: 'Network error'}
         }
@@ -60,21 +192,21 @@ class ApiClient {
     // Update User Profile
     static async updateUserProfile(profileData) {
         try {
-            const token = localStorage.getItem('token')
-            if (!token) {
+            if (!localStorage.getItem('token')) {
                 return {success: false, message: 'No token found'}
             }
 
-            const response = await fetch(`${API_BASE_URL}/user/profile`, {
+            const result = await this.authorizedFetch('/user/profile', {
                 method: 'PUT',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'Authorization': `Bearer ${token}`
-                },
                 body: JSON.stringify(profileData)
             })
 
-            return await response.json();
+            // The new token carries the updated profile snapshot
+            if (result.token) {
+                localStorage.setItem('token', result.token)
+            }
+
+            return result;
         } catch (error) {
             return {success: false, message: 'Network error'}
         }